@@ -1,5 +1,5 @@
 from django.contrib import admin
-from app.models import Language,Topic,RepoLanguage,Repo,Owner,RepoTopic
+from app.models import Language,Topic,RepoLanguage,Repo,Owner,RepoTopic,LanguageYearStat
 
 
 
@@ -8,4 +8,5 @@ admin.site.register(Topic)
 admin.site.register(RepoLanguage)
 admin.site.register(Repo)
 admin.site.register(Owner)
-admin.site.register(RepoTopic)
\ No newline at end of file
+admin.site.register(RepoTopic)
+admin.site.register(LanguageYearStat)
\ No newline at end of file
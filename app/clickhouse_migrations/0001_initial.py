@@ -0,0 +1,138 @@
+"""Boshlang'ich sxema: github_analytics jadvallari, til/yil rollup va materialized view."""
+
+from app.services.clickhouse_migrations import RunPython
+
+# DDL shu migratsiya yozilgan paytdagi holatida muzlatilgan: keyingi o'zgarishlar (indekslar,
+# partitionlash, massiv va versiya ustunlari) o'z migratsiyalarida. IF NOT EXISTS:
+# create_database_and_table bilan yaratilgan bazalarda ham xavfsiz.
+TABLES = [
+    'CREATE DATABASE IF NOT EXISTS github_analytics',
+    '''
+    CREATE TABLE IF NOT EXISTS github_analytics.repositories (
+        owner String,
+        name String,
+        name_with_owner String,
+        description String,
+        stars UInt32,
+        forks UInt32,
+        watchers UInt32,
+        is_fork UInt8,
+        is_archived UInt8,
+        language_count UInt16,
+        topic_count UInt16,
+        disk_usage_kb UInt64,
+        pull_requests UInt32,
+        issues UInt32,
+        primary_language String,
+        created_at DateTime,
+        pushed_at DateTime,
+        created_year UInt16,
+        created_date Date,
+        default_branch_commit_count UInt32,
+        license String,
+        assignable_user_count UInt16,
+        code_of_conduct String,
+        forking_allowed UInt8,
+        has_parent UInt8
+    ) ENGINE = MergeTree()
+    ORDER BY (created_year, stars, name_with_owner)
+    SETTINGS index_granularity = 8192,
+             non_replicated_deduplication_window = 1000
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS github_analytics.repository_languages (
+        repo_name_with_owner String,
+        language String,
+        size UInt64,
+        created_year UInt16,
+        repo_stars UInt32,
+        repo_forks UInt32
+    ) ENGINE = MergeTree()
+    ORDER BY (created_year, language, size)
+    SETTINGS index_granularity = 8192,
+             non_replicated_deduplication_window = 1000
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS github_analytics.repository_topics (
+        repo_name_with_owner String,
+        topic String,
+        topic_stars UInt32,
+        created_year UInt16,
+        repo_stars UInt32
+    ) ENGINE = MergeTree()
+    ORDER BY (topic, created_year, topic_stars)
+    SETTINGS index_granularity = 8192,
+             non_replicated_deduplication_window = 1000
+    ''',
+]
+
+ROLLUP_TABLE = 'github_analytics.language_year_rollup'
+ROLLUP_SELECT = '''
+    SELECT
+        created_year,
+        language,
+        sum(size) AS total_size,
+        uniqState(repo_name_with_owner) AS repo_count,
+        sum(toUInt64(repo_stars)) AS total_stars,
+        max(repo_stars) AS max_stars,
+        count() AS row_count
+    FROM github_analytics.repository_languages
+    WHERE language != ''
+    GROUP BY created_year, language
+'''
+ROLLUP = [
+    f'''
+    CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+        created_year UInt16,
+        language String,
+        total_size SimpleAggregateFunction(sum, UInt64),
+        repo_count AggregateFunction(uniq, String),
+        total_stars SimpleAggregateFunction(sum, UInt64),
+        max_stars SimpleAggregateFunction(max, UInt32),
+        row_count SimpleAggregateFunction(sum, UInt64)
+    ) ENGINE = AggregatingMergeTree()
+    ORDER BY (created_year, language)
+    ''',
+    f'''
+    CREATE MATERIALIZED VIEW IF NOT EXISTS github_analytics.language_year_rollup_mv
+    TO {ROLLUP_TABLE}
+    AS {ROLLUP_SELECT}
+    ''',
+]
+
+# Oldin yaratilgan jadvallarda ham insert_deduplication_token ishlashi uchun
+DEDUPLICATION = [
+    f'ALTER TABLE github_analytics.{table} MODIFY SETTING non_replicated_deduplication_window = 1000'
+    for table in ('repositories', 'repository_languages', 'repository_topics')
+]
+
+
+def backfill_rollup(service):
+    """
+    Mavjud tillar qatorlari rollupga bir marta ko'chiriladi. Alohida jadvalda hisoblanib
+    partition bilan almashtiriladi: view yaratilgandan keyin yozilgan qatorlar ikki marta sanalmaydi.
+    """
+    staging = f'{ROLLUP_TABLE}__backfill'
+    service._execute(f'DROP TABLE IF EXISTS {staging}', name='migration_sql')
+    service._execute(f'CREATE TABLE {staging} AS {ROLLUP_TABLE}', name='migration_sql')
+    try:
+        service._execute(f'INSERT INTO {staging} {ROLLUP_SELECT}', name='migration_sql')
+        # Partitionlanmagan jadvalning yagona partitioni 'all'; bo'sh manbadan REPLACE qilinmaydi
+        if service._execute(f'SELECT count() FROM {staging}', name='migration_sql')[0][0]:
+            service._execute(f"ALTER TABLE {ROLLUP_TABLE} REPLACE PARTITION ID 'all' FROM {staging}",
+                             name='migration_sql')
+    finally:
+        service._execute(f'DROP TABLE IF EXISTS {staging}', name='migration_sql')
+
+
+def create_schema(service):
+    rollup_exists = service._execute(f'EXISTS TABLE {ROLLUP_TABLE}', name='migration_sql')[0][0]
+    for statement in TABLES + ROLLUP + DEDUPLICATION:
+        service._execute(statement, name='migration_sql')
+    if not rollup_exists:
+        backfill_rollup(service)
+
+
+operations = [
+    RunPython(create_schema),
+]
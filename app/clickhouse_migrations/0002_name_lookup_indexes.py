@@ -0,0 +1,11 @@
+"""name_with_owner bo'yicha bloom filter skip indekslari (repository detail endpointi uchun)."""
+
+from app.services.clickhouse_migrations import RunSQL
+from app.services.clickhouse_schema import BASE_TABLES, index_statements
+
+# ADD INDEX faqat yangi partlarga yoziladi; MATERIALIZE INDEX eski partlarni
+# fon mutatsiyasida qayta ishlaydi (jadval o'qish/yozish uchun ochiq qoladi)
+operations = [
+    RunSQL(index_statements(table, materialize=True))
+    for table in BASE_TABLES
+]
@@ -0,0 +1,121 @@
+"""Jadvallar va rollupni created_year bo'yicha partitionlash (yil bo'yicha REPLACE/DROP PARTITION uchun)."""
+
+import logging
+
+from app.services.clickhouse_migrations import RebuildTable, RunPython
+from app.services.clickhouse_schema import TableSchema
+
+logger = logging.getLogger(__name__)
+
+# Ta'riflar shu migratsiya yozilgan paytdagi holatida muzlatilgan (keyingi o'zgarishlar o'z
+# migratsiyalarida); ustun turlari (default, compact) profil bo'yicha tanlanadi.
+NAME_LOOKUP_INDEX = 'bloom_filter(0.01) GRANULARITY 1'
+
+REPOSITORIES = TableSchema(
+    columns=[
+        ('owner', 'String', 'String CODEC(ZSTD(3))'),
+        ('name', 'String', 'String CODEC(ZSTD(3))'),
+        ('name_with_owner', 'String', 'String CODEC(ZSTD(3))'),
+        ('description', 'String', 'String CODEC(ZSTD(3))'),
+        ('stars', 'UInt32', 'UInt32 CODEC(Delta, ZSTD(1))'),
+        ('forks', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('watchers', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('is_fork', 'UInt8', None),
+        ('is_archived', 'UInt8', None),
+        ('language_count', 'UInt16', 'UInt16 CODEC(T64, ZSTD(1))'),
+        ('topic_count', 'UInt16', 'UInt8 CODEC(T64, ZSTD(1))'),
+        ('disk_usage_kb', 'UInt64', 'UInt64 CODEC(T64, ZSTD(1))'),
+        ('pull_requests', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('issues', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('primary_language', 'String', 'LowCardinality(String)'),
+        ('created_at', 'DateTime', 'DateTime CODEC(Delta, ZSTD(1))'),
+        ('pushed_at', 'DateTime', 'DateTime CODEC(Delta, ZSTD(1))'),
+        ('created_year', 'UInt16', 'UInt16 CODEC(DoubleDelta, ZSTD(1))'),
+        ('created_date', 'Date', 'Date CODEC(Delta, ZSTD(1))'),
+        ('default_branch_commit_count', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('license', 'String', 'LowCardinality(String)'),
+        ('assignable_user_count', 'UInt16', 'UInt16 CODEC(T64, ZSTD(1))'),
+        ('code_of_conduct', 'String', 'LowCardinality(String)'),
+        ('forking_allowed', 'UInt8', None),
+        ('has_parent', 'UInt8', None),
+    ],
+    engine='MergeTree()',
+    order_by='(created_year, stars, name_with_owner)',
+    indexes=[('idx_name_with_owner', 'name_with_owner', NAME_LOOKUP_INDEX)],
+    partition_by='created_year',
+)
+
+REPOSITORY_LANGUAGES = TableSchema(
+    columns=[
+        ('repo_name_with_owner', 'String', 'String CODEC(ZSTD(3))'),
+        ('language', 'String', 'LowCardinality(String)'),
+        ('size', 'UInt64', 'UInt64 CODEC(Delta, ZSTD(1))'),
+        ('created_year', 'UInt16', 'UInt16 CODEC(DoubleDelta, ZSTD(1))'),
+        ('repo_stars', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('repo_forks', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+    ],
+    engine='MergeTree()',
+    order_by='(created_year, language, size)',
+    indexes=[('idx_repo_name_with_owner', 'repo_name_with_owner', NAME_LOOKUP_INDEX)],
+    partition_by='created_year',
+)
+
+REPOSITORY_TOPICS = TableSchema(
+    columns=[
+        ('repo_name_with_owner', 'String', 'String CODEC(ZSTD(3))'),
+        ('topic', 'String', 'LowCardinality(String)'),
+        ('topic_stars', 'UInt32', 'UInt32 CODEC(Delta, ZSTD(1))'),
+        ('created_year', 'UInt16', 'UInt16 CODEC(Delta, ZSTD(1))'),
+        ('repo_stars', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+    ],
+    engine='MergeTree()',
+    order_by='(topic, created_year, topic_stars)',
+    indexes=[('idx_repo_name_with_owner', 'repo_name_with_owner', NAME_LOOKUP_INDEX)],
+    partition_by='created_year',
+)
+
+LANGUAGE_YEAR_ROLLUP = TableSchema(
+    columns=[
+        ('created_year', 'UInt16', None),
+        ('language', 'String', 'LowCardinality(String)'),
+        ('total_size', 'SimpleAggregateFunction(sum, UInt64)', None),
+        ('repo_count', 'AggregateFunction(uniq, String)', None),
+        ('total_stars', 'SimpleAggregateFunction(sum, UInt64)', None),
+        ('max_stars', 'SimpleAggregateFunction(max, UInt32)', None),
+        ('row_count', 'SimpleAggregateFunction(sum, UInt64)', None),
+    ],
+    engine='AggregatingMergeTree()',
+    order_by='(created_year, language)',
+    deduplication=False,
+    partition_by='created_year',
+)
+
+TABLES = {
+    'repositories': REPOSITORIES,
+    'repository_languages': REPOSITORY_LANGUAGES,
+    'repository_topics': REPOSITORY_TOPICS,
+    'language_year_rollup': LANGUAGE_YEAR_ROLLUP,
+}
+
+
+def partition_by_year(service):
+    """
+    Partition kaliti ALTER bilan o'zgarmaydi: jadval yangi ta'rif bilan qayta quriladi.
+    Allaqachon partitionlangan jadvallar (yangi o'rnatishlar) o'tkazib yuboriladi,
+    aks holda keyingi migratsiyalar qo'shgan ustunlar muzlatilgan ta'rifda yo'qolardi.
+    """
+    keys = dict(service._execute(f'''
+        SELECT name, partition_key
+        FROM system.tables
+        WHERE database = 'github_analytics' AND name IN ({', '.join(f"'{t}'" for t in TABLES)})
+    ''', name='migration_sql'))
+    for table, schema in TABLES.items():
+        if keys.get(table) == 'created_year':
+            logger.info(f"{table}: allaqachon created_year bo'yicha partitionlangan")
+            continue
+        RebuildTable(table, schema=schema).apply(service)
+
+
+operations = [
+    RunPython(partition_by_year),
+]
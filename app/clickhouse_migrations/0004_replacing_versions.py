@@ -0,0 +1,115 @@
+"""Asosiy jadvallarni ReplacingMergeTree(version) ga o'tkazish va delta ingest uchun fingerprint jadvali."""
+
+from app.services.clickhouse_migrations import CreateTable, RebuildTable
+from app.services.clickhouse_schema import TableSchema
+
+# Ta'riflar shu migratsiya yozilgan paytdagi holatida muzlatilgan (keyingi o'zgarishlar o'z
+# migratsiyalarida); ustun turlari (default, compact) profil bo'yicha tanlanadi.
+VERSION = 'UInt64 DEFAULT toUnixTimestamp64Milli(now64(3))'
+NAME_LOOKUP_INDEX = 'bloom_filter(0.01) GRANULARITY 1'
+
+# Saralash kaliti bitta repo (til/topic) ni aniqlaydi: qayta yozilgan qatorlar
+# birlashtirishda eng katta version bilan qoladi. Ko'chirilgan eski qatorlar
+# ko'chirish vaqtidagi versiyani oladi.
+REPOSITORIES = TableSchema(
+    columns=[
+        ('owner', 'String', 'String CODEC(ZSTD(3))'),
+        ('name', 'String', 'String CODEC(ZSTD(3))'),
+        ('name_with_owner', 'String', 'String CODEC(ZSTD(3))'),
+        ('description', 'String', 'String CODEC(ZSTD(3))'),
+        ('stars', 'UInt32', 'UInt32 CODEC(Delta, ZSTD(1))'),
+        ('forks', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('watchers', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('is_fork', 'UInt8', None),
+        ('is_archived', 'UInt8', None),
+        ('language_count', 'UInt16', 'UInt16 CODEC(T64, ZSTD(1))'),
+        ('topic_count', 'UInt16', 'UInt8 CODEC(T64, ZSTD(1))'),
+        ('disk_usage_kb', 'UInt64', 'UInt64 CODEC(T64, ZSTD(1))'),
+        ('pull_requests', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('issues', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('primary_language', 'String', 'LowCardinality(String)'),
+        ('created_at', 'DateTime', 'DateTime CODEC(Delta, ZSTD(1))'),
+        ('pushed_at', 'DateTime', 'DateTime CODEC(Delta, ZSTD(1))'),
+        ('created_year', 'UInt16', 'UInt16 CODEC(DoubleDelta, ZSTD(1))'),
+        ('created_date', 'Date', 'Date CODEC(Delta, ZSTD(1))'),
+        ('default_branch_commit_count', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('license', 'String', 'LowCardinality(String)'),
+        ('assignable_user_count', 'UInt16', 'UInt16 CODEC(T64, ZSTD(1))'),
+        ('code_of_conduct', 'String', 'LowCardinality(String)'),
+        ('forking_allowed', 'UInt8', None),
+        ('has_parent', 'UInt8', None),
+        ('language_names', 'Array(String)', 'Array(LowCardinality(String))'),
+        ('language_sizes', 'Array(UInt64)', None),
+        ('topic_names', 'Array(String)', 'Array(LowCardinality(String))'),
+        ('topic_stars', 'Array(UInt32)', None),
+        ('version', VERSION, None),
+    ],
+    engine='ReplacingMergeTree(version)',
+    order_by='(created_year, name_with_owner)',
+    indexes=[('idx_name_with_owner', 'name_with_owner', NAME_LOOKUP_INDEX)],
+    partition_by='created_year',
+)
+
+REPOSITORY_LANGUAGES = TableSchema(
+    columns=[
+        ('repo_name_with_owner', 'String', 'String CODEC(ZSTD(3))'),
+        ('language', 'String', 'LowCardinality(String)'),
+        ('size', 'UInt64', 'UInt64 CODEC(Delta, ZSTD(1))'),
+        ('created_year', 'UInt16', 'UInt16 CODEC(DoubleDelta, ZSTD(1))'),
+        ('repo_stars', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('repo_forks', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('version', VERSION, None),
+        ('is_deleted', 'UInt8 DEFAULT 0', None),
+    ],
+    engine='ReplacingMergeTree(version, is_deleted)',
+    order_by='(created_year, language, repo_name_with_owner)',
+    indexes=[('idx_repo_name_with_owner', 'repo_name_with_owner', NAME_LOOKUP_INDEX)],
+    partition_by='created_year',
+)
+
+REPOSITORY_TOPICS = TableSchema(
+    columns=[
+        ('repo_name_with_owner', 'String', 'String CODEC(ZSTD(3))'),
+        ('topic', 'String', 'LowCardinality(String)'),
+        ('topic_stars', 'UInt32', 'UInt32 CODEC(Delta, ZSTD(1))'),
+        ('created_year', 'UInt16', 'UInt16 CODEC(Delta, ZSTD(1))'),
+        ('repo_stars', 'UInt32', 'UInt32 CODEC(T64, ZSTD(1))'),
+        ('version', VERSION, None),
+        ('is_deleted', 'UInt8 DEFAULT 0', None),
+    ],
+    engine='ReplacingMergeTree(version, is_deleted)',
+    order_by='(topic, created_year, repo_name_with_owner)',
+    indexes=[('idx_repo_name_with_owner', 'repo_name_with_owner', NAME_LOOKUP_INDEX)],
+    partition_by='created_year',
+)
+
+REPOSITORY_FINGERPRINTS = TableSchema(
+    columns=[
+        ('name_with_owner', 'String', 'String CODEC(ZSTD(3))'),
+        ('fingerprint', 'Int64', None),
+        ('created_year', 'UInt16', None),
+        ('version', VERSION, None),
+    ],
+    engine='ReplacingMergeTree(version)',
+    order_by='name_with_owner',
+    partition_by='created_year',
+)
+
+# Rollupi qayta hisoblanishi kerak bo'lgan yillar (uzilgan ingest keyingi ishga tushishda tuzatiladi)
+ROLLUP_PENDING_YEARS = TableSchema(
+    columns=[
+        ('created_year', 'UInt16', None),
+        ('marked_at', VERSION, None),
+    ],
+    engine='MergeTree()',
+    order_by='created_year',
+    deduplication=False,
+)
+
+operations = [
+    RebuildTable('repositories', schema=REPOSITORIES),
+    RebuildTable('repository_languages', schema=REPOSITORY_LANGUAGES),
+    RebuildTable('repository_topics', schema=REPOSITORY_TOPICS),
+    CreateTable('repository_fingerprints', schema=REPOSITORY_FINGERPRINTS),
+    CreateTable('rollup_pending_years', schema=ROLLUP_PENDING_YEARS),
+]
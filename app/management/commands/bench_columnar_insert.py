@@ -0,0 +1,78 @@
+# management/commands/bench_columnar_insert.py
+
+import json
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from app.services import clickhouse_service as ch
+from app.services.clickhouse_standin import serialize_native
+from app.services.synthetic import generate_repositories
+
+
+def _run(repositories, mode: str) -> dict:
+    tables = (
+        ('repositories', ch.REPOSITORY_COLUMNS),
+        ('repository_languages', ch.LANGUAGE_COLUMNS),
+        ('repository_topics', ch.TOPIC_COLUMNS),
+    )
+    columnar = mode != 'rows'
+    use_numpy = mode == 'columnar-numpy'
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    if columnar:
+        block = ch.transform_repositories_columnar(repositories)
+    else:
+        block = ch.transform_repositories(repositories)
+    transformed = time.perf_counter()
+
+    bytes_sent = 0
+    rows = 0
+    for (_, spec), data in zip(tables, block[:3]):
+        rows += ch.block_row_count(data, columnar)
+        if columnar:
+            data = ch.prepare_columns(data, spec, use_numpy)
+        bytes_sent += serialize_native(data, spec, columnar, use_numpy)
+    finished = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    elapsed = finished - started
+    return {
+        'mode': mode,
+        'repositories': len(repositories),
+        'rows': rows,
+        'errors': block.error_count,
+        'transform_s': round(transformed - started, 4),
+        'serialize_s': round(finished - transformed, 4),
+        'total_s': round(elapsed, 4),
+        'rows_per_s': round(rows / elapsed) if elapsed else None,
+        'peak_memory_mb': round(peak / (1024 * 1024), 2),
+        'bytes_sent': bytes_sent,
+    }
+
+
+class Command(BaseCommand):
+    help = "Tuple (qatorli) va columnar INSERT yo'llarini sintetik ma'lumotlarda solishtiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Repositorylar soni (default: 100000)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        repositories = generate_repositories(options['rows'], options['seed'])
+        modes = ['rows', 'columnar']
+        if ch.np is not None:
+            modes.append('columnar-numpy')
+
+        results = []
+        for mode in modes:
+            result = _run(repositories, mode)
+            results.append(result)
+            self.stdout.write(
+                f"{mode:>15}: {result['rows_per_s']} qator/s, "
+                f"peak {result['peak_memory_mb']} MB, jami {result['total_s']} s"
+            )
+        self.stdout.write(json.dumps(results, indent=2))
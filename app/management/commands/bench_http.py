@@ -0,0 +1,258 @@
+# management/commands/bench_http.py
+
+import io
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from app.services import query_cache
+from app.services.clickhouse_service import (
+    ClickHouseService,
+    format_language_statistics,
+    format_top_languages_by_size,
+)
+from app.services.synthetic import iter_repositories, write_repositories
+
+# endpoint -> (url nomi, kesh manbasi, yil parametri kerakmi)
+ENDPOINTS = {
+    'statistics': ('statistics', query_cache.CLICKHOUSE, False),
+    'top5-languages': ('top5-languages', query_cache.ORM, True),
+    'ch-top-languages': ('ch-top-languages', query_cache.CLICKHOUSE, True),
+}
+
+
+class StubClickHouseService(ClickHouseService):
+    """
+    Serversiz ``ClickHouseService``: natijalar sintetik ma'lumotdan oldindan
+    hisoblanadi, har bir so'rov ``latency`` soniya "server vaqti" kutadi.
+    Formatlash haqiqiy servisdagi funksiyalar bilan bajariladi.
+    """
+
+    latency = 0.02
+    by_year = {}       # year -> {language: total_size}
+    statistics = []    # LANGUAGE_STATISTICS_QUERY natijasi ko'rinishidagi qatorlar
+
+    def __init__(self, pool=None):
+        self.pool = pool
+
+    @classmethod
+    def load(cls, count: int, seed: int, latency: float):
+        by_year = defaultdict(lambda: defaultdict(int))
+        totals = defaultdict(lambda: [0, 0, 0, 0])  # repo_count, size, stars, max_stars
+        for repo in iter_repositories(count, seed):
+            year = int(repo['createdAt'][:4])
+            stars = repo['stars']
+            for lang in repo['languages']:
+                by_year[year][lang['name']] += lang['size']
+                total = totals[lang['name']]
+                total[0] += 1
+                total[1] += lang['size']
+                total[2] += stars
+                total[3] = max(total[3], stars)
+        cls.latency = latency
+        cls.by_year = {year: dict(sizes) for year, sizes in by_year.items()}
+        rows = [
+            (lang, count_, size, stars / count_, max_stars)
+            for lang, (count_, size, stars, max_stars) in totals.items()
+        ]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        cls.statistics = rows[:20]
+
+    def get_top_languages_by_year_and_size(self, year: int, top_n: int = 5):
+        time.sleep(self.latency)
+        sizes = self.by_year.get(year, {})
+        results = sorted(sizes.items(), key=lambda item: item[1], reverse=True)[:top_n]
+        return format_top_languages_by_size(results, year)
+
+    def get_language_statistics(self):
+        time.sleep(self.latency)
+        return format_language_statistics(self.statistics)
+
+
+def _percentile(sorted_values, percent: float) -> float:
+    """Nearest-rank persentil."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _summary(latencies, statuses, wall: float, concurrency: int) -> dict:
+    latencies = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 2) if seconds is not None else None
+    errors = sum(count for code, count in statuses.items() if code is None or code >= 500)
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'errors': errors,
+        'status_codes': {str(code): count for code, count in sorted(statuses.items(), key=str)},
+        'p50_ms': ms(_percentile(latencies, 50)),
+        'p95_ms': ms(_percentile(latencies, 95)),
+        'p99_ms': ms(_percentile(latencies, 99)),
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'max_ms': ms(latencies[-1]) if latencies else None,
+        'wall_s': round(wall, 4),
+        'throughput_rps': round(len(latencies) / wall, 1) if wall else None,
+    }
+
+
+class _Driver:
+    """So'rovlarni Django test client (jarayon ichida) yoki jonli server orqali yuboradi."""
+
+    def __init__(self, base_url: str = None):
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self._local = threading.local()
+
+    def get(self, path: str) -> int:
+        if self.base_url:
+            try:
+                with urllib.request.urlopen(self.base_url + path, timeout=60) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+            except OSError:
+                return None
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            # Test client thread-safe emas: har bir thread o'zinikini oladi
+            client = self._local.client = Client(HTTP_HOST='localhost')
+        response = client.get(path)
+        return response.status_code
+
+
+def _run_phase(driver: _Driver, path: str, scope: str, requests: int, concurrency: int, cold: bool) -> dict:
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def one(_):
+        if cold:
+            # Har bir so'rovdan oldin versiya oshiriladi: kesh bo'sh holat (o'lchovdan tashqarida)
+            query_cache.bump_data_version(scope)
+        started = time.perf_counter()
+        status = driver.get(path)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+
+    if not cold:
+        driver.get(path)  # keshni to'ldirish
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests)))
+    return _summary(latencies, statuses, time.perf_counter() - started, concurrency)
+
+
+class Command(BaseCommand):
+    help = (
+        "Analitik endpointlar (statistics, top5-languages, ch-top-languages) uchun HTTP yuklama "
+        "benchmarki: sovuq va issiq kesh bo'yicha p50/p95/p99 va o'tkazuvchanlik (JSON)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoints',
+            default=','.join(ENDPOINTS),
+            help=f"Vergul bilan ajratilgan endpointlar: {', '.join(ENDPOINTS)}",
+        )
+        parser.add_argument('--requests', type=int, default=200, help='Har bir bosqichdagi so\'rovlar soni')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--year', type=int, default=2020)
+        parser.add_argument('--limit', type=int, default=5)
+        parser.add_argument(
+            '--url',
+            help="Jonli server manzili (masalan http://127.0.0.1:8000). Berilmasa Django test client "
+                 "ishlatiladi. Jonli serverda ClickHouse stub qilinmaydi.",
+        )
+        parser.add_argument(
+            '--clickhouse',
+            choices=['stub', 'server'],
+            default='stub',
+            help="stub: sintetik natijali StubClickHouseService; server: CLICKHOUSE_SETTINGS dagi server",
+        )
+        parser.add_argument('--stub-rows', type=int, default=20000, help='Stub natijalari uchun sintetik repolar')
+        parser.add_argument('--stub-latency-ms', type=float, default=20, help='Stub so\'rovining server vaqti')
+        parser.add_argument(
+            '--seed-orm',
+            type=int,
+            default=0,
+            help="top5-languages uchun shuncha sintetik repo import_repos --bulk bilan yoziladi "
+                 "(sozlangan bazaga haqiqatan yoziladi)",
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='JSON hisobotni faylga ham yozish')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        unknown = set(names) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Noma'lum endpoint(lar): {', '.join(sorted(unknown))}")
+
+        if options['seed_orm']:
+            self._seed_orm(options['seed_orm'], options['seed'])
+
+        patcher = None
+        if options['clickhouse'] == 'stub' and not options['url']:
+            StubClickHouseService.load(options['stub_rows'], options['seed'], options['stub_latency_ms'] / 1000)
+            patcher = mock.patch('app.views.ClickHouseService', StubClickHouseService)
+            patcher.start()
+
+        driver = _Driver(options['url'])
+        results = []
+        try:
+            for name in names:
+                url_name, scope, with_year = ENDPOINTS[name]
+                path = reverse(url_name)
+                if with_year:
+                    path += f"?year={options['year']}&limit={options['limit']}"
+                for phase in ('cold', 'warm'):
+                    summary = _run_phase(
+                        driver, path, scope, options['requests'], options['concurrency'], cold=phase == 'cold'
+                    )
+                    results.append({'endpoint': name, 'phase': phase, 'path': path, **summary})
+                    style = self.style.ERROR if summary['errors'] else self.style.SUCCESS
+                    self.stdout.write(style(
+                        f"{name:>17} {phase:>4}: p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, "
+                        f"p99 {summary['p99_ms']} ms, {summary['throughput_rps']} req/s"
+                    ))
+        finally:
+            if patcher is not None:
+                patcher.stop()
+
+        report = {
+            'mode': 'live' if options['url'] else 'test-client',
+            'clickhouse': 'server' if options['url'] else options['clickhouse'],
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'results': results,
+        }
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(payload + '\n')
+        self.stdout.write(payload)
+
+    def _seed_orm(self, count: int, seed: int):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            self.stdout.write(f"⏳ {count} ta sintetik repo ORM bazasiga yozilmoqda...")
+            write_repositories(path, count, seed)
+            call_command('import_repos', path, bulk=True, stdout=io.StringIO())
+        finally:
+            os.remove(path)
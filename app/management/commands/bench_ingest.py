@@ -0,0 +1,232 @@
+# management/commands/bench_ingest.py
+
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from app.models import Repo, RepoLanguage, RepoTopic
+from app.services.clickhouse_pool import ClickHousePool, set_pool
+from app.services.clickhouse_service import ClickHouseService
+from app.services.clickhouse_standin import InProcessClickHouseClient, StandInStats
+from app.services.synthetic import write_repositories
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PATHS = ('orm', 'orm-bulk', 'clickhouse', 'clickhouse-columnar')
+CH_TABLES = ('repositories', 'repository_languages', 'repository_topics')
+
+
+def _peak_rss_mb(who) -> float:
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux: KB, macOS: bayt
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+def _orm_counts():
+    return {
+        'repos': Repo.objects.count(),
+        'repo_languages': RepoLanguage.objects.count(),
+        'repo_topics': RepoTopic.objects.count(),
+    }
+
+
+def _bench_orm(path: str, options: dict, bulk: bool) -> dict:
+    """import_repos ni tranzaksiya ichida ishga tushirib, oxirida orqaga qaytaradi."""
+    out = io.StringIO()
+    with transaction.atomic():
+        before = _orm_counts()
+        started = time.perf_counter()
+        call_command('import_repos', path, bulk=bulk, chunk_size=options['chunk_size'], stdout=out)
+        elapsed = time.perf_counter() - started
+        after = _orm_counts()
+        transaction.set_rollback(True)
+    rows = {name: after[name] - before[name] for name in after}
+    return {'stages': {'import_s': round(elapsed, 4)}, 'rows': rows, 'total_s': elapsed}
+
+
+def _ch_counts(service: ClickHouseService) -> dict:
+    return {
+        table: service._execute(f'SELECT count() FROM github_analytics.{table}')[0][0]
+        for table in CH_TABLES
+    }
+
+
+def _bench_clickhouse(path: str, options: dict, columnar: bool) -> dict:
+    ingest_options = {
+        'batch_size': options['batch_size'],
+        'stream': options['stream'],
+        'transform_workers': options['transform_workers'],
+        'columnar': columnar,
+    }
+    stats = None
+    if options['clickhouse'] == 'standin':
+        stats = StandInStats()
+        set_pool(ClickHousePool(client_factory=lambda: InProcessClickHouseClient(stats)))
+    else:
+        service = ClickHouseService()
+        service.create_database_and_table()
+        before = _ch_counts(service)
+
+    out = io.StringIO()
+    started = time.perf_counter()
+    call_command('ingest_to_clickhouse', path, stdout=out, **ingest_options)
+    elapsed = time.perf_counter() - started
+    if '❌' in out.getvalue():
+        raise CommandError(f"ingest_to_clickhouse xatolik bilan tugadi:\n{out.getvalue()}")
+
+    if stats is not None:
+        rows = {table: stats.rows.get(f'github_analytics.{table}', 0) for table in CH_TABLES}
+        stages = {
+            # Native formatga seriyalash (haqiqiy serverda tarmoqqa yozish ham shu yerda)
+            'insert_s': round(stats.insert_seconds, 4),
+            'parse_transform_s': round(elapsed - stats.insert_seconds, 4),
+        }
+        extra = {'bytes_sent': stats.bytes_sent, 'inserts': stats.inserts}
+    else:
+        after = _ch_counts(service)
+        rows = {table: after[table] - before[table] for table in CH_TABLES}
+        stages = {}
+        extra = {}
+    stages['ingest_s'] = round(elapsed, 4)
+    return {'stages': stages, 'rows': rows, 'total_s': elapsed, **extra}
+
+
+def _run_path(name: str, path: str, options: dict) -> dict:
+    if name in ('orm', 'orm-bulk'):
+        result = _bench_orm(path, options, bulk=name == 'orm-bulk')
+    else:
+        result = _bench_clickhouse(path, options, columnar=name == 'clickhouse-columnar')
+
+    total_rows = sum(result['rows'].values())
+    elapsed = result.pop('total_s')
+    return {
+        'path': name,
+        'repositories': options['count'],
+        **result,
+        'total_rows': total_rows,
+        'total_s': round(elapsed, 4),
+        'repos_per_s': round(options['count'] / elapsed) if elapsed else None,
+        'rows_per_s': round(total_rows / elapsed) if elapsed else None,
+        'peak_rss_mb': _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        'workers_peak_rss_mb': _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+    }
+
+
+def _child(conn, name, path, options):
+    try:
+        conn.send(_run_path(name, path, options))
+    except BaseException as e:
+        conn.send({'path': name, 'error': f'{type(e).__name__}: {e}'})
+    finally:
+        conn.close()
+
+
+def _run_isolated(name: str, path: str, options: dict) -> dict:
+    """
+    Har bir yo'l alohida (fork qilingan) jarayonda ishlaydi: peak RSS
+    oldingi yo'llarning xotirasini o'z ichiga olmaydi.
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return _run_path(name, path, options)
+    # Ota jarayonning DB ulanishi bolaga o'tmasligi kerak
+    connections.close_all()
+    ctx = multiprocessing.get_context('fork')
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(child_conn, name, path, options))
+    process.start()
+    child_conn.close()
+    try:
+        result = parent_conn.recv()
+    except EOFError:
+        result = {'path': name, 'error': f'jarayon kutilmaganda tugadi (exit code {process.exitcode})'}
+    process.join()
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        "Sintetik ma'lumotlarda import_repos va ingest_to_clickhouse o'tkazuvchanligini o'lchaydi "
+        "(qator/s, bosqichlar vaqti, peak RSS) va JSON hisobot chiqaradi"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20000, help='Sintetik repositorylar soni (default: 20000)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--paths',
+            default='orm,orm-bulk,clickhouse,clickhouse-columnar',
+            help=f"Vergul bilan ajratilgan yo'llar: {', '.join(PATHS)}",
+        )
+        parser.add_argument(
+            '--clickhouse',
+            choices=['standin', 'server'],
+            default='standin',
+            help="standin: jarayon ichidagi serversiz mijoz; server: CLICKHOUSE_SETTINGS dagi server "
+                 "(github_analytics jadvallariga haqiqatan yoziladi - faqat test serverida ishlating)",
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='ingest_to_clickhouse batch hajmi')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='import_repos --bulk chunk hajmi')
+        parser.add_argument('--transform-workers', type=int, default=0)
+        parser.add_argument('--stream', action='store_true', help='ingest_to_clickhouse --stream rejimida')
+        parser.add_argument('--ndjson', action='store_true', help='Sintetik faylni NDJSON formatida yozish')
+        parser.add_argument('--output', help='JSON hisobotni faylga ham yozish')
+
+    def handle(self, *args, **options):
+        paths = [name.strip() for name in options['paths'].split(',') if name.strip()]
+        unknown = set(paths) - set(PATHS)
+        if unknown:
+            raise CommandError(f"Noma'lum yo'l(lar): {', '.join(sorted(unknown))}")
+        if options['ndjson'] and 'orm' in paths:
+            raise CommandError("import_repos oddiy rejimi NDJSON o'qimaydi: --paths dan 'orm' ni olib tashlang")
+
+        fd, data_path = tempfile.mkstemp(suffix='.ndjson' if options['ndjson'] else '.json')
+        os.close(fd)
+        try:
+            self.stdout.write(f"⏳ {options['count']} ta sintetik repository yozilmoqda...")
+            started = time.perf_counter()
+            size = write_repositories(data_path, options['count'], options['seed'], ndjson=options['ndjson'])
+            generate_s = time.perf_counter() - started
+            self.stdout.write(f"📂 {data_path} ({size / (1024 * 1024):.1f} MB, {generate_s:.2f} s)")
+
+            results = []
+            for name in paths:
+                self.stdout.write(f"⏳ {name}...")
+                result = _run_isolated(name, data_path, options)
+                results.append(result)
+                if 'error' in result:
+                    self.stdout.write(self.style.ERROR(f"❌ {name}: {result['error']}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"✅ {name}: {result['rows_per_s']} qator/s, {result['total_s']} s, "
+                        f"peak RSS {result['peak_rss_mb']} MB"
+                    ))
+        finally:
+            os.remove(data_path)
+
+        report = {
+            'repositories': options['count'],
+            'seed': options['seed'],
+            'clickhouse': options['clickhouse'],
+            'input_bytes': size,
+            'generate_s': round(generate_s, 4),
+            'results': results,
+        }
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(payload + '\n')
+        self.stdout.write(payload)
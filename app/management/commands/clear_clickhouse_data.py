@@ -1,22 +1,44 @@
 # app/management/commands/clear_clickhouse_data.py
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from app.services.clickhouse_service import ClickHouseService
+from app.services.query_cache import CLICKHOUSE, bump_data_version
 import logging
 
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
-    help = "ClickHouse dagi barcha 'github_analytics' ma'lumotlarini o'chiradi (TRUNCATE)."
+    help = (
+        "ClickHouse dagi barcha 'github_analytics' ma'lumotlarini o'chiradi (TRUNCATE). "
+        "--year berilsa faqat shu yillar partitionlari o'chiriladi (DROP PARTITION)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, action='append', default=None,
+                            help="Faqat shu yil ma'lumotlarini o'chirish (bir necha marta berish mumkin)")
 
     def handle(self, *args, **options):
         self.stdout.write("⏳ ClickHouse ma'lumotlarini tozalash jarayoni boshlanmoqda...")
+        years = options['year']
         
         try:
             ch_service = ClickHouseService()
             
+            if years:
+                if not ch_service.is_partitioned_by_year():
+                    raise CommandError(
+                        "Jadvallar created_year bo'yicha partitionlanmagan. Avval: python manage.py migrate_clickhouse"
+                    )
+                ch_service.drop_years(years)
+                bump_data_version(CLICKHOUSE)
+                self.stdout.write(self.style.SUCCESS(
+                    f"🎉 {', '.join(map(str, years))} yil(lar) ma'lumotlari muvaffaqiyatli o'chirildi."
+                ))
+                return
+            
             # clear_data funksiyasini chaqirish
             ch_service.clear_data()
+            bump_data_version(CLICKHOUSE)
             
             self.stdout.write(self.style.SUCCESS("🎉 Barcha 'github_analytics' ma'lumotlari muvaffaqiyatli tozalandi."))
         
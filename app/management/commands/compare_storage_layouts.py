@@ -0,0 +1,242 @@
+# management/commands/compare_storage_layouts.py
+
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.services.clickhouse_schema import DATABASE, table_storage
+from app.services.clickhouse_service import (
+    REPOSITORY_COLUMNS,
+    REPOSITORY_DETAIL_ARRAYS_QUERY,
+    REPOSITORY_DETAIL_QUERY,
+    REPOSITORY_LANGUAGES_QUERY,
+    REPOSITORY_TOPICS_QUERY,
+    ClickHouseService,
+)
+
+ARRAYS_TABLE = 'repositories__cmp_arrays'
+
+# Mavjud uch jadvaldan 'arrays' tuzilishidagi nusxa (LEFT JOIN: tili/topici yo'q repo bo'sh massiv oladi)
+FILL_ARRAYS_QUERY = f'''
+    INSERT INTO {DATABASE}.{ARRAYS_TABLE}
+        ({', '.join(name for name, _ in REPOSITORY_COLUMNS)},
+         language_names, language_sizes, topic_names, topic_stars)
+    SELECT
+        {', '.join(f'r.{name}' for name, _ in REPOSITORY_COLUMNS)},
+        l.names, l.sizes, t.names, t.stars
+    FROM {DATABASE}.repositories AS r
+    LEFT JOIN (
+        SELECT repo_name_with_owner, groupArray(language) AS names, groupArray(size) AS sizes
+        FROM {DATABASE}.repository_languages
+        GROUP BY repo_name_with_owner
+    ) AS l ON l.repo_name_with_owner = r.name_with_owner
+    LEFT JOIN (
+        SELECT repo_name_with_owner, groupArray(topic) AS names, groupArray(topic_stars) AS stars
+        FROM {DATABASE}.repository_topics
+        GROUP BY repo_name_with_owner
+    ) AS t ON t.repo_name_with_owner = r.name_with_owner
+'''
+
+# Har bir holat: (uch jadvalli so'rovlar, massivli so'rovlar). {arrays} - taqqoslash jadvali.
+COMPARISON_QUERIES = {
+    'languages_by_year': (
+        ['''
+            SELECT created_year, language, sum(size), count()
+            FROM github_analytics.repository_languages
+            GROUP BY created_year, language
+        '''],
+        ['''
+            SELECT created_year, language, sum(size), count()
+            FROM {arrays}
+            ARRAY JOIN language_names AS language, language_sizes AS size
+            GROUP BY created_year, language
+        '''],
+    ),
+    'top_topics': (
+        ['''
+            SELECT topic, count() AS repos, sum(repo_stars)
+            FROM github_analytics.repository_topics
+            GROUP BY topic
+            ORDER BY repos DESC, topic
+            LIMIT 20
+        '''],
+        ['''
+            SELECT topic, count() AS repos, sum(stars)
+            FROM {arrays}
+            ARRAY JOIN topic_names AS topic
+            GROUP BY topic
+            ORDER BY repos DESC, topic
+            LIMIT 20
+        '''],
+    ),
+    # Repo darajasida ikkala ro'yxat kerak: uch jadvalda JOIN, massivlarda has()
+    'language_and_topic': (
+        ['''
+            SELECT count()
+            FROM (
+                SELECT DISTINCT repo_name_with_owner FROM github_analytics.repository_languages
+                WHERE language = %(language)s
+            ) AS l
+            INNER JOIN (
+                SELECT DISTINCT repo_name_with_owner FROM github_analytics.repository_topics
+                WHERE topic = %(topic)s
+            ) AS t USING repo_name_with_owner
+        '''],
+        ['''
+            SELECT count()
+            FROM {arrays}
+            WHERE has(language_names, %(language)s) AND has(topic_names, %(topic)s)
+        '''],
+    ),
+    'code_size_by_primary_language': (
+        ['''
+            SELECT r.primary_language, count(), sum(l.total)
+            FROM github_analytics.repositories AS r
+            INNER JOIN (
+                SELECT repo_name_with_owner, sum(size) AS total
+                FROM github_analytics.repository_languages
+                GROUP BY repo_name_with_owner
+            ) AS l ON l.repo_name_with_owner = r.name_with_owner
+            GROUP BY r.primary_language
+        '''],
+        ['''
+            SELECT primary_language, count(), sum(arraySum(language_sizes))
+            FROM {arrays}
+            WHERE notEmpty(language_sizes)
+            GROUP BY primary_language
+        '''],
+    ),
+    'repository_detail': (
+        [REPOSITORY_DETAIL_QUERY, REPOSITORY_LANGUAGES_QUERY, REPOSITORY_TOPICS_QUERY],
+        [REPOSITORY_DETAIL_ARRAYS_QUERY.replace('github_analytics.repositories', '{arrays}')],
+    ),
+}
+
+
+def _run(service: ClickHouseService, queries, params, repeat: int):
+    """So'rovlar guruhining median vaqti (ms), o'qilgan qatorlar va oxirgi natijalar."""
+    samples = []
+    for _ in range(repeat):
+        service.rows_read = 0
+        started = time.perf_counter()
+        results = [
+            service._execute(query, params, settings={'use_query_cache': 0}, name='layout_compare')
+            for query in queries
+        ]
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 2), service.rows_read, results
+
+
+def _normalized(rows):
+    return sorted(tuple(round(value, 6) if isinstance(value, float) else value for value in row) for row in rows)
+
+
+class Command(BaseCommand):
+    help = (
+        "Tillar/topiclarni alohida jadvallarda (tables) va repositories dagi Array ustunlarida (arrays) "
+        "saqlashni hajm va so'rov vaqti bo'yicha taqqoslaydi. Mavjud ma'lumotdan vaqtinchalik "
+        f"{ARRAYS_TABLE} jadvali quriladi, asosiy jadvallar o'zgarmaydi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Har bir so'rov necha marta bajariladi")
+        parser.add_argument('--keep', action='store_true', help=f"{ARRAYS_TABLE} jadvalini o'chirmaslik")
+        parser.add_argument('--output', help='JSON hisobotni faylga ham yozish')
+
+    def handle(self, *args, **options):
+        service = ClickHouseService()
+        service.create_database_and_table()
+        arrays = f'{DATABASE}.{ARRAYS_TABLE}'
+
+        language_rows = service._execute(f'SELECT count() FROM {DATABASE}.repository_languages')[0][0]
+        if not language_rows:
+            raise CommandError(
+                "repository_languages bo'sh: taqqoslash 'tables' tuzilishida yuklangan ma'lumotdan quriladi "
+                "(storage_layout = 'tables' bilan ingest_to_clickhouse)"
+            )
+
+        self.stdout.write(f"⏳ {ARRAYS_TABLE} to'ldirilmoqda...")
+        service._execute(f'DROP TABLE IF EXISTS {arrays}')
+        service._execute(f'CREATE TABLE {arrays} AS {DATABASE}.repositories')
+        # Wide partlar: system.columns ustunlar bo'yicha hajmni faqat ularda ko'rsatadi
+        service._execute(f'ALTER TABLE {arrays} MODIFY SETTING min_bytes_for_wide_part = 0')
+        try:
+            service._execute(FILL_ARRAYS_QUERY, name='layout_compare_fill')
+
+            report = {'storage': self._storage(service), 'queries': {}}
+            params = self._params(service)
+            for name, (table_queries, array_queries) in COMPARISON_QUERIES.items():
+                tables_ms, tables_rows, tables_result = _run(service, table_queries, params, options['repeat'])
+                arrays_ms, arrays_rows, arrays_result = _run(
+                    service, [query.replace('{arrays}', arrays) for query in array_queries],
+                    params, options['repeat'],
+                )
+                same = None
+                if len(table_queries) == len(array_queries) == 1:
+                    same = _normalized(tables_result[0]) == _normalized(arrays_result[0])
+                report['queries'][name] = {
+                    'tables': {'ms': tables_ms, 'rows_read': tables_rows, 'queries': len(table_queries)},
+                    'arrays': {'ms': arrays_ms, 'rows_read': arrays_rows, 'queries': len(array_queries)},
+                    'same_result': same,
+                }
+                self.stdout.write(
+                    f"⏱️  {name}: tables {tables_ms} ms ({tables_rows} qator) -> "
+                    f"arrays {arrays_ms} ms ({arrays_rows} qator)"
+                    + ('' if same is not False else ' ⚠️  natijalar farq qiladi')
+                )
+        finally:
+            if not options['keep']:
+                service._execute(f'DROP TABLE IF EXISTS {arrays}')
+
+        storage = report['storage']
+        self.stdout.write(
+            f"📦 tables: {storage['tables']['compressed_bytes']} bayt, "
+            f"arrays: {storage['arrays']['compressed_bytes']} bayt"
+        )
+        payload = json.dumps(report, indent=2, default=str)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(payload + '\n')
+        self.stdout.write(payload)
+
+    @staticmethod
+    def _storage(service):
+        tables = {table: table_storage(service, table)
+                  for table in ('repositories', 'repository_languages', 'repository_topics')}
+        arrays = table_storage(service, ARRAYS_TABLE)
+
+        def columns_bytes(storage, names):
+            return sum(storage['columns'].get(name, {}).get('compressed_bytes') or 0 for name in names)
+
+        return {
+            'tables': {
+                'compressed_bytes': sum(storage['compressed_bytes'] for storage in tables.values()),
+                'by_table': {table: storage['compressed_bytes'] for table, storage in tables.items()},
+            },
+            'arrays': {
+                'compressed_bytes': arrays['compressed_bytes'],
+                'language_columns': columns_bytes(arrays, ('language_names', 'language_sizes')),
+                'topic_columns': columns_bytes(arrays, ('topic_names', 'topic_stars')),
+            },
+        }
+
+    @staticmethod
+    def _params(service):
+        # Eng ko'p uchraydigan til/topic va tillari bor biror repo
+        language = service._execute(
+            f'SELECT language FROM {DATABASE}.repository_languages GROUP BY language ORDER BY count() DESC LIMIT 1'
+        )
+        topic = service._execute(
+            f'SELECT topic FROM {DATABASE}.repository_topics GROUP BY topic ORDER BY count() DESC LIMIT 1'
+        )
+        repo = service._execute(
+            f'SELECT repo_name_with_owner, created_year FROM {DATABASE}.repository_languages LIMIT 1'
+        )
+        return {
+            'language': language[0][0] if language else '',
+            'topic': topic[0][0] if topic else '',
+            'name': repo[0][0] if repo else '',
+            'year': repo[0][1] if repo else 0,
+        }
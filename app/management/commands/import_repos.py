@@ -1,8 +1,17 @@
 import json
-from datetime import datetime
+import time
 from django.core.management.base import BaseCommand
 from django.db import transaction, IntegrityError
 from app.models import Owner, Repo, Language, RepoLanguage, Topic, RepoTopic
+from app.services.json_stream import iter_repositories
+from app.services.repo_importer import BulkRepoImporter, repo_fields
+from app.services.language_stats import (
+    apply_language_year_changes,
+    language_year_totals,
+    rebuild_language_year_stats,
+)
+from app.services.bulk_load import BulkLoadSession
+from app.services.query_cache import ORM, bump_data_version
 
 # batch sizes
 BATCH_REPO_LANG = 1000
@@ -10,23 +19,58 @@ BATCH_REPO_TOPIC = 1000
 BATCH_REPO_UPDATE = 500
 
 
-def parse_iso(dt_str):
-    if not dt_str:
-        return None
-    try:
-        return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
-    except Exception:
-        return None
-
-
 class Command(BaseCommand):
     help = "Import GitHub repos from JSON file with batching and caching (primary_language as FK)"
 
     def add_arguments(self, parser):
         parser.add_argument('jsonfile', type=str)
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Set-based mode: resolve owners/languages/topics and upsert repos per chunk',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Records per chunk in --bulk mode')
+        parser.add_argument(
+            '--delta',
+            action='store_true',
+            help='Skip records whose fingerprint matches the stored one (implies --bulk)',
+        )
+        parser.add_argument(
+            '--bulk-load',
+            action='store_true',
+            help='Fast-load session for large imports: SQLite WAL/synchronous=OFF/large cache (or backend '
+                 'equivalents), secondary indexes dropped and rebuilt at the end, then ANALYZE',
+        )
 
     def handle(self, *args, **options):
+        self.maintain_stats = not options['bulk_load']
+        if not options['bulk_load']:
+            return self._import(options)
+        # LanguageYearStat is deferred like the indexes: one rebuild instead of per-flush upkeep
+        with BulkLoadSession((Repo, RepoLanguage, RepoTopic)) as session:
+            self.stdout.write(self.style.NOTICE(
+                f"Bulk load: {session.vendor} fast-load settings applied, "
+                f"{len(session.dropped)} secondary indexes dropped"
+            ))
+            try:
+                self._import(options)
+            finally:
+                self.stdout.write(self.style.NOTICE("Rebuilding language stats and indexes, running ANALYZE ..."))
+                started = time.perf_counter()
+                rebuild_language_year_stats()
+                session.timings['stats_rebuild_s'] = time.perf_counter() - started
+        bump_data_version(ORM)
+        timings = session.timings
+        self.stdout.write(self.style.SUCCESS(
+            f"Bulk load done. import={timings['import_s']:.1f}s, stats_rebuild={timings['stats_rebuild_s']:.1f}s, "
+            f"index_rebuild={timings['index_rebuild_s']:.1f}s, analyze={timings['analyze_s']:.1f}s, "
+            f"total={sum(timings.values()):.1f}s"
+        ))
+
+    def _import(self, options):
         jsonfile = options['jsonfile']
+        if options['bulk'] or options['delta']:
+            return self._handle_bulk(jsonfile, options['chunk_size'], delta=options['delta'])
         self.stdout.write(self.style.NOTICE(f"Loading JSON from {jsonfile} ..."))
         with open(jsonfile, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -38,7 +82,9 @@ class Command(BaseCommand):
         existing_owners = {o.login: o for o in Owner.objects.all()}
         existing_langs = {l.name: l for l in Language.objects.all()}
         existing_topics = {t.name: t for t in Topic.objects.all()}
-        existing_repos = {r.name_with_owner: r for r in Repo.objects.all().only('id', 'name_with_owner')}
+        existing_repos = {
+            r.name_with_owner: r for r in Repo.objects.all().only('id', 'name_with_owner', 'primary_language_id')
+        }
 
         self.stdout.write(self.style.SUCCESS(
             f"Caches loaded: owners={len(existing_owners)}, languages={len(existing_langs)}, topics={len(existing_topics)}, repos={len(existing_repos)}"
@@ -69,31 +115,7 @@ class Command(BaseCommand):
             # get or create repo (cache)
             repo_obj = existing_repos.get(name_with_owner)
             if not repo_obj:
-                repo_kwargs = {
-                    'owner': owner_obj,
-                    'name': name,
-                    'name_with_owner': name_with_owner,
-                    'description': item.get('description'),
-                    'stars': item.get('stars', 0),
-                    'forks': item.get('forks', 0),
-                    'watchers': item.get('watchers', 0),
-                    'issues': item.get('issues', 0),
-                    'pull_requests': item.get('pullRequests', 0),
-                    'disk_usage_kb': item.get('diskUsageKb', 0),
-                    'assignable_user_count': item.get('assignableUserCount', 0),
-                    'default_branch_commit_count': item.get('defaultBranchCommitCount', 0),
-                    'is_fork': item.get('isFork', False),
-                    'is_archived': item.get('isArchived', False),
-                    'forking_allowed': item.get('forkingAllowed', True),
-                    'code_of_conduct': item.get('codeOfConduct'),
-                    'license': item.get('license'),
-                    'created_at': parse_iso(item.get('createdAt')),
-                    'pushed_at': parse_iso(item.get('pushedAt')),
-                    'language_count': item.get('languageCount'),
-                    'created_year': None,
-                }
-                if repo_kwargs['created_at']:
-                    repo_kwargs['created_year'] = repo_kwargs['created_at'].year
+                repo_kwargs = {'owner': owner_obj, **repo_fields(item)}
 
                 try:
                     with transaction.atomic():
@@ -106,9 +128,6 @@ class Command(BaseCommand):
 
                 existing_repos[name_with_owner] = repo_obj
                 created_repos += 1
-            else:
-                # optionally update fields later
-                repo_obj = Repo.objects.get(pk=repo_obj.id)  # fetch full instance when updating
             # primary_language: set foreign key using existing_langs
             primary_lang_name = item.get('primaryLanguage')
             if primary_lang_name:
@@ -168,38 +187,52 @@ class Command(BaseCommand):
         if to_create_repolangs or to_create_reptopics or repos_to_bulk_update:
             self._flush_buffers(to_create_repolangs, to_create_reptopics, list(repos_to_bulk_update.values()))
 
+        # invalidate cached ORM endpoint results
+        bump_data_version(ORM)
         self.stdout.write(self.style.SUCCESS(f"Import done. created_repos={created_repos}, processed={processed}"))
 
+    def _handle_bulk(self, jsonfile, chunk_size, delta=False):
+        mode = 'delta' if delta else 'set-based'
+        self.stdout.write(self.style.NOTICE(f"Streaming {jsonfile} in {mode} mode (chunk={chunk_size}) ..."))
+        importer = BulkRepoImporter(chunk_size=chunk_size, delta=delta, maintain_stats=self.maintain_stats)
+
+        def progress(stats):
+            self.stdout.write(self.style.NOTICE(f"Processed {stats['processed']} items..."))
+
+        try:
+            stats = importer.import_items(iter_repositories(jsonfile), progress=progress)
+        finally:
+            # committed chunks are visible even if a later chunk failed
+            if importer.stats['processed']:
+                bump_data_version(ORM)
+        self.stdout.write(self.style.SUCCESS(
+            f"Import done. upserted_repos={stats['repos_upserted']}, unchanged={stats['unchanged']}, "
+            f"processed={stats['processed']}, "
+            f"repo_languages={stats['repo_languages']}, repo_topics={stats['repo_topics']}"
+        ))
+
     def _flush_buffers(self, rl_buffer, rt_buffer, repos_update_list):
-        # 1) bulk create repo languages
+        # 1) bulk create repo languages (pairs that already exist are skipped) and fold the
+        #    difference into LanguageYearStat
         if rl_buffer:
-            try:
-                RepoLanguage.objects.bulk_create(rl_buffer, batch_size=500)
-            except Exception:
-                for rl in rl_buffer:
-                    try:
-                        rl.save()
-                    except Exception:
-                        continue
+            repo_ids = {rl.repo_id for rl in rl_buffer}
+            stats_before = language_year_totals(repo_id__in=repo_ids) if self.maintain_stats else None
+            RepoLanguage.objects.bulk_create(rl_buffer, batch_size=500, ignore_conflicts=True)
+            if self.maintain_stats:
+                apply_language_year_changes(stats_before, language_year_totals(repo_id__in=repo_ids))
         # 2) bulk create repo topics
         if rt_buffer:
-            try:
-                RepoTopic.objects.bulk_create(rt_buffer, batch_size=500)
-            except Exception:
-                for rt in rt_buffer:
-                    try:
-                        rt.save()
-                    except Exception:
-                        continue
-        # 3) bulk update repos (primary_language, stars, pushed_at etc.)
+            RepoTopic.objects.bulk_create(rt_buffer, batch_size=500, ignore_conflicts=True)
+        # 3) bulk update repos (only primary_language changes here; cached repos are loaded
+        #    with .only(), so touching other fields would fetch each one separately)
         if repos_update_list:
             # dedupe by id
             uniq = {r.id: r for r in repos_update_list}.values()
             try:
-                Repo.objects.bulk_update(list(uniq), ['primary_language', 'stars', 'pushed_at'])
+                Repo.objects.bulk_update(list(uniq), ['primary_language'])
             except Exception:
                 for r in uniq:
                     try:
-                        r.save(update_fields=['primary_language', 'stars', 'pushed_at'])
+                        r.save(update_fields=['primary_language'])
                     except Exception:
                         continue
@@ -1,33 +1,153 @@
 # management/commands/ingest_to_clickhouse.py
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 import json
-from app.services.clickhouse_service import ClickHouseService
+import time
+from app.services.clickhouse_service import STAGING_SUFFIX, ClickHouseService, repository_year
+from app.services.json_stream import iter_repositories, iter_batches
+from app.services.parallel_transform import ParallelTransformer
+from app.services.parallel_ingest import ParallelIngester
+from app.services.ingest_checkpoint import IngestCheckpoint, CheckpointMismatch, default_checkpoint_path
+from app.services.query_cache import CLICKHOUSE, bump_data_version
+from app.services import arrow_ingest
 
 class Command(BaseCommand):
     help = 'GitHub repository ma\'lumotlarini ClickHouse ga import qilish'
 
     def add_arguments(self, parser):
-        parser.add_argument('json_file', type=str, help='JSON fayl yo\'li')
+        parser.add_argument(
+            'json_file',
+            type=str,
+            help='JSON/NDJSON fayl yo\'li yoki Parquet/Arrow IPC fayli (.parquet, .arrow, .feather, .ipc)'
+        )
         parser.add_argument(
             '--batch-size',
             type=int,
             default=5000,
             help='Bir vaqtning o\'zida yuklanadigan repositorylar soni (default: 5000)'
         )
+        parser.add_argument(
+            '--stream',
+            action='store_true',
+            help='Faylni butunlay yuklamasdan, oqim rejimida o\'qish (JSON massiv yoki NDJSON)'
+        )
+        parser.add_argument(
+            '--transform-workers',
+            type=int,
+            default=0,
+            help='Transform bosqichi uchun jarayonlar soni (default: 0 - asosiy jarayonda)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help='Batchlarni shuncha jarayonga taqsimlab yuklash: har bir ishchi o\'zi transform qiladi va '
+                 'o\'z ulanishi orqali yozadi (default: 0 - ketma-ket, bitta ulanish)'
+        )
+        parser.add_argument(
+            '--columnar',
+            action='store_true',
+            help='Ma\'lumotlarni ustunli (columnar) INSERT orqali yuborish'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Checkpoint bilan ishlash: tugallangan batchlar o\'tkazib yuboriladi, '
+                 'qayta yuborilgan bloklar server tomonida deduplikatsiya qilinadi'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default=None,
+            help='Checkpoint fayli yo\'li (default: <json_file>.checkpoint.json, --resume ni yoqadi)'
+        )
+        parser.add_argument(
+            '--replace-years',
+            type=str,
+            default=None,
+            help='Vergul bilan ajratilgan yillar (masalan 2019,2020): fayldagi faqat shu yillar staging '
+                 'jadvallarga yuklanadi va REPLACE PARTITION bilan almashtiriladi, boshqa yillar o\'zgarmaydi'
+        )
+        parser.add_argument(
+            '--delta',
+            action='store_true',
+            help='Faqat yangi va o\'zgargan repositorylarni yozish: har repo fingerprinti oxirgi yuklangani '
+                 'bilan solishtiriladi, o\'zgarmaganlari transform qilinmaydi (birinchi ishga tushirish hammasini yozadi)'
+        )
 
     def handle(self, *args, **options):
         json_file = options['json_file']
         batch_size = options['batch_size']
+        stream = options['stream']
+        transform_workers = options['transform_workers']
+        workers = options['workers']
+        columnar = options['columnar']
+        delta = options['delta']
+        checkpoint_path = options['checkpoint'] or (default_checkpoint_path(json_file) if options['resume'] else None)
+        transformer = None
+        ingester = None
+        ingest_failed = True
+        loaded_batches = 0
+        replace_years = None
+        staging_created = False
+        arrow_input = arrow_ingest.is_arrow_file(json_file)
+
+        if arrow_input and arrow_ingest.pa is None:
+            raise CommandError('Parquet/Arrow fayllari uchun pyarrow o\'rnatilishi kerak')
+
+        if workers > 0 and transform_workers > 0:
+            # Ishchilar batchni o'zi transform qiladi
+            raise CommandError('--workers ni --transform-workers bilan birga ishlatib bo\'lmaydi')
+
+        if delta and (arrow_input or workers > 0 or transform_workers > 0 or options['replace_years'] or checkpoint_path):
+            # Fingerprintlar batch ichida solishtiriladi va yoziladi: qayta ishga tushirish o'zi davom ettiradi
+            raise CommandError('--delta faqat JSON/NDJSON fayl bilan, --workers, --transform-workers, '
+                               '--replace-years va --resume/--checkpoint siz ishlatiladi')
+
+        if options['replace_years']:
+            try:
+                replace_years = sorted({int(year) for year in options['replace_years'].split(',') if year.strip()})
+            except ValueError:
+                raise CommandError('--replace-years: yillar butun son bo\'lishi kerak (masalan 2019,2020)')
+            if checkpoint_path:
+                # Staging jadvallar har ishga tushishda qaytadan yaratiladi: davom ettirish ma'nosiz
+                raise CommandError('--replace-years ni --resume/--checkpoint bilan birga ishlatib bo\'lmaydi')
         
         self.stdout.write(f'📂 Fayl o\'qilyapti: {json_file}')
         
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            total = len(data)
-            self.stdout.write(f'📊 {total} ta repository topildi')
+            checkpoint = None
+            if checkpoint_path:
+                try:
+                    checkpoint = IngestCheckpoint(checkpoint_path, json_file, batch_size)
+                except CheckpointMismatch as e:
+                    self.stdout.write(self.style.ERROR(f'❌ {e}'))
+                    return
+                if checkpoint.resumed:
+                    self.stdout.write(f'♻️  Checkpoint: {len(checkpoint.completed)} ta batch avval yuklangan, o\'tkazib yuboriladi')
+                else:
+                    self.stdout.write(f'📝 Checkpoint: {checkpoint_path}')
+
+            if arrow_input:
+                # Parquet/Arrow: record batchlar ustunli o'qiladi, JSON parse va dictlar yo'q
+                total = arrow_ingest.count_rows(json_file)
+                batches = arrow_ingest.iter_record_batches(json_file, batch_size)
+                self.stdout.write('🏹 Parquet/Arrow kiritish (ustunli)' + (f': {total} ta repository' if total is not None else ''))
+                if transform_workers > 0 and workers == 0:
+                    self.stdout.write(self.style.WARNING('⚠️  --transform-workers Parquet/Arrow uchun ishlatilmaydi'))
+                    transform_workers = 0
+            elif stream:
+                # Oqim rejimi: xotira faqat bitta batch hajmiga bog'liq
+                total = None
+                batches = iter_batches(iter_repositories(json_file), batch_size)
+                self.stdout.write('🌊 Oqim rejimi yoqildi')
+            else:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+
+                total = len(data)
+                batches = (data[i:i + batch_size] for i in range(0, total, batch_size))
+                self.stdout.write(f'📊 {total} ta repository topildi')
             self.stdout.write(f'⚙️  Batch size: {batch_size}')
             
             # ClickHouse serviceini yaratish
@@ -36,27 +156,198 @@ class Command(BaseCommand):
             self.stdout.write('⏳ ClickHouse Database va jadvallari yaratilmoqda/tekshirilmoqda...')
             ch_service.create_database_and_table()
             self.stdout.write(self.style.SUCCESS('✅ Database va jadvallar tayyor'))
+
+            versioned = ch_service.has_versioned_tables()
+            if versioned:
+                # Oldingi ingest yozuv o'rtasida uzilgan bo'lsa, u belgilagan yillar rollupi hali eski
+                recovered = ch_service.refresh_pending_rollup()
+                if recovered:
+                    self.stdout.write(f'♻️  Uzilgan ingest yillari rollupi yangilandi: {", ".join(map(str, recovered))}')
+
+            if delta:
+                if not versioned:
+                    self.stdout.write(self.style.ERROR(
+                        '❌ Jadvallar ReplacingMergeTree emas. Avval: python manage.py migrate_clickhouse'
+                    ))
+                    return
+                self.stdout.write('🔍 Delta rejimi: o\'zgarmagan repositorylar o\'tkazib yuboriladi')
+
+            # Versiyali jadvallarga qayta yozilgan repo rollupga view orqali yana qo'shiladi: yillar
+            # yozuvdan oldin belgilanib, oxirida qayta hisoblanadi (--replace-years rollupni staging dan oladi)
+            mark_rollup = versioned and replace_years is None
+            suffix = ''
+            if replace_years is not None:
+                if not ch_service.is_partitioned_by_year():
+                    self.stdout.write(self.style.ERROR(
+                        '❌ Jadvallar created_year bo\'yicha partitionlanmagan. Avval: python manage.py migrate_clickhouse'
+                    ))
+                    return
+                ch_service.create_staging_tables()
+                staging_created = True
+                suffix = STAGING_SUFFIX
+                self.stdout.write(f'🗂️  Almashtiriladigan yillar: {", ".join(map(str, replace_years))} (staging jadvallar orqali)')
+
+            skipped = 0
+            other_years = 0
+
+            def in_replace_years(repo):
+                try:
+                    return repository_year(repo) in replace_years
+                except (KeyError, TypeError, ValueError):
+                    # Yili aniqlanmagan repo transform bosqichida xatolik sifatida hisoblanadi
+                    return True
+
+            def pending_batches():
+                # Checkpointda tugallangan deb belgilangan batchlar qayta yuklanmaydi
+                nonlocal skipped, other_years
+                for batch_num, batch in enumerate(batches, start=1):
+                    if checkpoint is not None and checkpoint.is_done(batch_num):
+                        skipped += len(batch)
+                        continue
+                    if replace_years is not None and arrow_input:
+                        selected = arrow_ingest.filter_years(batch, replace_years)
+                        other_years += len(batch) - len(selected)
+                        if not len(selected):
+                            continue
+                        batch = selected
+                    elif replace_years is not None:
+                        selected = [repo for repo in batch if in_replace_years(repo)]
+                        other_years += len(batch) - len(selected)
+                        if not selected:
+                            continue
+                        batch = selected
+                    yield batch_num, batch
+
+            if workers > 0:
+                ingester = ParallelIngester(workers, columnar=columnar, arrow=arrow_input, suffix=suffix,
+                                            mark_rollup=mark_rollup)
+                self.stdout.write(f'👷 Ishchi jarayonlar: {workers} (har biri o\'z ulanishi bilan)')
+            elif arrow_input:
+                blocks = (
+                    (batch_num, batch, arrow_ingest.batch_to_block(batch))
+                    for batch_num, batch in pending_batches()
+                )
+            elif transform_workers > 0:
+                # Keyingi batch ishchilarda transform qilinayotganda joriy blok yoziladi
+                transformer = ParallelTransformer(transform_workers, columnar=columnar)
+                blocks = transformer.transform_batches(pending_batches())
+                self.stdout.write(f'🧮 Transform ishchilari: {transform_workers}')
+            else:
+                blocks = ((batch_num, batch, None) for batch_num, batch in pending_batches())
             
             # Batch qilib yuklash
-            for i in range(0, total, batch_size):
-                batch = data[i:i + batch_size]
-                batch_num = (i // batch_size) + 1
-                total_batches = (total + batch_size - 1) // batch_size
-                
-                self.stdout.write(f'\n⏳ Batch {batch_num}/{total_batches} yuklanmoqda ({len(batch)} ta repository)...')
+            processed = 0
+            errors = 0
+            failed_batches = 0
+            written = 0
+            unchanged = 0
+            touched_years = set()
+            started = time.perf_counter()
+            if ingester is not None:
+                tasks = (
+                    (batch_num, batch, checkpoint.dedup_token(batch_num) if checkpoint is not None else None)
+                    for batch_num, batch in pending_batches()
+                )
+                blocks = ()
+                total_batches = (total + batch_size - 1) // batch_size if total is not None else None
+                # Natijalar batchlar yuborilgan tartibda keladi: checkpoint ketma-ket yoziladi
+                for result in ingester.ingest(tasks):
+                    processed += result.rows
+                    label = f'{result.batch_num}/{total_batches}' if total_batches is not None else result.batch_num
+                    if result.error is not None:
+                        failed_batches += 1
+                        self.stdout.write(self.style.ERROR(
+                            f'❌ Batch {label} da xatolik (ishchi {result.worker}): {result.error}'
+                        ))
+                        continue
+                    errors += result.error_count
+                    if checkpoint is not None:
+                        checkpoint.mark_done(result.batch_num)
+                    loaded_batches += 1
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✅ Batch {label} yuklandi ({result.rows} ta repository, ishchi {result.worker}, jami {processed})'
+                    ))
+
+            for batch_num, batch, block in blocks:
+                processed += len(batch)
+                if total is not None:
+                    total_batches = (total + batch_size - 1) // batch_size
+                    self.stdout.write(f'\n⏳ Batch {batch_num}/{total_batches} yuklanmoqda ({len(batch)} ta repository)...')
+                else:
+                    self.stdout.write(f'\n⏳ Batch {batch_num} yuklanmoqda ({len(batch)} ta repository, jami {processed})...')
                 
+                dedup_token = checkpoint.dedup_token(batch_num) if checkpoint is not None else None
                 try:
-                    ch_service.insert_repository_date(batch)
+                    if delta:
+                        result = ch_service.insert_changed(batch, columnar=columnar)
+                        errors += result.error_count
+                        written += result.written
+                        unchanged += result.unchanged
+                        touched_years |= result.years
+                        self.stdout.write(f'   {result.written} ta yangi/o\'zgargan, {result.unchanged} ta o\'zgarmagan')
+                    elif block is None:
+                        errors += ch_service.insert_repository_date(
+                            batch, columnar=columnar, dedup_token=dedup_token, suffix=suffix, mark_rollup=mark_rollup
+                        ) or 0
+                    else:
+                        errors += block.error_count
+                        ch_service.insert_block(block, dedup_token=dedup_token, suffix=suffix, mark_rollup=mark_rollup)
+                    if checkpoint is not None:
+                        checkpoint.mark_done(batch_num)
+                    loaded_batches += 1
                     self.stdout.write(self.style.SUCCESS(f'✅ Batch {batch_num} muvaffaqiyatli yuklandi'))
                 except Exception as e:
+                    failed_batches += 1
                     self.stdout.write(self.style.ERROR(f'❌ Batch {batch_num} da xatolik: {e}'))
                     # Xatolik bo'lsa ham davom etish
             
+            if mark_rollup:
+                # Muvaffaqiyatsiz batchlar yillari ham belgilangan: qisman yozilgan qatorlar ham hisobga olinadi
+                self.stdout.write('⏳ Rollup yangilanmoqda...')
+                refreshed = ch_service.refresh_pending_rollup(touched_years)
+                if refreshed:
+                    self.stdout.write(self.style.SUCCESS(f'✅ Rollup yangilandi: {", ".join(map(str, refreshed))}'))
+
+            if replace_years is not None:
+                if failed_batches:
+                    # Qisman yuklangan yil partitioni to'liq ma'lumotni almashtirmasligi kerak. Uch jadvaldan
+                    # istalgan biriga yozilmagan batch (masalan faqat topics xatosi) ham muvaffaqiyatsiz hisoblanadi
+                    self.stdout.write(self.style.ERROR(
+                        f'❌ {failed_batches} ta batch yuklanmadi: partitionlar almashtirilmadi, mavjud ma\'lumot o\'zgarmadi'
+                    ))
+                else:
+                    replaced = ch_service.replace_years_from_staging(replace_years)
+                    for year in replace_years:
+                        if year in replaced:
+                            self.stdout.write(self.style.SUCCESS(f'🔁 {year}: {replaced[year]} ta repository bilan almashtirildi'))
+                        else:
+                            self.stdout.write(self.style.WARNING(f'⚠️  {year}: faylda bu yil uchun repository yo\'q, o\'zgartirilmadi'))
+                self.stdout.write(f'   - Boshqa yillar (o\'tkazib yuborildi): {other_years}')
+
+            elapsed = time.perf_counter() - started
+            ingest_failed = False
+
             # Yakuniy statistika
             total_in_db = ch_service.get_repository_count()
             self.stdout.write(self.style.SUCCESS(f'\n🎉 Import yakunlandi!'))
-            self.stdout.write(self.style.SUCCESS(f'   - Faylda: {total}'))
+            self.stdout.write(self.style.SUCCESS(f'   - Faylda: {processed}'))
             self.stdout.write(self.style.SUCCESS(f'   - Bazada: {total_in_db}'))
+            self.stdout.write(self.style.SUCCESS(f'   - Transform xatoliklari: {errors}'))
+            if delta:
+                self.stdout.write(self.style.SUCCESS(f'   - Yozildi (yangi/o\'zgargan): {written}'))
+                self.stdout.write(self.style.SUCCESS(f'   - O\'zgarmagan (o\'tkazib yuborildi): {unchanged}'))
+            if elapsed > 0:
+                self.stdout.write(self.style.SUCCESS(
+                    f'   - Yuklash vaqti: {elapsed:.1f} s ({processed / elapsed:.0f} repository/s)'
+                ))
+            if checkpoint is not None:
+                self.stdout.write(self.style.SUCCESS(f'   - Checkpoint bo\'yicha o\'tkazib yuborildi: {skipped}'))
+                if failed_batches:
+                    self.stdout.write(self.style.WARNING(
+                        f'⚠️  {failed_batches} ta batch yuklanmadi. Buyruqni qayta ishga tushiring - faqat ular yuklanadi.'
+                    ))
+                else:
+                    checkpoint.finish()
             
         except FileNotFoundError:
             self.stdout.write(self.style.ERROR(f'❌ Fayl topilmadi: {json_file}'))
@@ -65,4 +356,14 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'❌ Umumiy xatolik: {e}'))
             import traceback
-            traceback.print_exc()
\ No newline at end of file
+            traceback.print_exc()
+        finally:
+            if transformer is not None:
+                transformer.close()
+            if ingester is not None:
+                ingester.close(abort=ingest_failed)
+            if staging_created:
+                ch_service.drop_staging_tables()
+            # Qisman yuklangan import ham ma'lumotni o'zgartiradi: API keshi eskiradi
+            if loaded_batches:
+                bump_data_version(CLICKHOUSE)
\ No newline at end of file
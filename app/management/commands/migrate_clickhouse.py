@@ -0,0 +1,51 @@
+# app/management/commands/migrate_clickhouse.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.services.clickhouse_migrations import MigrationError, MigrationRunner, load_migrations
+from app.services.query_cache import CLICKHOUSE, bump_data_version
+
+
+class Command(BaseCommand):
+    help = (
+        "app/clickhouse_migrations dagi raqamlangan ClickHouse migratsiyalarini qo'llaydi "
+        "(qo'llanganlari github_analytics.schema_migrations da saqlanadi)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--list', action='store_true', help="Migratsiyalar va ularning holatini ko'rsatish")
+        parser.add_argument('--target', type=int, default=None, help="Shu versiyagacha (shu jumladan) qo'llash")
+        parser.add_argument('--fake', action='store_true',
+                            help="Qadamlarni bajarmasdan qo'llangan deb belgilash (sxema qo'lda yaratilgan bo'lsa)")
+
+    def handle(self, *args, **options):
+        runner = MigrationRunner()
+
+        try:
+            if options['list']:
+                applied = runner.applied()
+                for migration in load_migrations():
+                    if migration.version in applied:
+                        self.stdout.write(f"[X] {migration.name}  ({applied[migration.version][1]})")
+                    else:
+                        self.stdout.write(f"[ ] {migration.name}")
+                return
+
+            pending = runner.plan(options['target'])
+            if not pending:
+                self.stdout.write(self.style.SUCCESS("✅ Qo'llanmagan ClickHouse migratsiyalari yo'q"))
+                return
+
+            def progress(migration, operation):
+                self.stdout.write(f"⏳ {migration.name}: {operation.describe()}")
+
+            for migration in pending:
+                runner.apply(migration, fake=options['fake'], progress=progress)
+                suffix = ' (fake)' if options['fake'] else ''
+                self.stdout.write(self.style.SUCCESS(f"✅ {migration.name}{suffix}"))
+        except MigrationError as e:
+            raise CommandError(str(e))
+        finally:
+            # Qayta qurilgan jadvallar boshqa natija bermasa ham keshlangan javoblar eskirgan deb hisoblanadi
+            if not options['list'] and not options['fake']:
+                bump_data_version(CLICKHOUSE)
@@ -0,0 +1,172 @@
+# management/commands/rebuild_clickhouse_schema.py
+
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.services.clickhouse_schema import (
+    BASE_TABLES,
+    SCHEMA_PROFILES,
+    TABLES,
+    get_schema_profile,
+    rebuild_table,
+    table_ddl,
+    table_storage,
+)
+from app.services.clickhouse_service import LANGUAGE_STATISTICS_QUERY, ClickHouseService
+from app.services.query_cache import CLICKHOUSE, bump_data_version
+
+REBUILDABLE_TABLES = BASE_TABLES + ('language_year_rollup',)
+
+# Xom jadvallar bo'yicha namunaviy so'rovlar: sxema o'zgarishi o'qish tezligiga ta'siri
+BENCHMARK_QUERIES = {
+    'languages_by_year': '''
+        SELECT created_year, language, sum(size)
+        FROM github_analytics.repository_languages
+        GROUP BY created_year, language
+    ''',
+    'license_counts': '''
+        SELECT license, count()
+        FROM github_analytics.repositories
+        GROUP BY license
+    ''',
+    'primary_language_stars': '''
+        SELECT primary_language, avg(stars), max(stars)
+        FROM github_analytics.repositories
+        GROUP BY primary_language
+    ''',
+    'pushed_by_month': '''
+        SELECT toStartOfMonth(pushed_at) AS month, count()
+        FROM github_analytics.repositories
+        GROUP BY month
+    ''',
+    'top_topics': '''
+        SELECT topic, count(), sum(repo_stars)
+        FROM github_analytics.repository_topics
+        GROUP BY topic
+        ORDER BY count() DESC
+        LIMIT 20
+    ''',
+    'language_statistics': LANGUAGE_STATISTICS_QUERY,
+}
+
+
+def _time_queries(service: ClickHouseService, repeat: int) -> dict:
+    timings = {}
+    for name, query in BENCHMARK_QUERIES.items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            # Sinov so'rovlari server query cache dan o'qimasligi kerak
+            service._execute(query, settings={'use_query_cache': 0}, name=f'schema_bench:{name}')
+            samples.append(time.perf_counter() - started)
+        timings[name] = round(statistics.median(samples) * 1000, 2)
+    return timings
+
+
+def _ratio(before: int, after: int):
+    return round(after / before, 3) if before else None
+
+
+class Command(BaseCommand):
+    help = (
+        "ClickHouse jadvallarini boshqa sxema profiliga (default/compact) qayta quradi "
+        "(soya jadval + INSERT SELECT + EXCHANGE) va oldin/keyin hajm va so'rov vaqti hisobotini beradi"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=SCHEMA_PROFILES, default=None,
+                            help="Maqsad profil (default: CLICKHOUSE_SETTINGS['schema_profile'])")
+        parser.add_argument('--tables', default=','.join(REBUILDABLE_TABLES),
+                            help=f"Vergul bilan ajratilgan jadvallar: {', '.join(REBUILDABLE_TABLES)}")
+        parser.add_argument('--repeat', type=int, default=5, help="Har bir sinov so'rovi necha marta bajariladi")
+        parser.add_argument('--keep-old', action='store_true',
+                            help="Eski jadval <nom>__rebuild sifatida saqlab qolinadi")
+        parser.add_argument('--dry-run', action='store_true', help="Faqat DDL ni chiqarish")
+        parser.add_argument('--output', help='JSON hisobotni faylga ham yozish')
+
+    def handle(self, *args, **options):
+        profile = options['profile'] or get_schema_profile()
+        tables = [name.strip() for name in options['tables'].split(',') if name.strip()]
+        unknown = set(tables) - set(REBUILDABLE_TABLES)
+        if unknown:
+            raise CommandError(f"Noma'lum jadval(lar): {', '.join(sorted(unknown))}")
+
+        if options['dry_run']:
+            for table in tables:
+                self.stdout.write(table_ddl(table, profile))
+            return
+
+        service = ClickHouseService()
+        service.create_database_and_table()
+
+        self.stdout.write("⏳ Oldingi holat o'lchanmoqda...")
+        before_storage = {table: table_storage(service, table) for table in tables}
+        before_queries = _time_queries(service, options['repeat'])
+
+        rebuilt = 0
+        try:
+            for table in tables:
+                self.stdout.write(f"⏳ {table} '{profile}' profiliga o'tkazilmoqda...")
+                copied = rebuild_table(service, table, profile, keep_old=options['keep_old'])
+                if copied is None:
+                    self.stdout.write(f"➖ {table} allaqachon '{profile}' tuzilishida")
+                    continue
+                # Aggregating/ReplacingMergeTree yozishda bir xil kalitli qatorlarni birlashtiradi: qatorlar soni o'zgaradi
+                if TABLES[table].engine.startswith('MergeTree') and copied != before_storage[table]['rows']:
+                    self.stdout.write(self.style.WARNING(
+                        f"⚠️  {table}: {before_storage[table]['rows']} qatordan {copied} tasi ko'chirildi "
+                        f"(qayta qurish paytida yozuv bo'lganmi?)"
+                    ))
+                self.stdout.write(self.style.SUCCESS(f"✅ {table}: {copied} qator"))
+                rebuilt += 1
+        finally:
+            # Almashtirilgan jadvallar (xatolikdan oldingilari ham) boshqa tuzilishda: keshlangan javoblar eskiradi
+            if rebuilt:
+                bump_data_version(CLICKHOUSE)
+
+        self.stdout.write("⏳ Keyingi holat o'lchanmoqda...")
+        after_storage = {table: table_storage(service, table) for table in tables}
+        after_queries = _time_queries(service, options['repeat'])
+
+        report = {'profile': profile, 'tables': {}, 'queries_ms': {}}
+        for table in tables:
+            before, after = before_storage[table], after_storage[table]
+            report['tables'][table] = {
+                'rows': after['rows'],
+                'compressed_bytes': {'before': before['compressed_bytes'], 'after': after['compressed_bytes'],
+                                     'ratio': _ratio(before['compressed_bytes'], after['compressed_bytes'])},
+                'uncompressed_bytes': {'before': before['uncompressed_bytes'],
+                                       'after': after['uncompressed_bytes']},
+                'columns': {
+                    name: {
+                        'type': {'before': before['columns'].get(name, {}).get('type'), 'after': column['type']},
+                        'compressed_bytes': {
+                            'before': before['columns'].get(name, {}).get('compressed_bytes'),
+                            'after': column['compressed_bytes'],
+                        },
+                    }
+                    for name, column in after['columns'].items()
+                },
+            }
+            self.stdout.write(
+                f"📦 {table}: {before['compressed_bytes']} -> {after['compressed_bytes']} bayt "
+                f"(x{_ratio(before['compressed_bytes'], after['compressed_bytes'])})"
+            )
+        for name in BENCHMARK_QUERIES:
+            report['queries_ms'][name] = {'before': before_queries[name], 'after': after_queries[name]}
+            self.stdout.write(f"⏱️  {name}: {before_queries[name]} ms -> {after_queries[name]} ms")
+
+        if profile != get_schema_profile():
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  settings.CLICKHOUSE_SETTINGS['schema_profile'] ni '{profile}' ga o'zgartiring: "
+                f"yangi o'rnatishlar ham shu sxema bilan yaratilsin"
+            ))
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(payload + '\n')
+        self.stdout.write(payload)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from app.services.language_stats import rebuild_language_year_stats
+from app.services.query_cache import ORM, bump_data_version
+
+
+class Command(BaseCommand):
+    help = "Recompute the LanguageYearStat summary table from RepoLanguage (after manual edits or a failed import)"
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE("Rebuilding LanguageYearStat ..."))
+        rows = rebuild_language_year_stats()
+        bump_data_version(ORM)
+        self.stdout.write(self.style.SUCCESS(f"Rebuild done. rows={rows}"))
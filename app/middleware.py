@@ -0,0 +1,42 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from app.services.metrics import HTTP_DURATION
+
+
+class MetricsMiddleware:
+    """
+    Har bir so'rov vaqtini endpoint (URL nomi), method va status bo'yicha
+    histogrammaga yozadi. Sinxron va asinxron viewlar bilan ham ishlaydi.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def _observe(request, response, elapsed: float):
+        match = getattr(request, 'resolver_match', None)
+        # URL nomi bo'lmasa (404 va h.k.) path label qilinmaydi: kardinallik cheklanadi
+        endpoint = (match.view_name if match else None) or 'unmatched'
+        HTTP_DURATION.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
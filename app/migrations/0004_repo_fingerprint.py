@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_rename_app_repo_created_6bb857_idx_app_repo_created_734513_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='repo',
+            name='fingerprint',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_language_year_stats(apps, schema_editor):
+    # existing RepoLanguage rows; later imports keep the table current
+    RepoLanguage = apps.get_model('app', 'RepoLanguage')
+    LanguageYearStat = apps.get_model('app', 'LanguageYearStat')
+    rows = (
+        RepoLanguage.objects
+        .filter(repo__created_year__isnull=False)
+        .values_list('repo__created_year', 'language_id')
+        .annotate(total_size=Sum('size'), repo_count=Count('id'))
+        .order_by()
+    )
+    LanguageYearStat.objects.bulk_create(
+        [
+            LanguageYearStat(year=year, language_id=language_id, total_size=size or 0, repo_count=count)
+            for year, language_id, size, count in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_repo_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LanguageYearStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('total_size', models.BigIntegerField(default=0)),
+                ('repo_count', models.IntegerField(default=0)),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='year_stats', to='app.language')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', '-total_size'], name='app_languag_year_033e42_idx')],
+                'unique_together': {('year', 'language')},
+            },
+        ),
+        migrations.RunPython(backfill_language_year_stats, migrations.RunPython.noop),
+    ]
@@ -38,6 +38,8 @@ class Repo(models.Model):
     code_of_conduct = models.CharField(max_length=255, null=True)
     forking_allowed = models.BooleanField(null=True)
     created_year = models.IntegerField(db_index=True, null=True)
+    # hash of the source record (services.fingerprint); unchanged records are skipped by import_repos --delta
+    fingerprint = models.BigIntegerField(null=True, blank=True)
 
     class Meta:
         indexes = [
@@ -77,3 +79,19 @@ class RepoTopic(models.Model):
 
     def __str__(self):
         return f"{self.repo} - {self.topic}"
+
+class LanguageYearStat(models.Model):
+    """Per-year language totals over RepoLanguage, kept current by import_repos (services.language_stats)."""
+    year = models.IntegerField()
+    language = models.ForeignKey(Language, on_delete=models.CASCADE, related_name='year_stats')
+    total_size = models.BigIntegerField(default=0)
+    repo_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('year', 'language')
+        indexes = [
+            models.Index(fields=['year', '-total_size']),
+        ]
+
+    def __str__(self):
+        return f"{self.year} - {self.language} ({self.total_size})"
@@ -0,0 +1,187 @@
+# services/arrow_ingest.py
+
+from array import array
+from typing import Iterator, List, Optional, Sequence
+
+from app.services.clickhouse_service import (
+    LANGUAGE_COLUMNS,
+    REPOSITORY_COLUMNS,
+    TOPIC_COLUMNS,
+    ColumnarBlock,
+)
+
+try:
+    # Parquet/Arrow kiritish ixtiyoriy: pyarrow (va uning to_numpy uchun numpy) kerak
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+ARROW_EXTENSIONS = ('.parquet', '.arrow', '.feather', '.ipc')
+
+# repositories ustuni -> JSON/Parquet maydoni (fayl JSON eksporti bilan bir xil nomlarda)
+SOURCE_FIELDS = {
+    'owner': 'owner',
+    'name': 'name',
+    'name_with_owner': 'nameWithOwner',
+    'description': 'description',
+    'stars': 'stars',
+    'forks': 'forks',
+    'watchers': 'watchers',
+    'is_fork': 'isFork',
+    'is_archived': 'isArchived',
+    'language_count': 'languageCount',
+    'topic_count': 'topicCount',
+    'disk_usage_kb': 'diskUsageKb',
+    'pull_requests': 'pullRequests',
+    'issues': 'issues',
+    'primary_language': 'primaryLanguage',
+    'default_branch_commit_count': 'defaultBranchCommitCount',
+    'license': 'license',
+    'assignable_user_count': 'assignableUserCount',
+    'code_of_conduct': 'codeOfConduct',
+    'forking_allowed': 'forkingAllowed',
+}
+
+# Bu maydonlarsiz qator yaroqsiz (JSON yo'lida KeyError bilan xato sanaladi)
+REQUIRED_FIELDS = ('nameWithOwner', 'createdAt', 'pushedAt')
+
+
+def is_arrow_file(path: str) -> bool:
+    return path.lower().endswith(ARROW_EXTENSIONS)
+
+
+def count_rows(path: str) -> Optional[int]:
+    """Parquet metadata dan qatorlar soni (IPC oqimi uchun None)."""
+    if path.lower().endswith('.parquet'):
+        return pq.ParquetFile(path).metadata.num_rows
+    return None
+
+
+def iter_record_batches(path: str, batch_size: int) -> Iterator['pa.RecordBatch']:
+    if path.lower().endswith('.parquet'):
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_size)
+        return
+    with pa.memory_map(path) as source:
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            source.seek(0)
+            batches = iter(pa.ipc.open_stream(source))
+        # IPC fayl batchlari yozuvchi tanlagan hajmda: batch_size ga qayta bo'linadi
+        pending = None
+        for batch in batches:
+            table = pa.Table.from_batches([batch])
+            if pending is not None:
+                table = pa.concat_tables([pending, table])
+            while table.num_rows >= batch_size:
+                yield from table.slice(0, batch_size).combine_chunks().to_batches()
+                table = table.slice(batch_size)
+            pending = table
+        if pending is not None and pending.num_rows:
+            yield from pending.combine_chunks().to_batches()
+
+
+def _field(batch, name: str):
+    index = batch.schema.get_field_index(name)
+    return batch.column(index) if index >= 0 else pa.nulls(batch.num_rows)
+
+
+def _strings(values) -> List[str]:
+    return pc.fill_null(values.cast(pa.string()), '').to_pylist()
+
+
+def _numbers(values, typecode: str) -> array:
+    # Arrow buferidan to'g'ridan-to'g'ri array ga (Python int obyektlarisiz)
+    column = array(typecode)
+    if len(values):
+        numeric = pc.fill_null(values.cast(pa.int64()), 0).to_numpy(zero_copy_only=False)
+        column.frombytes(np.ascontiguousarray(numeric, dtype=f'u{column.itemsize}').tobytes())
+    return column
+
+
+def _timestamps(values):
+    if not pa.types.is_timestamp(values.type):
+        values = values.cast(pa.string())
+    return values.cast(pa.timestamp('s', tz='UTC'))
+
+
+def _list_rows(values, parent_columns: Sequence, field_names: Sequence[str], spec) -> List:
+    """list<struct> ustunini qatorlarga yoyadi; ota qator qiymatlari ``take`` bilan takrorlanadi."""
+    if pa.types.is_null(values.type) or pa.types.is_null(values.type.value_type):
+        return [array(typecode) if typecode else [] for _, typecode in spec]
+    parents = pc.list_parent_indices(values)
+    items = pc.list_flatten(values)
+    columns = [pc.take(column, parents) for column in parent_columns[:1]]
+    item_type = items.type
+    for field_name in field_names:
+        if item_type.get_field_index(field_name) >= 0:
+            columns.append(pc.struct_field(items, field_name))
+        else:
+            columns.append(pa.nulls(len(items)))
+    columns.extend(pc.take(column, parents) for column in parent_columns[1:])
+    return [
+        _numbers(column, typecode) if typecode else _strings(column)
+        for column, (_, typecode) in zip(columns, spec)
+    ]
+
+
+def filter_years(batch, years: Sequence[int]):
+    """Faqat createdAt yili ``years`` da bo'lgan qatorlar (yili o'qilmaydiganlari xato sifatida qoladi)."""
+    created_year = pc.year(_timestamps(_field(batch, 'createdAt')))
+    selected = pc.is_in(created_year, value_set=pa.array(list(years), type=created_year.type))
+    return batch.filter(pc.or_kleene(selected, pc.is_null(created_year)))
+
+
+def batch_to_block(batch) -> ColumnarBlock:
+    """
+    Record batchni ``ColumnarBlock`` ga aylantiradi: hisoblashlar Arrow
+    ustunlarida (pyarrow.compute), tillar va topiclar ``list_flatten`` bilan
+    yoyiladi, repository uchun Python dict yaratilmaydi. Majburiy maydonlari
+    bo'sh qatorlar xato sifatida sanaladi.
+    """
+    rows = batch.num_rows
+    valid = None
+    for name in REQUIRED_FIELDS:
+        mask = pc.is_valid(_field(batch, name))
+        valid = mask if valid is None else pc.and_(valid, mask)
+    error_count = rows - pc.sum(valid.cast(pa.int64())).as_py() if rows else 0
+    if error_count:
+        batch = batch.filter(valid)
+
+    created_at = _timestamps(_field(batch, 'createdAt'))
+    created_year = pc.year(created_at)
+
+    computed = {
+        'created_at': created_at.cast(pa.int64()),
+        'pushed_at': _timestamps(_field(batch, 'pushedAt')).cast(pa.int64()),
+        'created_year': created_year,
+        'created_date': created_at.cast(pa.date32()).cast(pa.int32()),
+        'has_parent': pc.is_valid(_field(batch, 'parent')),
+    }
+    source = {
+        name: computed[name] if name in computed else _field(batch, SOURCE_FIELDS[name])
+        for name, _ in REPOSITORY_COLUMNS
+    }
+    repositories = [
+        _numbers(source[name], typecode) if typecode else _strings(source[name])
+        for name, typecode in REPOSITORY_COLUMNS
+    ]
+
+    name_with_owner = source['name_with_owner']
+    languages = _list_rows(
+        _field(batch, 'languages'),
+        [name_with_owner, created_year, source['stars'], source['forks']],
+        ('name', 'size'),
+        LANGUAGE_COLUMNS,
+    )
+    topics = _list_rows(
+        _field(batch, 'topics'),
+        [name_with_owner, created_year, source['stars']],
+        ('name', 'stars'),
+        TOPIC_COLUMNS,
+    )
+    return ColumnarBlock(repositories, languages, topics, error_count)
@@ -0,0 +1,130 @@
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# Session settings applied for the duration of a bulk load, per backend vendor.
+# SQLite: WAL journal, no fsync per commit, 256 MB page cache, temp b-trees in memory.
+SQLITE_PRAGMAS: Dict[str, str] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'OFF',
+    'cache_size': '-262144',
+    'temp_store': 'MEMORY',
+}
+# PostgreSQL: commits return before the WAL flush, index rebuilds get more sort memory.
+POSTGRES_SETTINGS: Dict[str, str] = {
+    'synchronous_commit': 'off',
+    'maintenance_work_mem': "'512MB'",
+}
+
+
+class BulkLoadSession:
+    """
+    Context manager that prepares ``models``' tables for a large import.
+
+    On enter it applies the fast-load settings above and drops every
+    non-unique secondary index (unique and primary key indexes stay, the
+    importers' upserts and conflict checks rely on them). On exit, also
+    after a failure, it recreates the dropped indexes from their recorded
+    definitions, runs ANALYZE on the tables and restores the settings.
+    Index dropping is supported on SQLite and PostgreSQL; on other
+    backends the tables are only analyzed.
+    """
+
+    def __init__(self, models: Sequence, using: str = DEFAULT_DB_ALIAS, drop_indexes: bool = True):
+        self.connection = connections[using]
+        self.tables = [model._meta.db_table for model in models]
+        self.drop_indexes = drop_indexes
+        self.vendor = self.connection.vendor
+        self.dropped: List[Tuple[str, str]] = []  # (index name, CREATE INDEX statement)
+        self._restore: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+
+    def __enter__(self):
+        self._apply_settings()
+        if self.drop_indexes:
+            self._drop_indexes()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timings['import_s'] = time.perf_counter() - self._started
+        try:
+            started = time.perf_counter()
+            self._create_indexes()
+            self.timings['index_rebuild_s'] = time.perf_counter() - started
+            started = time.perf_counter()
+            self._analyze()
+            self.timings['analyze_s'] = time.perf_counter() - started
+        finally:
+            self._restore_settings()
+        return False
+
+    def _quote(self, name: str) -> str:
+        return self.connection.ops.quote_name(name)
+
+    def _apply_settings(self):
+        with self.connection.cursor() as cursor:
+            if self.vendor == 'sqlite':
+                for pragma, value in SQLITE_PRAGMAS.items():
+                    cursor.execute(f'PRAGMA {pragma}')
+                    self._restore[pragma] = str(cursor.fetchone()[0])
+                    cursor.execute(f'PRAGMA {pragma} = {value}')
+            elif self.vendor == 'postgresql':
+                for setting, value in POSTGRES_SETTINGS.items():
+                    cursor.execute(f'SET {setting} = {value}')
+
+    def _restore_settings(self):
+        with self.connection.cursor() as cursor:
+            if self.vendor == 'sqlite':
+                for pragma, value in self._restore.items():
+                    cursor.execute(f'PRAGMA {pragma} = {value}')
+            elif self.vendor == 'postgresql':
+                for setting in POSTGRES_SETTINGS:
+                    cursor.execute(f'RESET {setting}')
+
+    def _index_definition(self, cursor, name: str) -> Optional[str]:
+        if self.vendor == 'sqlite':
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = %s", [name])
+        elif self.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND indexname = %s', [name]
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _drop_indexes(self):
+        if self.vendor not in ('sqlite', 'postgresql'):
+            logger.warning("Bulk load: secondary indexes are kept on the %s backend", self.vendor)
+            return
+        with self.connection.cursor() as cursor:
+            for table in self.tables:
+                constraints = self.connection.introspection.get_constraints(cursor, table)
+                for name, info in constraints.items():
+                    if not info['index'] or info['unique'] or info['primary_key']:
+                        continue
+                    definition = self._index_definition(cursor, name)
+                    if not definition:
+                        continue
+                    # logged so the index can be recreated by hand if the process is killed
+                    logger.info("Bulk load: dropping index %s (%s)", name, definition)
+                    cursor.execute(f'DROP INDEX {self._quote(name)}')
+                    self.dropped.append((name, definition))
+
+    def _create_indexes(self):
+        with self.connection.cursor() as cursor:
+            for name, definition in self.dropped:
+                cursor.execute(definition)
+
+    def _analyze(self):
+        if self.vendor not in ('sqlite', 'postgresql', 'mysql'):
+            return
+        statement = 'ANALYZE TABLE' if self.vendor == 'mysql' else 'ANALYZE'
+        with self.connection.cursor() as cursor:
+            for table in self.tables:
+                cursor.execute(f'{statement} {self._quote(table)}')
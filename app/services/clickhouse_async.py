@@ -0,0 +1,106 @@
+# services/clickhouse_async.py
+
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from app.services.clickhouse_pool import ClickHousePool, PoolTimeout, build_pool_from_settings
+from app.services.clickhouse_service import ClickHouseService
+
+
+class AsyncQueryRunner:
+    """
+    Asinxron viewlar uchun alohida ulanishlar havzasi va ishchi threadlar.
+
+    ``clickhouse_driver`` bloklovchi mijoz, shuning uchun so'rov baribir
+    threadda bajariladi; lekin threadlar soni havza hajmiga teng va
+    sinxron viewlar havzasi bilan bo'lishilmaydi. Navbatdagi so'rovlar
+    thread emas, event loopdagi semaforni kutadi: ``acquire_timeout``
+    o'tsa ``PoolTimeout`` ko'tariladi (viewlar 503 qaytaradi).
+    """
+
+    def __init__(self, pool: ClickHousePool, acquire_timeout: Optional[float] = None):
+        self.pool = pool
+        self.max_size = pool.max_size
+        self.acquire_timeout = pool.acquire_timeout if acquire_timeout is None else acquire_timeout
+        self.pid = os.getpid()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_size, thread_name_prefix='clickhouse-async')
+        # asyncio.Semaphore bitta event loopga bog'lanadi
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_size)
+        return semaphore
+
+    async def run(self, func, *args, **kwargs):
+        semaphore = self._semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(
+                f"Asinxron ClickHouse so'rovi {self.acquire_timeout} soniyada navbatdan chiqmadi "
+                f"(max_size={self.max_size})"
+            ) from None
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            semaphore.release()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_async_runner() -> AsyncQueryRunner:
+    """Jarayon bo'yicha yagona runner (``CLICKHOUSE_SETTINGS['async_pool']``)."""
+    global _runner
+    runner = _runner
+    if runner is not None and runner.pid == os.getpid():
+        return runner
+    with _runner_lock:
+        if _runner is None or _runner.pid != os.getpid():
+            _runner = AsyncQueryRunner(build_pool_from_settings('async_pool'))
+        return _runner
+
+
+def set_async_runner(runner: Optional[AsyncQueryRunner]) -> Optional[AsyncQueryRunner]:
+    """Joriy runnerni almashtiradi (testlar uchun); oldingisini qaytaradi."""
+    global _runner
+    with _runner_lock:
+        previous, _runner = _runner, runner
+    return previous
+
+
+class AsyncClickHouseService:
+    """
+    ``ClickHouseService`` analitik metodlarining asinxron varianti.
+
+    So'rovlar ``AsyncQueryRunner`` ning alohida havzasi va threadlarida
+    bajariladi, event loop bloklanmaydi. Bir vaqtda bajariladigan so'rovlar
+    ``CLICKHOUSE_SETTINGS['async_pool']['max_size']`` bilan cheklangan,
+    qolganlari thread band qilmasdan navbatda kutadi.
+    """
+
+    def __init__(self, service: Optional[ClickHouseService] = None,
+                 runner: Optional[AsyncQueryRunner] = None):
+        self.runner = runner or get_async_runner()
+        self.service = service or ClickHouseService(pool=self.runner.pool)
+
+    async def get_top_languages_by_year_and_size(self, year: int, top_n: int = 5) -> List[Dict]:
+        return await self.runner.run(self.service.get_top_languages_by_year_and_size, year, top_n)
+
+    async def get_language_statistics(self) -> List[Dict]:
+        return await self.runner.run(self.service.get_language_statistics)
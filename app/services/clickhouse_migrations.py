@@ -0,0 +1,196 @@
+# services/clickhouse_migrations.py
+
+import importlib
+import logging
+import pkgutil
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from app.services.clickhouse_schema import DATABASE, TableSchema, rebuild_table, table_ddl
+from app.services.clickhouse_service import ClickHouseService
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PACKAGE = 'app.clickhouse_migrations'
+MIGRATIONS_TABLE = f'{DATABASE}.schema_migrations'
+
+_MODULE_RE = re.compile(r'^(\d{4})_(\w+)$')
+
+
+class MigrationError(Exception):
+    """Migratsiyalar to'plami yoki ularni bajarishda xatolik."""
+
+
+class Operation:
+    """Migratsiya qadami. ``apply`` qayta ishga tushirilganda ham xavfsiz bo'lishi kerak."""
+
+    def apply(self, service: ClickHouseService):
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return type(self).__name__
+
+
+class RunSQL(Operation):
+    def __init__(self, sql: Union[str, Sequence[str]]):
+        self.statements = [sql] if isinstance(sql, str) else list(sql)
+
+    def apply(self, service):
+        for statement in self.statements:
+            service._execute(statement, name='migration_sql')
+
+    def describe(self):
+        first = ' '.join(self.statements[0].split())
+        return f'RunSQL: {first[:60]}{"..." if len(first) > 60 else ""}'
+
+
+class RunPython(Operation):
+    def __init__(self, func: Callable[[ClickHouseService], None]):
+        self.func = func
+
+    def apply(self, service):
+        self.func(service)
+
+    def describe(self):
+        return f'RunPython: {getattr(self.func, "__name__", self.func)}'
+
+
+class CreateTable(Operation):
+    """
+    Jadvalni (IF NOT EXISTS) yaratadi: ``schema`` (muzlatilgan ``TableSchema``)
+    bo'yicha, berilmasa clickhouse_schema.TABLES dagi joriy ta'rif bo'yicha.
+    """
+
+    def __init__(self, table: str, profile: Optional[str] = None, schema: Optional[TableSchema] = None):
+        self.table = table
+        self.profile = profile
+        self.schema = schema
+
+    def apply(self, service):
+        service._execute(table_ddl(self.table, self.profile, schema=self.schema), name='migration_create')
+
+    def describe(self):
+        return f'CreateTable: {self.table}'
+
+
+class RebuildTable(Operation):
+    """
+    ORDER BY, partition kaliti yoki kodeklarni o'zgartirish: soya jadval,
+    ``INSERT ... SELECT`` va ``EXCHANGE TABLES`` (``clickhouse_schema.rebuild_table``).
+    ``ddl`` da jadval nomi o'rniga ``{table}`` yoziladi; ``schema`` -
+    muzlatilgan ``TableSchema`` (profil bo'yicha ko'rsatiladi). Ikkalasi
+    ham berilmasa ``TABLES`` dagi joriy ta'rif ishlatiladi.
+    """
+
+    def __init__(self, table: str, ddl: Optional[str] = None, profile: Optional[str] = None,
+                 schema: Optional[TableSchema] = None):
+        self.table = table
+        self.ddl = ddl
+        self.profile = profile
+        self.schema = schema
+
+    def apply(self, service):
+        ddl = self.ddl
+        if ddl is None and self.schema is not None:
+            ddl = table_ddl(self.table, self.profile, target='{table}', schema=self.schema)
+        copied = rebuild_table(service, self.table, self.profile, ddl=ddl)
+        if copied is None:
+            logger.info(f"{self.table}: tuzilish allaqachon mos")
+
+    def describe(self):
+        return f'RebuildTable: {self.table}'
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    operations: List[Operation]
+    description: str
+
+
+def load_migrations(package: str = MIGRATIONS_PACKAGE) -> List[Migration]:
+    """``NNNN_nom.py`` modullarini versiya bo'yicha tartiblab yuklaydi."""
+    module = importlib.import_module(package)
+    migrations = {}
+    for info in pkgutil.iter_modules(module.__path__):
+        match = _MODULE_RE.match(info.name)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(
+                f"Bir xil versiyali migratsiyalar: {migrations[version].name} va {info.name}"
+            )
+        migration_module = importlib.import_module(f'{package}.{info.name}')
+        if not hasattr(migration_module, 'operations'):
+            raise MigrationError(f"{info.name}: 'operations' ro'yxati topilmadi")
+        doc = (migration_module.__doc__ or '').strip()
+        migrations[version] = Migration(
+            version=version,
+            name=info.name,
+            operations=list(migration_module.operations),
+            description=doc.splitlines()[0] if doc else '',
+        )
+    return [migrations[version] for version in sorted(migrations)]
+
+
+class MigrationRunner:
+    """
+    Faqat oldinga yuradigan migratsiyalar. Qo'llanganlari ``schema_migrations``
+    jadvalida saqlanadi; migratsiya barcha qadamlari muvaffaqiyatli bo'lgandan
+    keyingina yoziladi, shuning uchun yarim qolgan migratsiya qayta bajariladi.
+    """
+
+    def __init__(self, service: Optional[ClickHouseService] = None, package: str = MIGRATIONS_PACKAGE):
+        self.service = service or ClickHouseService()
+        self.package = package
+
+    def ensure_version_table(self):
+        self.service._execute(f'CREATE DATABASE IF NOT EXISTS {DATABASE}', name='migration_state')
+        self.service._execute(f'''
+            CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+                version UInt32,
+                name String,
+                applied_at DateTime DEFAULT now()
+            ) ENGINE = MergeTree()
+            ORDER BY version
+        ''', name='migration_state')
+
+    def applied(self) -> Dict[int, tuple]:
+        self.ensure_version_table()
+        rows = self.service._execute(
+            f'SELECT version, name, applied_at FROM {MIGRATIONS_TABLE} ORDER BY version',
+            name='migration_state',
+        )
+        return {version: (name, applied_at) for version, name, applied_at in rows}
+
+    def plan(self, target: Optional[int] = None) -> List[Migration]:
+        applied = self.applied()
+        migrations = load_migrations(self.package)
+        known = {migration.version for migration in migrations}
+        missing = sorted(set(applied) - known)
+        if missing:
+            raise MigrationError(f"Bazada qo'llangan, lekin kodda yo'q migratsiyalar: {missing}")
+        return [
+            migration for migration in migrations
+            if migration.version not in applied and (target is None or migration.version <= target)
+        ]
+
+    def apply(self, migration: Migration, fake: bool = False, progress=None):
+        if not fake:
+            for operation in migration.operations:
+                if progress:
+                    progress(migration, operation)
+                operation.apply(self.service)
+        self.service._execute(
+            f'INSERT INTO {MIGRATIONS_TABLE} (version, name) VALUES',
+            [(migration.version, migration.name)],
+            name='migration_state',
+        )
+        logger.info(f"✅ ClickHouse migratsiyasi qo'llandi: {migration.name}")
+
+    def migrate(self, target: Optional[int] = None, fake: bool = False, progress=None) -> List[Migration]:
+        pending = self.plan(target)
+        for migration in pending:
+            self.apply(migration, fake=fake, progress=progress)
+        return pending
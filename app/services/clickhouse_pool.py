@@ -0,0 +1,219 @@
+# services/clickhouse_pool.py
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from clickhouse_driver import Client
+from clickhouse_driver.errors import ServerException
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SETTINGS = {
+    'max_size': 8,                 # bir jarayondagi maksimal ulanishlar soni
+    'acquire_timeout': 10,         # bo'sh ulanishni kutish (soniya)
+    'idle_timeout': 300,           # shuncha vaqt ishlatilmagan ulanish yopiladi
+    'health_check_interval': 30,   # shundan uzoq turgan ulanish ping qilinadi
+}
+
+
+class PoolTimeout(Exception):
+    """Belgilangan vaqt ichida bo'sh ulanish topilmadi."""
+
+
+class ClickHousePool:
+    """
+    ``clickhouse_driver.Client`` obyektlarining thread-safe havzasi.
+
+    Har bir Client bitta TCP ulanishga ega va bir vaqtda faqat bitta
+    thread tomonidan ishlatiladi. Bo'sh ulanishlar LIFO tartibida beriladi,
+    shuning uchun kam yuklamada ortiqcha ulanishlar ``idle_timeout`` dan
+    keyin yopiladi.
+    """
+
+    def __init__(self, max_size: int = 8, acquire_timeout: float = 10,
+                 idle_timeout: float = 300, health_check_interval: float = 30,
+                 client_factory: Optional[Callable[..., Client]] = None,
+                 **client_kwargs):
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.client_factory = client_factory or Client
+        self.client_kwargs = client_kwargs
+        self.pid = os.getpid()
+
+        self._idle = deque()  # (client, last_used)
+        self._size = 0
+        self._condition = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    def _create_client(self) -> Client:
+        return self.client_factory(**self.client_kwargs)
+
+    def _is_healthy(self, client: Client) -> bool:
+        connection = client.connection
+        if not connection.connected:
+            # Keyingi execute() o'zi qayta ulanadi
+            return True
+        try:
+            return connection.ping()
+        except Exception:
+            return False
+
+    def _reap_idle(self, now: float) -> list:
+        """Lock ichida chaqiriladi: eskirgan ulanishlarni havzadan chiqaradi."""
+        expired = []
+        # Eng eski ulanishlar navbatning chap tomonida
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            client, _ = self._idle.popleft()
+            self._size -= 1
+            expired.append(client)
+        return expired
+
+    def reap_idle(self):
+        with self._condition:
+            expired = self._reap_idle(time.monotonic())
+            if expired:
+                self._condition.notify(len(expired))
+        for client in expired:
+            client.disconnect()
+
+    def acquire(self, timeout: Optional[float] = None) -> Client:
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            client = None
+            last_used = None
+            create = False
+            with self._condition:
+                while True:
+                    now = time.monotonic()
+                    expired = self._reap_idle(now)
+                    if self._idle:
+                        client, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f"ClickHouse ulanishi {timeout} soniyada bo'shamadi (max_size={self.max_size})"
+                        )
+                    self._condition.wait(remaining)
+
+            for old in expired:
+                old.disconnect()
+
+            if create:
+                try:
+                    return self._create_client()
+                except Exception:
+                    self._discard_slot()
+                    raise
+
+            if now - last_used < self.health_check_interval or self._is_healthy(client):
+                return client
+
+            logger.warning("ClickHouse ulanishi health-checkdan o'tmadi, yangisi ochiladi")
+            client.disconnect()
+            return client
+
+    def release(self, client: Client, discard: bool = False):
+        if discard:
+            client.disconnect()
+            self._discard_slot()
+            return
+        with self._condition:
+            self._idle.append((client, time.monotonic()))
+            self._condition.notify()
+
+    def _discard_slot(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        client = self.acquire(timeout)
+        discard = False
+        try:
+            yield client
+        except ServerException:
+            # So'rov xatosi: ulanish sog', havzaga qaytariladi
+            raise
+        except BaseException:
+            # Tarmoq xatosi yoki so'rov o'rtasida uzilish (KeyboardInterrupt, GeneratorExit):
+            # ulanishda javobning qolgani o'qilmagan bo'lishi mumkin
+            discard = True
+            raise
+        finally:
+            self.release(client, discard=discard)
+
+    def close(self):
+        with self._condition:
+            idle = [client for client, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for client in idle:
+            client.disconnect()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def build_pool_from_settings(key: str = 'pool') -> ClickHousePool:
+    """``CLICKHOUSE_SETTINGS[key]`` bo'yicha havza (``'async_pool'``: asinxron viewlar uchun)."""
+    config = settings.CLICKHOUSE_SETTINGS
+    pool_settings = {**DEFAULT_POOL_SETTINGS, **config.get(key, {})}
+    return ClickHousePool(
+        host=config['host'],
+        port=config['port'],
+        user=config.get('user', 'default'),
+        password=config.get('password', ''),
+        **pool_settings,
+    )
+
+
+def get_pool() -> ClickHousePool:
+    """
+    Jarayon bo'yicha yagona havza. Fork qilingan ishchi jarayonlar
+    ota jarayonning soketlarini ishlatmasligi uchun o'z havzasini oladi.
+    """
+    global _pool
+    pool = _pool
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = build_pool_from_settings()
+        return _pool
+
+
+def set_pool(pool: Optional[ClickHousePool]) -> Optional[ClickHousePool]:
+    """
+    Joriy jarayon havzasini almashtiradi (masalan benchmarklarda stand-in
+    mijozlar uchun). ``None`` berilsa keyingi ``get_pool()`` sozlamalardan
+    yangisini quradi. Oldingi havzani qaytaradi.
+    """
+    global _pool
+    with _pool_lock:
+        previous, _pool = _pool, pool
+    return previous
@@ -0,0 +1,352 @@
+# services/clickhouse_schema.py
+
+import logging
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DATABASE = 'github_analytics'
+
+# Oddiy MergeTree jadvallari oxirgi shuncha blok xeshini eslab qoladi;
+# bir xil insert_deduplication_token bilan qayta yuborilgan blok tashlab yuboriladi
+DEDUPLICATION_WINDOW = 1000
+
+# default: dastlabki sxema. compact: LowCardinality lug'atlari, kodeklar va
+# kichraytirilgan butun son turlari (bir xil ustunlar, bir xil ORDER BY).
+SCHEMA_PROFILES = ('default', 'compact')
+
+# tables: tillar va topiclar alohida jadvallarda (repository_languages, repository_topics).
+# arrays: ular repositories dagi parallel Array ustunlarida, alohida jadvallar bo'sh qoladi.
+STORAGE_LAYOUTS = ('tables', 'arrays')
+ARRAY_COLUMNS = ('language_names', 'language_sizes', 'topic_names', 'topic_stars')
+
+# Saralash kalitidagi ustunlar va sanalar (yil bo'yicha to'plangan): qo'shni
+# qiymatlar farqi kichik - Delta/DoubleDelta. Saralanmagan hisoblagichlar
+# uchun T64 (kichik diapazonli sonlarning bo'sh bitlarini tashlaydi).
+DELTA = 'CODEC(Delta, ZSTD(1))'
+DOUBLE_DELTA = 'CODEC(DoubleDelta, ZSTD(1))'
+T64 = 'CODEC(T64, ZSTD(1))'
+TEXT = 'CODEC(ZSTD(3))'
+
+
+# Bitta repo bo'yicha qidiruv: saralash kaliti name_with_owner bilan boshlanmaydi,
+# bloom filter har granula uchun "bu nom yo'q" deb aytib, granulalarni tashlaydi
+NAME_LOOKUP_INDEX = 'bloom_filter(0.01) GRANULARITY 1'
+
+# Yil bo'yicha partitionlar: bitta yilni qayta yuklash/o'chirish faqat shu yil
+# partlariga tegadi (REPLACE/DROP PARTITION), yil filtri butun partitionlarni kesadi
+YEAR_PARTITION = 'created_year'
+
+# Delta ingest: ReplacingMergeTree kalit bo'yicha eng katta versiyani qoldiradi.
+# Versiya INSERT paytida beriladi (ms), shuning uchun keyin yozilgan qator yutadi.
+# is_deleted = 1 - repodan olib tashlangan til/topic (tombstone).
+VERSION_TYPE = 'UInt64 DEFAULT toUnixTimestamp64Milli(now64(3))'
+VERSION_COLUMNS = {
+    'repositories': ('version',),
+    'repository_languages': ('version', 'is_deleted'),
+    'repository_topics': ('version', 'is_deleted'),
+}
+
+
+class TableSchema(NamedTuple):
+    """
+    Jadval ta'rifi: ustunlar (nom, default tur, compact tur yoki None - o'zgarmaydi)
+    va skip indekslar (nom, ifoda, ``TYPE ... GRANULARITY ...``).
+    """
+    columns: List[Tuple[str, str, Optional[str]]]
+    engine: str
+    order_by: str
+    deduplication: bool = True
+    indexes: Sequence[Tuple[str, str, str]] = ()
+    partition_by: Optional[str] = None
+
+
+TABLES: Dict[str, TableSchema] = {
+    'repositories': TableSchema(
+        columns=[
+            # owner yuqori kardinallikka ega (millionlab): LowCardinality o'rniga ZSTD
+            ('owner', 'String', f'String {TEXT}'),
+            ('name', 'String', f'String {TEXT}'),
+            ('name_with_owner', 'String', f'String {TEXT}'),
+            ('description', 'String', f'String {TEXT}'),
+            ('stars', 'UInt32', f'UInt32 {DELTA}'),
+            ('forks', 'UInt32', f'UInt32 {T64}'),
+            ('watchers', 'UInt32', f'UInt32 {T64}'),
+            ('is_fork', 'UInt8', None),
+            ('is_archived', 'UInt8', None),
+            ('language_count', 'UInt16', f'UInt16 {T64}'),
+            # GitHub bitta repoda ko'pi bilan 20 ta topic ruxsat beradi
+            ('topic_count', 'UInt16', f'UInt8 {T64}'),
+            ('disk_usage_kb', 'UInt64', f'UInt64 {T64}'),
+            ('pull_requests', 'UInt32', f'UInt32 {T64}'),
+            ('issues', 'UInt32', f'UInt32 {T64}'),
+            ('primary_language', 'String', 'LowCardinality(String)'),
+            ('created_at', 'DateTime', f'DateTime {DELTA}'),
+            ('pushed_at', 'DateTime', f'DateTime {DELTA}'),
+            ('created_year', 'UInt16', f'UInt16 {DOUBLE_DELTA}'),
+            ('created_date', 'Date', f'Date {DELTA}'),
+            ('default_branch_commit_count', 'UInt32', f'UInt32 {T64}'),
+            ('license', 'String', 'LowCardinality(String)'),
+            ('assignable_user_count', 'UInt16', f'UInt16 {T64}'),
+            ('code_of_conduct', 'String', 'LowCardinality(String)'),
+            ('forking_allowed', 'UInt8', None),
+            ('has_parent', 'UInt8', None),
+            # storage_layout = 'arrays' da to'ldiriladi (indeks bo'yicha mos juftliklar)
+            ('language_names', 'Array(String)', 'Array(LowCardinality(String))'),
+            ('language_sizes', 'Array(UInt64)', None),
+            ('topic_names', 'Array(String)', 'Array(LowCardinality(String))'),
+            ('topic_stars', 'Array(UInt32)', None),
+            ('version', VERSION_TYPE, None),
+        ],
+        # Kalit repo bo'yicha yagona: qayta yozilgan repo eski qatorini almashtiradi
+        engine='ReplacingMergeTree(version)',
+        order_by='(created_year, name_with_owner)',
+        indexes=[('idx_name_with_owner', 'name_with_owner', NAME_LOOKUP_INDEX)],
+        partition_by=YEAR_PARTITION,
+    ),
+    'repository_languages': TableSchema(
+        columns=[
+            ('repo_name_with_owner', 'String', f'String {TEXT}'),
+            ('language', 'String', 'LowCardinality(String)'),
+            ('size', 'UInt64', f'UInt64 {DELTA}'),
+            ('created_year', 'UInt16', f'UInt16 {DOUBLE_DELTA}'),
+            ('repo_stars', 'UInt32', f'UInt32 {T64}'),
+            ('repo_forks', 'UInt32', f'UInt32 {T64}'),
+            ('version', VERSION_TYPE, None),
+            ('is_deleted', 'UInt8 DEFAULT 0', None),
+        ],
+        engine='ReplacingMergeTree(version, is_deleted)',
+        order_by='(created_year, language, repo_name_with_owner)',
+        indexes=[('idx_repo_name_with_owner', 'repo_name_with_owner', NAME_LOOKUP_INDEX)],
+        partition_by=YEAR_PARTITION,
+    ),
+    'repository_topics': TableSchema(
+        columns=[
+            ('repo_name_with_owner', 'String', f'String {TEXT}'),
+            ('topic', 'String', 'LowCardinality(String)'),
+            ('topic_stars', 'UInt32', f'UInt32 {DELTA}'),
+            ('created_year', 'UInt16', f'UInt16 {DELTA}'),
+            ('repo_stars', 'UInt32', f'UInt32 {T64}'),
+            ('version', VERSION_TYPE, None),
+            ('is_deleted', 'UInt8 DEFAULT 0', None),
+        ],
+        engine='ReplacingMergeTree(version, is_deleted)',
+        order_by='(topic, created_year, repo_name_with_owner)',
+        indexes=[('idx_repo_name_with_owner', 'repo_name_with_owner', NAME_LOOKUP_INDEX)],
+        partition_by=YEAR_PARTITION,
+    ),
+    'language_year_rollup': TableSchema(
+        columns=[
+            ('created_year', 'UInt16', None),
+            ('language', 'String', 'LowCardinality(String)'),
+            ('total_size', 'SimpleAggregateFunction(sum, UInt64)', None),
+            ('repo_count', 'AggregateFunction(uniq, String)', None),
+            ('total_stars', 'SimpleAggregateFunction(sum, UInt64)', None),
+            ('max_stars', 'SimpleAggregateFunction(max, UInt32)', None),
+            ('row_count', 'SimpleAggregateFunction(sum, UInt64)', None),
+        ],
+        engine='AggregatingMergeTree()',
+        order_by='(created_year, language)',
+        deduplication=False,
+        partition_by=YEAR_PARTITION,
+    ),
+    # Delta ingest uchun har repo yozuvining xeshi (app/services/fingerprint.py)
+    'repository_fingerprints': TableSchema(
+        columns=[
+            ('name_with_owner', 'String', f'String {TEXT}'),
+            ('fingerprint', 'Int64', None),
+            ('created_year', 'UInt16', None),
+            ('version', VERSION_TYPE, None),
+        ],
+        engine='ReplacingMergeTree(version)',
+        order_by='name_with_owner',
+        partition_by=YEAR_PARTITION,
+    ),
+    # Rollupi qayta hisoblanishi kerak bo'lgan yillar: yozuvdan oldin belgilanadi,
+    # qayta hisoblangandan keyin o'chiriladi (uzilgan ingest keyingi ishga tushishda tuzatiladi)
+    'rollup_pending_years': TableSchema(
+        columns=[
+            ('created_year', 'UInt16', None),
+            ('marked_at', VERSION_TYPE, None),
+        ],
+        engine='MergeTree()',
+        order_by='created_year',
+        deduplication=False,
+    ),
+}
+
+BASE_TABLES = ('repositories', 'repository_languages', 'repository_topics')
+
+
+def get_schema_profile() -> str:
+    profile = settings.CLICKHOUSE_SETTINGS.get('schema_profile', 'default')
+    if profile not in SCHEMA_PROFILES:
+        raise ValueError(f"Noma'lum schema_profile: {profile} ({', '.join(SCHEMA_PROFILES)})")
+    return profile
+
+
+def get_storage_layout() -> str:
+    layout = settings.CLICKHOUSE_SETTINGS.get('storage_layout', 'tables')
+    if layout not in STORAGE_LAYOUTS:
+        raise ValueError(f"Noma'lum storage_layout: {layout} ({', '.join(STORAGE_LAYOUTS)})")
+    return layout
+
+
+def column_type(table: str, column: str, profile: Optional[str] = None) -> str:
+    profile = profile or get_schema_profile()
+    for name, default, compact in TABLES[table].columns:
+        if name == column:
+            return compact if profile == 'compact' and compact else default
+    raise KeyError(f'{table}.{column}')
+
+
+def table_ddl(table: str, profile: Optional[str] = None, target: Optional[str] = None,
+              schema: Optional[TableSchema] = None) -> str:
+    """
+    ``CREATE TABLE IF NOT EXISTS`` so'rovi. ``target`` berilsa jadval shu nom
+    bilan yaratiladi (qayta qurishdagi soya jadval uchun). ``schema`` berilsa
+    ``TABLES`` dagi joriy ta'rif o'rniga u ishlatiladi (migratsiyalardagi
+    muzlatilgan ta'riflar).
+    """
+    schema = schema or TABLES[table]
+    profile = profile or get_schema_profile()
+    columns = ',\n'.join(
+        f'                {name} {compact if profile == "compact" and compact else default}'
+        for name, default, compact in schema.columns
+    )
+    for name, expression, index_type in schema.indexes:
+        columns += f',\n                INDEX {name} {expression} TYPE {index_type}'
+    partition = f'\n            PARTITION BY {schema.partition_by}' if schema.partition_by else ''
+    table_settings = ''
+    if schema.deduplication:
+        table_settings = f'''
+            SETTINGS index_granularity = 8192,
+                     non_replicated_deduplication_window = {DEDUPLICATION_WINDOW}'''
+    return f'''
+            CREATE TABLE IF NOT EXISTS {target or f"{DATABASE}.{table}"} (
+{columns}
+            ) ENGINE = {schema.engine}{partition}
+            ORDER BY {schema.order_by}{table_settings}
+        '''
+
+
+def index_statements(table: str, materialize: bool = False) -> List[str]:
+    """
+    Mavjud jadvalga skip indekslarni qo'shish (``ADD INDEX IF NOT EXISTS``).
+    Indeks faqat yangi partlarga yoziladi; ``materialize`` eski partlar uchun
+    fon mutatsiyasini ham ishga tushiradi.
+    """
+    statements = []
+    for name, expression, index_type in TABLES[table].indexes:
+        statements.append(
+            f'ALTER TABLE {DATABASE}.{table} ADD INDEX IF NOT EXISTS {name} {expression} TYPE {index_type}'
+        )
+        if materialize:
+            statements.append(f'ALTER TABLE {DATABASE}.{table} MATERIALIZE INDEX {name}')
+    return statements
+
+
+def add_column_statements(table: str, columns: Sequence[str], profile: Optional[str] = None) -> List[str]:
+    """Mavjud jadvalga keyin qo'shilgan ustunlar (faqat metadata, eski partlar DEFAULT qiymat beradi)."""
+    return [
+        f'ALTER TABLE {DATABASE}.{table} ADD COLUMN IF NOT EXISTS {column} {column_type(table, column, profile)}'
+        for column in columns
+    ]
+
+
+def table_storage(service, table: str) -> Dict:
+    """Faol partlar bo'yicha jadval hajmi (siqilgan/siqilmagan baytlar) va ustunlar kesimi."""
+    parts = service._execute(f'''
+        SELECT sum(rows), sum(data_compressed_bytes), sum(data_uncompressed_bytes), count()
+        FROM system.parts
+        WHERE database = '{DATABASE}' AND table = '{table}' AND active
+    ''', name='schema_storage')
+    rows, compressed, uncompressed, part_count = parts[0] if parts else (0, 0, 0, 0)
+    columns = service._execute(f'''
+        SELECT name, type, data_compressed_bytes, data_uncompressed_bytes
+        FROM system.columns
+        WHERE database = '{DATABASE}' AND table = '{table}'
+        ORDER BY position
+    ''', name='schema_storage')
+    return {
+        'rows': rows or 0,
+        'parts': part_count or 0,
+        'compressed_bytes': compressed or 0,
+        'uncompressed_bytes': uncompressed or 0,
+        'columns': {
+            name: {'type': column_type, 'compressed_bytes': c_bytes, 'uncompressed_bytes': u_bytes}
+            for name, column_type, c_bytes, u_bytes in columns
+        },
+    }
+
+
+def table_layout(service, full_name: str) -> Tuple:
+    """Jadval tuzilishi (engine, kalitlar, ustun turlari/kodeklari, skip indekslar) taqqoslash uchun."""
+    database, table = full_name.split('.', 1)
+    where = f"database = '{database}' AND table = '{table}'"
+    tables = service._execute(f'''
+        SELECT engine, sorting_key, partition_key, primary_key
+        FROM system.tables
+        WHERE database = '{database}' AND name = '{table}'
+    ''', name='schema_layout')
+    columns = service._execute(f'''
+        SELECT name, type, compression_codec, default_kind, default_expression
+        FROM system.columns
+        WHERE {where}
+        ORDER BY position
+    ''', name='schema_layout')
+    indexes = service._execute(f'''
+        SELECT name, type_full, expr, granularity
+        FROM system.data_skipping_indices
+        WHERE {where}
+        ORDER BY name
+    ''', name='schema_layout')
+    return tuple(map(tuple, tables)), tuple(map(tuple, columns)), tuple(map(tuple, indexes))
+
+
+def rebuild_table(service, table: str, profile: Optional[str] = None, keep_old: bool = False,
+                  ddl: Optional[str] = None) -> Optional[int]:
+    """
+    Jadvalni yangi tuzilishda qayta quradi: soya jadval yaratiladi,
+    ``INSERT ... SELECT`` bilan to'ldiriladi va ``EXCHANGE TABLES`` bilan
+    atomik almashtiriladi. O'qishlar butun jarayon davomida eski jadvaldan
+    davom etadi. Materialized viewlar jadvalga nom bo'yicha bog'langani
+    uchun almashtirishdan keyin yangi jadvalga yozadi.
+
+    ``ddl`` berilsa (``{table}`` o'rniga soya jadval nomi qo'yiladi) u
+    ishlatiladi, aks holda ``table_ddl(table, profile)``. Umumiy ustunlar
+    ko'chiriladi, yangi ustunlar DEFAULT qiymatini oladi. Soya jadval
+    tuzilishi mavjud jadval bilan bir xil bo'lsa hech narsa ko'chirilmaydi
+    va None qaytadi, aks holda ko'chirilgan qatorlar soni.
+
+    Qayta qurish paytida jadvalga yozilgan qatorlar yangi jadvalga o'tmaydi:
+    ingest to'xtatilgan holda ishga tushiring.
+    """
+    full_name = f'{DATABASE}.{table}'
+    shadow = f'{DATABASE}.{table}__rebuild'
+
+    service._execute(f'DROP TABLE IF EXISTS {shadow}', name='schema_rebuild')
+    if ddl is not None:
+        service._execute(ddl.format(table=shadow), name='schema_rebuild')
+    else:
+        service._execute(table_ddl(table, profile, target=shadow), name='schema_rebuild')
+
+    if table_layout(service, shadow) == table_layout(service, full_name):
+        service._execute(f'DROP TABLE IF EXISTS {shadow}', name='schema_rebuild')
+        logger.info(f"{full_name} tuzilishi o'zgarmagan, qayta qurish kerak emas")
+        return None
+
+    source_columns = {row[0] for row in table_layout(service, full_name)[1]}
+    columns = ', '.join(row[0] for row in table_layout(service, shadow)[1] if row[0] in source_columns)
+    service._execute(
+        f'INSERT INTO {shadow} ({columns}) SELECT {columns} FROM {full_name}',
+        name='schema_rebuild',
+    )
+    copied = service._execute(f'SELECT count() FROM {shadow}', name='schema_rebuild')[0][0]
+    service._execute(f'EXCHANGE TABLES {full_name} AND {shadow}', name='schema_rebuild')
+    logger.info(f"✅ {full_name} qayta qurildi ({copied} qator)")
+    if not keep_old:
+        service._execute(f'DROP TABLE IF EXISTS {shadow}', name='schema_rebuild')
+    return copied
@@ -1,330 +1,1166 @@
 # services/clickhouse_service.py
 
-from clickhouse_driver import Client
-from django.conf import settings
-from typing import List, Dict
-from datetime import datetime
+from app.services.clickhouse_pool import ClickHousePool, get_pool
+from app.services.clickhouse_schema import (
+    ARRAY_COLUMNS,
+    BASE_TABLES,
+    DEDUPLICATION_WINDOW,
+    VERSION_COLUMNS,
+    add_column_statements,
+    get_storage_layout,
+    index_statements,
+    table_ddl,
+)
+from app.services.fingerprint import repository_fingerprint
+from app.services.metrics import track_query
+from typing import Iterable, List, Dict, NamedTuple, Optional, Set, Tuple
+from array import array
+from datetime import datetime, date, timedelta
 import logging
+import uuid
+
+try:
+    # NumPy (va pandas) o'rnatilgan bo'lsa, raqamli ustunlar nusxasiz yuboriladi
+    import numpy as np
+    import pandas  # noqa: F401  (clickhouse_driver numpy rejimi uchun kerak)
+except ImportError:
+    np = None
 
 logger = logging.getLogger(__name__)
 
-class ClickHouseService:
-    def __init__(self):
-        self.client = Client(
-            host=settings.CLICKHOUSE_SETTINGS['host'],
-            port=settings.CLICKHOUSE_SETTINGS['port']
+# Jadval ustunlari: (nom, array typecode). typecode None bo'lsa ustun oddiy ro'yxat.
+# DateTime ustunlari epoch soniyalarda, Date ustunlari 1970-01-01 dan kunlarda saqlanadi.
+REPOSITORY_COLUMNS: List[Tuple[str, Optional[str]]] = [
+    ('owner', None),
+    ('name', None),
+    ('name_with_owner', None),
+    ('description', None),
+    ('stars', 'I'),
+    ('forks', 'I'),
+    ('watchers', 'I'),
+    ('is_fork', 'B'),
+    ('is_archived', 'B'),
+    ('language_count', 'H'),
+    ('topic_count', 'H'),
+    ('disk_usage_kb', 'Q'),
+    ('pull_requests', 'I'),
+    ('issues', 'I'),
+    ('primary_language', None),
+    ('created_at', 'I'),
+    ('pushed_at', 'I'),
+    ('created_year', 'H'),
+    ('created_date', 'H'),
+    ('default_branch_commit_count', 'I'),
+    ('license', None),
+    ('assignable_user_count', 'H'),
+    ('code_of_conduct', None),
+    ('forking_allowed', 'B'),
+    ('has_parent', 'B'),
+]
+
+# storage_layout = 'arrays': repositories qatori oxiriga qo'shiladigan ustunlar
+REPOSITORY_ARRAY_COLUMNS: List[Tuple[str, Optional[str]]] = [(name, None) for name in ARRAY_COLUMNS]
+
+LANGUAGE_COLUMNS: List[Tuple[str, Optional[str]]] = [
+    ('repo_name_with_owner', None),
+    ('language', None),
+    ('size', 'Q'),
+    ('created_year', 'H'),
+    ('repo_stars', 'I'),
+    ('repo_forks', 'I'),
+]
+
+TOPIC_COLUMNS: List[Tuple[str, Optional[str]]] = [
+    ('repo_name_with_owner', None),
+    ('topic', None),
+    ('topic_stars', 'I'),
+    ('created_year', 'H'),
+    ('repo_stars', 'I'),
+]
+
+DATE_COLUMNS = {'created_date'}
+DATETIME_COLUMNS = {'created_at', 'pushed_at'}
+EPOCH = date(1970, 1, 1)
+
+
+class TransformedBlock(NamedTuple):
+    """Bitta batchdan olingan uch jadval qatorlari va xatoliklar soni"""
+    repositories: List[tuple]
+    languages: List[tuple]
+    topics: List[tuple]
+    error_count: int
+
+
+class ColumnarBlock(NamedTuple):
+    """TransformedBlock ning ustunli ko'rinishi: har jadval uchun ustunlar ro'yxati"""
+    repositories: List[list]
+    languages: List[list]
+    topics: List[list]
+    error_count: int
+
+
+class DeltaResult(NamedTuple):
+    """Delta yozuv natijasi: yozilgan (yangi/o'zgargan), o'zgarmagan, xatoliklar va tegilgan yillar"""
+    written: int
+    unchanged: int
+    error_count: int
+    years: Set[int]
+
+
+def clean_int(value, default=0):
+    # None, bo'sh satr, yoki noto'g'ri tur bo'lsa, default qiymatni qaytaradi
+    if value is None or value == '' or not isinstance(value, (int, float)):
+        return default
+    try:
+        # Kiritilgan qiymatni to'liq butun songa aylantirish
+        return int(value)
+    except ValueError:
+        return default
+
+
+def parse_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _repository_rows(repo: Dict) -> Tuple[tuple, List[tuple], List[tuple]]:
+    """Bitta repository uchun (asosiy qator, til qatorlari, topic qatorlari)"""
+    # Sanalarni parse qilish
+    created_at = parse_datetime(repo['createdAt'])
+    pushed_at = parse_datetime(repo['pushedAt'])
+    created_year = created_at.year
+    
+    # Asosiy repository ma'lumoti
+    main_row = (
+        repo['owner'],
+        repo['name'],
+        repo['nameWithOwner'],
+        repo.get('description', '') or '',
+        repo['stars'],
+        repo['forks'],
+        repo['watchers'],
+        1 if repo['isFork'] else 0,
+        1 if repo['isArchived'] else 0,
+        repo['languageCount'],
+        repo['topicCount'],
+        repo['diskUsageKb'],
+        repo['pullRequests'],
+        repo['issues'],
+        repo.get('primaryLanguage', '') or '',
+        created_at,
+        pushed_at,
+        created_year,
+        created_at.date(),
+        clean_int(repo.get('defaultBranchCommitCount',0)),
+        repo.get('license', '') or '',
+        repo['assignableUserCount'],
+        repo.get('codeOfConduct', '') or '',
+        1 if repo['forkingAllowed'] else 0,
+        1 if repo.get('parent') else 0
+    )
+    
+    # Languages ma'lumotlari
+    language_rows = [
+        (
+            repo['nameWithOwner'],
+            lang['name'],
+            lang['size'],
+            created_year,
+            repo['stars'],
+            repo['forks']
         )
+        for lang in repo.get('languages', [])
+    ]
+    
+    # Topics ma'lumotlari
+    topic_rows = [
+        (
+            repo['nameWithOwner'],
+            topic['name'],
+            topic.get('stars', 0),
+            created_year,
+            repo['stars']
+        )
+        for topic in repo.get('topics', [])
+    ]
+    return main_row, language_rows, topic_rows
+
+
+def transform_repositories(repositories: List[Dict], max_errors: int = 100) -> TransformedBlock:
+    """
+    Repository lug'atlarini repositories, repository_languages va
+    repository_topics jadvallari uchun qatorlarga aylantiradi.
+
+    Modul darajasidagi funksiya bo'lgani uchun ProcessPoolExecutor
+    ishchilarida ham chaqirilishi mumkin.
+    """
+    main_data = []
+    language_data = []
+    topic_data = []
+    
+    error_count = 0
+    
+    for idx, repo in enumerate(repositories):
+        try:
+            main_row, language_rows, topic_rows = _repository_rows(repo)
+            main_data.append(main_row)
+            language_data.extend(language_rows)
+            topic_data.extend(topic_rows)
+            
+            # Har 10000 ta repositorydan keyin progress
+            if (idx + 1) % 10000 == 0:
+                logger.info(f"Progress: {idx + 1}/{len(repositories)} ta repository qayta ishlandi")
+            
+        except Exception as e:
+            error_count += 1
+            logger.error(f"Repository qayta ishlashda xatolik ({repo.get('nameWithOwner', 'unknown')}): {e}")
+            if error_count > max_errors:
+                logger.error("Ko'p xatoliklar! To'xtatilmoqda...")
+                break
+    
+    return TransformedBlock(main_data, language_data, topic_data, error_count)
+
+
+def _empty_columns(spec: List[Tuple[str, Optional[str]]]) -> List:
+    return [array(typecode) if typecode else [] for _, typecode in spec]
+
+
+def _to_timestamp(value: datetime) -> int:
+    return int(value.timestamp())
+
+
+def _to_days(value: date) -> int:
+    return (value - EPOCH).days
+
+
+def _converters(spec: List[Tuple[str, Optional[str]]]) -> List:
+    return [
+        _to_timestamp if name in DATETIME_COLUMNS else _to_days if name in DATE_COLUMNS else None
+        for name, _ in spec
+    ]
+
+
+def _append_row(columns: List, converters: List, row: tuple):
+    for column, convert, value in zip(columns, converters, row):
+        column.append(convert(value) if convert else value)
+
+
+def transform_repositories_columnar(repositories: List[Dict], max_errors: int = 100) -> ColumnarBlock:
+    """
+    ``transform_repositories`` ning ustunli varianti.
+
+    Qatorlar tuple ro'yxatida to'planmaydi: raqamli ustunlar ``array``
+    buferlarida, satrlar esa ro'yxatlarda saqlanadi. Xato bergan
+    repository barcha ustunlardan orqaga qaytariladi.
+    """
+    main_columns = _empty_columns(REPOSITORY_COLUMNS)
+    language_columns = _empty_columns(LANGUAGE_COLUMNS)
+    topic_columns = _empty_columns(TOPIC_COLUMNS)
+    main_converters = _converters(REPOSITORY_COLUMNS)
+    language_converters = _converters(LANGUAGE_COLUMNS)
+    topic_converters = _converters(TOPIC_COLUMNS)
+    tables = (main_columns, language_columns, topic_columns)
+    
+    error_count = 0
+    
+    for idx, repo in enumerate(repositories):
+        lengths = [len(columns[0]) for columns in tables]
+        try:
+            main_row, language_rows, topic_rows = _repository_rows(repo)
+            _append_row(main_columns, main_converters, main_row)
+            for row in language_rows:
+                _append_row(language_columns, language_converters, row)
+            for row in topic_rows:
+                _append_row(topic_columns, topic_converters, row)
+            
+            if (idx + 1) % 10000 == 0:
+                logger.info(f"Progress: {idx + 1}/{len(repositories)} ta repository qayta ishlandi")
+            
+        except Exception as e:
+            # Qisman qo'shilgan qiymatlarni olib tashlash (ustunlar uzunligi teng bo'lishi shart)
+            for columns, length in zip(tables, lengths):
+                for column in columns:
+                    del column[length:]
+            error_count += 1
+            logger.error(f"Repository qayta ishlashda xatolik ({repo.get('nameWithOwner', 'unknown')}): {e}")
+            if error_count > max_errors:
+                logger.error("Ko'p xatoliklar! To'xtatilmoqda...")
+                break
+    
+    return ColumnarBlock(main_columns, language_columns, topic_columns, error_count)
+
+
+def prepare_columns(columns: List, spec: List[Tuple[str, Optional[str]]], use_numpy: bool) -> List:
+    """Ustunlarni clickhouse_driver columnar INSERT qabul qiladigan ko'rinishga keltiradi."""
+    prepared = []
+    for column, (name, typecode) in zip(columns, spec):
+        if use_numpy:
+            if name in DATE_COLUMNS:
+                column = np.frombuffer(column, dtype=f'u{column.itemsize}').astype('datetime64[D]')
+            elif typecode:
+                # array buferidan nusxasiz ko'rinish
+                column = np.frombuffer(column, dtype=f'u{column.itemsize}')
+            else:
+                column = np.array(column, dtype=object)
+        elif name in DATE_COLUMNS:
+            column = [EPOCH + timedelta(days=days) for days in column]
+        elif typecode:
+            column = column.tolist()
+        prepared.append(column)
+    return prepared
+
+
+def _group_by_repository(name_column, first_column, second_column) -> Dict[str, Tuple[list, list]]:
+    grouped = {}
+    for name, first, second in zip(name_column, first_column, second_column):
+        entry = grouped.get(name)
+        if entry is None:
+            entry = grouped[name] = ([], [])
+        entry[0].append(first)
+        entry[1].append(second)
+    return grouped
+
+
+def attach_arrays(block):
+    """
+    Blokni 'arrays' tuzilishiga o'tkazadi: har repository qatoriga uning
+    tillari (nom, hajm) va topiclari (nom, stars) parallel massivlar
+    sifatida qo'shiladi. Tillar/topiclar qatorlari olib tashlanadi.
+    """
+    empty = ([], [])
+    if isinstance(block, ColumnarBlock):
+        languages = _group_by_repository(*block.languages[:3]) if block.languages else {}
+        topics = _group_by_repository(*block.topics[:3]) if block.topics else {}
+        names = block.repositories[2] if block.repositories else []
+        array_columns = [
+            [languages.get(name, empty)[0] for name in names],
+            [languages.get(name, empty)[1] for name in names],
+            [topics.get(name, empty)[0] for name in names],
+            [topics.get(name, empty)[1] for name in names],
+        ]
+        repositories = list(block.repositories) + array_columns if block.repositories else []
+        return ColumnarBlock(repositories, [], [], block.error_count)
+    
+    languages = _group_by_repository(*list(zip(*block.languages))[:3]) if block.languages else {}
+    topics = _group_by_repository(*list(zip(*block.topics))[:3]) if block.topics else {}
+    repositories = [
+        row + (
+            languages.get(row[2], empty)[0], languages.get(row[2], empty)[1],
+            topics.get(row[2], empty)[0], topics.get(row[2], empty)[1],
+        )
+        for row in block.repositories
+    ]
+    return TransformedBlock(repositories, [], [], block.error_count)
+
+
+def block_row_count(data: List, columnar: bool) -> int:
+    if columnar:
+        return len(data[0]) if data else 0
+    return len(data)
+
+
+def block_column(data: List, spec: List[Tuple[str, Optional[str]]], name: str, columnar: bool) -> list:
+    """Blok qismidagi (qatorlar yoki ustunlar) ``name`` ustuni qiymatlari"""
+    index = [column for column, _ in spec].index(name)
+    if columnar:
+        return list(data[index]) if data else []
+    return [row[index] for row in data]
+
+
+def insert_query(table: str, spec: List[Tuple[str, Optional[str]]], suffix: str = '') -> str:
+    columns = ', '.join(name for name, _ in spec)
+    return f'INSERT INTO github_analytics.{table}{suffix} ({columns}) VALUES'
+
+
+def repository_year(repo: Dict) -> int:
+    """createdAt dan yil (to'liq parse qilmasdan, yil bo'yicha saralash uchun)"""
+    return int(repo['createdAt'][:4])
+
+
+# --- Til/yil bo'yicha oldindan agregatsiya qilingan jadval ---
+# repository_languages ga har INSERT paytida materialized view orqali to'ldiriladi,
+# shuning uchun analitik so'rovlar repolar soniga emas, tillar soniga bog'liq.
+LANGUAGE_ROLLUP_TABLE = 'github_analytics.language_year_rollup'
+LANGUAGE_ROLLUP_VIEW = 'github_analytics.language_year_rollup_mv'
+# storage_layout = 'arrays' da rollup repositories massivlaridan (ARRAY JOIN) to'ldiriladi.
+# Har repo faqat bitta tuzilishda yoziladi, shuning uchun ikki view bir-birini takrorlamaydi.
+LANGUAGE_ROLLUP_ARRAYS_VIEW = 'github_analytics.language_year_rollup_arrays_mv'
+
+
+def _and(where: str) -> str:
+    return f' AND {where}' if where else ''
+
+
+def language_rollup_select(source: str = 'github_analytics.repository_languages', where: str = '') -> str:
+    return f'''
+    SELECT
+        created_year,
+        language,
+        sum(size) AS total_size,
+        uniqState(repo_name_with_owner) AS repo_count,
+        sum(toUInt64(repo_stars)) AS total_stars,
+        max(repo_stars) AS max_stars,
+        count() AS row_count
+    FROM {source}
+    WHERE language != ''{_and(where)}
+    GROUP BY created_year, language
+'''
+
+
+def language_rollup_arrays_select(source: str = 'github_analytics.repositories', where: str = '') -> str:
+    return f'''
+    SELECT
+        created_year,
+        language,
+        sum(size) AS total_size,
+        uniqState(name_with_owner) AS repo_count,
+        sum(toUInt64(stars)) AS total_stars,
+        max(stars) AS max_stars,
+        count() AS row_count
+    FROM {source}
+    ARRAY JOIN language_names AS language, language_sizes AS size
+    WHERE language != ''{_and(where)}
+    GROUP BY created_year, language
+'''
+
+
+LANGUAGE_ROLLUP_SELECT = language_rollup_select()
+LANGUAGE_ROLLUP_ARRAYS_SELECT = language_rollup_arrays_select()
+
+
+def current_source(table: str, versioned: bool) -> str:
+    """Jadvalning joriy holati: ReplacingMergeTree da FINAL (oddiy MergeTree FINAL ni rad etadi)"""
+    return f'github_analytics.{table} FINAL' if versioned else f'github_analytics.{table}'
+
+
+# Delta ingest: har repo uchun oxirgi yozilgan yozuvning xeshi
+FINGERPRINTS_TABLE = 'github_analytics.repository_fingerprints'
+# Bitta so'rovdagi IN ro'yxati hajmi (fingerprint va tombstone qidiruvlari)
+LOOKUP_CHUNK_SIZE = 10000
+# Versiyali jadvallarga yozishdan oldin belgilanadigan yillar: rollup qayta hisoblangach o'chiriladi,
+# uzilgan ingestning yillari keyingi ishga tushishda (refresh_pending_rollup) qayta hisoblanadi
+PENDING_ROLLUP_TABLE = 'github_analytics.rollup_pending_years'
+
+# Yil partitionlarini almashtirishda ishlatiladigan vaqtinchalik jadvallar qo'shimchasi
+STAGING_SUFFIX = '__staging'
+YEAR_TABLES = BASE_TABLES + ('language_year_rollup',)
+# Fingerprintlar ham yil bo'yicha: almashtirilgan yoki o'chirilgan yil keyingi delta ingestda to'liq yoziladi
+PARTITIONED_TABLES = YEAR_TABLES + ('repository_fingerprints',)
+
+
+# --- Analitik so'rovlar (sinxron va asinxron servislar uchun umumiy) ---
+
+def top_languages_by_size_query(year: int, top_n: int) -> str:
+    return f'''
+        SELECT 
+            language,
+            sum(total_size) AS total_size
+        FROM {LANGUAGE_ROLLUP_TABLE}
+        WHERE created_year = {int(year)}
+        GROUP BY language
+        ORDER BY total_size DESC
+        LIMIT {int(top_n)}
+    '''
+
+
+def format_top_languages_by_size(results, year: int) -> List[Dict]:
+    return [
+        {
+            'language': lang,
+            'total_size': size, 
+            'year': year
+        }
+        for lang, size in results
+    ]
+
+
+def top_languages_per_year_query(top_n: int, year_from: Optional[int] = None,
+                                 year_to: Optional[int] = None) -> str:
+    # Har yil uchun top_n ni ClickHouse ning o'zi kesadi (LIMIT n BY)
+    conditions = ['created_year > 0']
+    if year_from is not None:
+        conditions.append(f'created_year >= {int(year_from)}')
+    if year_to is not None:
+        conditions.append(f'created_year <= {int(year_to)}')
+    return f'''
+        SELECT 
+            created_year,
+            language,
+            uniqMerge(repo_count) as repo_count,
+            sum(total_stars) as total_stars,
+            sum(total_size) as total_code_size
+        FROM {LANGUAGE_ROLLUP_TABLE}
+        WHERE {' AND '.join(conditions)}
+        GROUP BY created_year, language
+        ORDER BY created_year DESC, repo_count DESC, language
+        LIMIT {int(top_n)} BY created_year
+    '''
+
+
+def format_top_languages_per_year(results) -> Dict[int, List[Dict]]:
+    stats_by_year = {}
+    for year, language, repo_count, total_stars, total_code_size in results:
+        stats_by_year.setdefault(year, []).append({
+            'language': language,
+            'repository_count': repo_count,
+            'total_stars': total_stars,
+            'total_code_size_bytes': total_code_size
+        })
+    return stats_by_year
+
+
+LANGUAGE_STATISTICS_QUERY = f'''
+    SELECT 
+        language,
+        uniqMerge(repo_count) as repo_count,
+        sum(total_size) as total_size,
+        sum(total_stars) / sum(row_count) as avg_stars,
+        max(max_stars) as max_stars
+    FROM {LANGUAGE_ROLLUP_TABLE}
+    GROUP BY language
+    ORDER BY repo_count DESC
+    LIMIT 20
+'''
+
+
+def format_language_statistics(results) -> List[Dict]:
+    return [
+        {
+            'language': lang,
+            'repository_count': count,
+            'total_code_size_bytes': total_size,
+            'average_stars': round(avg_stars, 2),
+            'max_stars': max_stars
+        }
+        for lang, count, total_size, avg_stars, max_stars in results
+    ]
+
+
+# --- Bitta repo bo'yicha qidiruv (name_with_owner bloom filter indekslari orqali) ---
+# FINAL o'rniga eng katta versiyali qator olinadi: FINAL bilan skip indekslar ishlatilmaydi
+REPOSITORY_DETAIL_QUERY = f'''
+    SELECT {', '.join(name for name, _ in REPOSITORY_COLUMNS)}
+    FROM github_analytics.repositories
+    WHERE name_with_owner = %(name)s
+    ORDER BY version DESC
+    LIMIT 1
+'''
+
+# created_year saralash kalitining boshida: bloom filterdan oldin partlar/granulalar kesiladi.
+# Hali birlashmagan eski versiyalar va tombstonelar argMax(..., version) bilan tashlanadi.
+REPOSITORY_LANGUAGES_QUERY = '''
+    SELECT language, argMax(size, version) AS size
+    FROM github_analytics.repository_languages
+    WHERE created_year = %(year)s AND repo_name_with_owner = %(name)s
+    GROUP BY language
+    HAVING argMax(is_deleted, version) = 0
+    ORDER BY size DESC, language
+'''
+
+REPOSITORY_TOPICS_QUERY = '''
+    SELECT topic, argMax(topic_stars, version) AS stars
+    FROM github_analytics.repository_topics
+    WHERE created_year = %(year)s AND repo_name_with_owner = %(name)s
+    GROUP BY topic
+    HAVING argMax(is_deleted, version) = 0
+    ORDER BY topic
+'''
+
+# 'arrays' tuzilishida bitta so'rov yetarli: tillar va topiclar qatorning o'zida
+REPOSITORY_DETAIL_ARRAYS_QUERY = f'''
+    SELECT {', '.join(name for name, _ in REPOSITORY_COLUMNS + REPOSITORY_ARRAY_COLUMNS)}
+    FROM github_analytics.repositories
+    WHERE name_with_owner = %(name)s
+    ORDER BY version DESC
+    LIMIT 1
+'''
+
+# Joriy (o'chirilmagan) til/topic kalitlari: tombstone yozish uchun
+CURRENT_KEYS_QUERY = '''
+    SELECT repo_name_with_owner, {key}
+    FROM github_analytics.{table}
+    WHERE created_year IN %(years)s AND repo_name_with_owner IN %(names)s
+    GROUP BY repo_name_with_owner, {key}
+    HAVING argMax(is_deleted, version) = 0
+'''
+
+FINGERPRINTS_QUERY = f'''
+    SELECT name_with_owner, argMax(fingerprint, version)
+    FROM {FINGERPRINTS_TABLE}
+    WHERE name_with_owner IN %(names)s
+    GROUP BY name_with_owner
+'''
+
+BOOLEAN_COLUMNS = {name for name, typecode in REPOSITORY_COLUMNS if typecode == 'B'}
+
+
+def format_repository_detail(row, languages, topics) -> Dict:
+    detail = {
+        name: bool(value) if name in BOOLEAN_COLUMNS else value
+        for (name, _), value in zip(REPOSITORY_COLUMNS, row)
+    }
+    detail['languages'] = [{'name': language, 'size': size} for language, size in languages]
+    detail['topics'] = [{'name': topic, 'stars': stars} for topic, stars in topics]
+    return detail
+
+
+class ClickHouseService:
+    def __init__(self, pool: Optional[ClickHousePool] = None, layout: Optional[str] = None):
+        # Ulanishlar jarayon bo'yicha umumiy havzadan olinadi (har so'rovda yangi TCP ulanish emas)
+        self.pool = pool or get_pool()
+        # Tillar/topiclar qayerga yoziladi: 'tables' yoki 'arrays' (CLICKHOUSE_SETTINGS['storage_layout'])
+        self.layout = layout or get_storage_layout()
+        # Shu obyekt orqali bajarilgan so'rovlar o'qigan qatorlar (X-Read-Rows uchun)
+        self.rows_read = 0
+        # PENDING_ROLLUP_TABLE ga yozilgan yillar (har batchda qayta yozilmaydi)
+        self._marked_years: Set[int] = set()
+    
+    def connection(self):
+        """Havzadan ulanishni bir nechta so'rov uchun band qilish: ``with service.connection() as client``"""
+        return self.pool.connection()
+    
+    def _execute(self, query: str, *args, name: Optional[str] = None, **kwargs):
+        # name: metrikalardagi so'rov nomi (berilmasa SQL ning birinchi so'zi)
+        name = name or query.split(None, 1)[0].lower()
+        with track_query('clickhouse', name) as record, self.pool.connection() as client:
+            result = client.execute(query, *args, **kwargs)
+            last_query = getattr(client, 'last_query', None)
+            if last_query is not None:
+                record.rows_read = last_query.progress.rows
+                record.bytes_read = last_query.progress.bytes
+                self.rows_read += record.rows_read or 0
+            record.result_rows = len(result) if isinstance(result, list) else result
+            return result
+    
+    def stream(self, query: str, params=None, settings: Optional[Dict] = None, name: Optional[str] = None):
+        """
+        Natijani bloklab o'qiydi (``execute_iter``): xotirada faqat joriy blok turadi.
+        Ulanish iteratsiya tugaguncha band. Iteratsiya oxirigacha bormasa (mijoz
+        uzilsa) ulanishda o'qilmagan javob qoladi, shuning uchun u havzaga
+        qaytarilmay yopiladi.
+        """
+        name = name or query.split(None, 1)[0].lower()
+        with track_query('clickhouse', name) as record:
+            client = self.pool.acquire()
+            finished = False
+            rows = 0
+            try:
+                for row in client.execute_iter(query, params, settings=settings):
+                    rows += 1
+                    yield row
+                finished = True
+            finally:
+                self.pool.release(client, discard=not finished)
+                record.result_rows = rows
     
     def create_database_and_table(self):
         """Database va tablelarni yaratish"""
         # Database yaratish
-        self.client.execute('CREATE DATABASE IF NOT EXISTS github_analytics')
+        self._execute('CREATE DATABASE IF NOT EXISTS github_analytics')
         logger.info("✅ Database yaratildi: github_analytics")
         
-        # Asosiy repositories table
-        self.client.execute('''
-            CREATE TABLE IF NOT EXISTS github_analytics.repositories (
-                owner String,
-                name String,
-                name_with_owner String,
-                description String,
-                stars UInt32,
-                forks UInt32,
-                watchers UInt32,
-                is_fork UInt8,
-                is_archived UInt8,
-                language_count UInt16,
-                topic_count UInt16,
-                disk_usage_kb UInt64,
-                pull_requests UInt32,
-                issues UInt32,
-                primary_language String,
-                created_at DateTime,
-                pushed_at DateTime,
-                created_year UInt16,
-                created_date Date,
-                default_branch_commit_count UInt32,
-                license String,
-                assignable_user_count UInt16,
-                code_of_conduct String,
-                forking_allowed UInt8,
-                has_parent UInt8
-            ) ENGINE = MergeTree()
-            ORDER BY (created_year, stars, name_with_owner)
-            SETTINGS index_granularity = 8192
-        ''')
-        logger.info("✅ Table yaratildi: repositories")
+        # Jadvallar ta'rifi clickhouse_schema.py da (CLICKHOUSE_SETTINGS['schema_profile'] bo'yicha)
+        for table in BASE_TABLES:
+            self._execute(table_ddl(table))
+            logger.info(f"✅ Table yaratildi: {table}")
         
-        # Languages table
-        self.client.execute('''
-            CREATE TABLE IF NOT EXISTS github_analytics.repository_languages (
-                repo_name_with_owner String,
-                language String,
-                size UInt64,
-                created_year UInt16,
-                repo_stars UInt32,
-                repo_forks UInt32
-            ) ENGINE = MergeTree()
-            ORDER BY (created_year, language, size)
-            SETTINGS index_granularity = 8192
-        ''')
-        logger.info("✅ Table yaratildi: repository_languages")
+        # Massiv va versiya ustunlari keyin qo'shilgan: eski jadvallarda ham bo'lishi kerak
+        # (ReplacingMergeTree ga o'tish 0004 ClickHouse migratsiyasida)
+        for statement in add_column_statements('repositories', ARRAY_COLUMNS):
+            self._execute(statement)
+        for table, columns in VERSION_COLUMNS.items():
+            for statement in add_column_statements(table, columns):
+                self._execute(statement)
+        self._execute(table_ddl('repository_fingerprints'))
+        self._execute(table_ddl('rollup_pending_years'))
+
+        self.create_language_rollup()
+        
+        # Oldin yaratilgan jadvallarda ham insert_deduplication_token ishlashi uchun
+        for table in BASE_TABLES:
+            self._execute(f'''
+                ALTER TABLE github_analytics.{table}
+                MODIFY SETTING non_replicated_deduplication_window = {DEDUPLICATION_WINDOW}
+            ''')
+            # Oldin yaratilgan jadvallarga name_with_owner skip indekslari (yangi partlar uchun;
+            # eski partlar 0002 ClickHouse migratsiyasida materialize qilinadi)
+            for statement in index_statements(table):
+                self._execute(statement)
+    
+    def create_language_rollup(self):
+        """Til/yil rollup jadvali va uni to'ldiruvchi materialized view"""
+        rollup_exists = self._execute(f'EXISTS TABLE {LANGUAGE_ROLLUP_TABLE}')[0][0]
         
-        # Topics table
-        self.client.execute('''
-            CREATE TABLE IF NOT EXISTS github_analytics.repository_topics (
-                repo_name_with_owner String,
-                topic String,
-                topic_stars UInt32,
-                created_year UInt16,
-                repo_stars UInt32
-            ) ENGINE = MergeTree()
-            ORDER BY (topic, created_year, topic_stars)
-            SETTINGS index_granularity = 8192
+        self._execute(table_ddl('language_year_rollup'))
+        self._execute(f'''
+            CREATE MATERIALIZED VIEW IF NOT EXISTS {LANGUAGE_ROLLUP_VIEW}
+            TO {LANGUAGE_ROLLUP_TABLE}
+            AS {LANGUAGE_ROLLUP_SELECT}
         ''')
-        logger.info("✅ Table yaratildi: repository_topics")
+        self._execute(f'''
+            CREATE MATERIALIZED VIEW IF NOT EXISTS {LANGUAGE_ROLLUP_ARRAYS_VIEW}
+            TO {LANGUAGE_ROLLUP_TABLE}
+            AS {LANGUAGE_ROLLUP_ARRAYS_SELECT}
+        ''')
+        logger.info("✅ Rollup yaratildi: language_year_rollup")
+        
+        if not rollup_exists:
+            # Jadvallarda avvaldan bor ma'lumotlarni bir marta ko'chirish. View yaratilgandan keyin
+            # qatorlar rollupga yozilgan bo'lishi mumkin: backfill ularni ikki marta sanamasligi
+            # uchun alohida jadvalda hisoblanib partition bo'yicha almashtiriladi
+            self.rebuild_language_rollup()
+    
+    def rebuild_language_rollup(self):
+        """Rollupni repository_languages va repositories massivlaridan qaytadan hisoblash"""
+        self._recompute_rollup()
+        logger.info("✅ Rollup qayta hisoblandi: language_year_rollup")
+
+    def refresh_language_rollup(self, years: Iterable[int]):
+        """
+        Berilgan yillar rollupini jadvallarning joriy (FINAL) holatidan qayta
+        hisoblaydi. Qayta yozilgan repolar va tombstonelar materialized view
+        orqali rollupga yana qo'shiladi, shuning uchun versiyali jadvallarga
+        yozuvdan keyin chaqiriladi (odatda ``refresh_pending_rollup`` orqali).
+        """
+        years = sorted({int(year) for year in years})
+        if not years:
+            return
+        self._recompute_rollup(years)
+        logger.info(f"✅ Rollup yangilandi: {', '.join(map(str, years))}")
+
+    def mark_rollup_years(self, years: Iterable[int]):
+        """
+        Rollupi qayta hisoblanishi kerak bo'lgan yillarni yozuvdan oldin
+        ``PENDING_ROLLUP_TABLE`` ga belgilaydi: yozuv o'rtasida uzilgan
+        ingestning yillari ham ``refresh_pending_rollup`` da yangilanadi.
+        """
+        years = sorted({int(year) for year in years} - self._marked_years)
+        if not years:
+            return
+        self._execute(f'INSERT INTO {PENDING_ROLLUP_TABLE} (created_year) VALUES', [(year,) for year in years],
+                      name='insert:rollup_pending_years')
+        self._marked_years.update(years)
+
+    def refresh_pending_rollup(self, years: Iterable[int] = ()) -> List[int]:
+        """
+        Belgilangan (shu yoki oldingi, uzilgan ingestlarning) va berilgan
+        yillar rollupini qayta hisoblaydi, keyin o'qilgan belgilarni o'chiradi.
+        Natija: yangilangan yillar.
+        """
+        pending = self._execute(f'''
+            SELECT created_year, max(marked_at)
+            FROM {PENDING_ROLLUP_TABLE}
+            GROUP BY created_year
+        ''', name='rollup_pending')
+        years = sorted({int(year) for year in years} | {year for year, _ in pending})
+        self.refresh_language_rollup(years)
+        if pending:
+            # Qayta hisoblash boshlangandan keyin qo'yilgan belgilar keyingi safarga qoladi
+            marked = max(marked_at for _, marked_at in pending)
+            self._execute(f'ALTER TABLE {PENDING_ROLLUP_TABLE} DELETE WHERE marked_at <= {int(marked)}',
+                          name='rollup_pending')
+        self._marked_years.clear()
+        return years
+
+    def _recompute_rollup(self, years: Optional[List[int]] = None):
+        """
+        Rollupni alohida jadvalda hisoblab, ``REPLACE PARTITION`` bilan
+        almashtiradi: o'qishlar va materialized view yozuvlari bo'sh yoki yarim
+        to'ldirilgan rollupni ko'rmaydi (TRUNCATE + INSERT SELECT dagi kabi).
+        ``years`` berilsa faqat shu yillar partitionlari, aks holda hammasi.
+        Rollup yil bo'yicha partitionlanmagan bo'lsa (0003 gacha) yagona
+        partition ``'all'``: yillar o'rniga butun rollup qayta hisoblanadi.
+        """
+        if years and not self._rollup_partitioned_by_year():
+            years = None
+        where = 'created_year IN ({})'.format(', '.join(map(str, years))) if years else ''
+        # Versiyali jadvallarda joriy holat (FINAL), olib tashlangan tillar (tombstone) hisobga olinmaydi
+        versioned = self.has_versioned_tables()
+        # Har chaqiruvga alohida jadval: bir vaqtda ishlayotgan ingest va bufer to'qnashmaydi
+        suffix = f'__refresh_{uuid.uuid4().hex[:8]}'
+        staging = f'{LANGUAGE_ROLLUP_TABLE}{suffix}'
+        self._execute(f'CREATE TABLE {staging} AS {LANGUAGE_ROLLUP_TABLE}', name='rollup_refresh')
+        try:
+            for select in (
+                language_rollup_select(current_source('repository_languages', versioned),
+                                       'is_deleted = 0' + _and(where) if versioned else where),
+                language_rollup_arrays_select(current_source('repositories', versioned), where),
+            ):
+                self._execute(f'INSERT INTO {staging} {select}', name='rollup_refresh')
+            staged = self._partition_ids(f'language_year_rollup{suffix}')
+            if years:
+                # created_year bo'yicha partitionda partition ID yilning o'zi
+                targets = {str(year) for year in years}
+            else:
+                # Manbada qolmagan partitionlar ham o'chiriladi ('all' - partitionlanmagan jadval)
+                targets = staged | self._partition_ids('language_year_rollup')
+            for partition_id in sorted(targets):
+                if partition_id in staged:
+                    self._execute(f"ALTER TABLE {LANGUAGE_ROLLUP_TABLE} REPLACE PARTITION ID '{partition_id}' FROM {staging}",
+                                  name='replace_partition')
+                else:
+                    self._execute(f"ALTER TABLE {LANGUAGE_ROLLUP_TABLE} DROP PARTITION ID '{partition_id}'",
+                                  name='drop_partition')
+        finally:
+            self._execute(f'DROP TABLE IF EXISTS {staging}', name='rollup_refresh')
+
+    def _rollup_partitioned_by_year(self) -> bool:
+        keys = self._execute('''
+            SELECT partition_key
+            FROM system.tables
+            WHERE database = 'github_analytics' AND name = 'language_year_rollup'
+        ''', name='partition_check')
+        return bool(keys) and keys[0][0] == 'created_year'
+
+    def _partition_ids(self, table: str) -> Set[str]:
+        return {
+            partition_id
+            for (partition_id,) in self._execute(f'''
+                SELECT DISTINCT partition_id
+                FROM system.parts
+                WHERE database = 'github_analytics' AND table = '{table}' AND active
+            ''', name='partitions')
+        }
+    
     def get_top_languages_by_year_and_size(self, year: int, top_n: int = 5) -> List[Dict]:
         """
         Berilgan yil bo'yicha eng ko'p kod hajmiga ega bo'lgan dasturlash tillarini
         ClickHouse yordamida oladi (Django ORM dagi TopRepoLangBy5Year mantiqiga o'xshash).
         """
-        query = f'''
-            SELECT 
-                language,
-                sum(size) AS total_size
-            FROM github_analytics.repository_languages
-            WHERE created_year = {year} AND language != ''
-            GROUP BY language
-            ORDER BY total_size DESC
-            LIMIT {top_n}
-        '''
-        
-        results = self.client.execute(query)
-        
-        return [
-            {
-                'language': lang,
-                'total_size': size, 
-                'year': year
-            }
-            for lang, size in results
-        ]
+        results = self._execute(top_languages_by_size_query(year, top_n), name='top_languages_by_size')
+        return format_top_languages_by_size(results, year)
     
-    def insert_repository_date(self, repositories: List[Dict]):
+    def insert_repository_date(self, repositories: List[Dict], columnar: bool = False,
+                               dedup_token: Optional[str] = None, suffix: str = '', mark_rollup: bool = False):
         """Repository ma'lumotlarini ClickHouse ga qo'shish"""
         if not repositories:
             logger.warning("Bo'sh ma'lumotlar ro'yxati")
             return
         
-        main_data = []
-        language_data = []
-        topic_data = []
-        
-        error_count = 0
-        
-        for idx, repo in enumerate(repositories):
-            try:
-                # Sanalarni parse qilish
-                created_at = datetime.fromisoformat(repo['createdAt'].replace('Z', '+00:00'))
-                pushed_at = datetime.fromisoformat(repo['pushedAt'].replace('Z', '+00:00'))
-                created_year = created_at.year
-
-                def clean_int(value, default=0):
-                    # None, bo'sh satr, yoki noto'g'ri tur bo'lsa, default qiymatni qaytaradi
-                    if value is None or value == '' or not isinstance(value, (int, float)):
-                        return default
-                    try:
-                        # Kiritilgan qiymatni to'liq butun songa aylantirish
-                        return int(value)
-                    except ValueError:
-                        return default
-                
-                # Asosiy repository ma'lumoti
-                main_data.append((
-                    repo['owner'],
-                    repo['name'],
-                    repo['nameWithOwner'],
-                    repo.get('description', '') or '',
-                    repo['stars'],
-                    repo['forks'],
-                    repo['watchers'],
-                    1 if repo['isFork'] else 0,
-                    1 if repo['isArchived'] else 0,
-                    repo['languageCount'],
-                    repo['topicCount'],
-                    repo['diskUsageKb'],
-                    repo['pullRequests'],
-                    repo['issues'],
-                    repo.get('primaryLanguage', '') or '',
-                    created_at,
-                    pushed_at,
-                    created_year,
-                    created_at.date(),
-                    clean_int(repo.get('defaultBranchCommitCount',0)),
-                    repo.get('license', '') or '',
-                    repo['assignableUserCount'],
-                    repo.get('codeOfConduct', '') or '',
-                    1 if repo['forkingAllowed'] else 0,
-                    1 if repo.get('parent') else 0
-                ))
-                
-                # Languages ma'lumotlari
-                for lang in repo.get('languages', []):
-                    language_data.append((
-                        repo['nameWithOwner'],
-                        lang['name'],
-                        lang['size'],
-                        created_year,
-                        repo['stars'],
-                        repo['forks']
-                    ))
-                
-                # Topics ma'lumotlari
-                for topic in repo.get('topics', []):
-                    topic_data.append((
-                        repo['nameWithOwner'],
-                        topic['name'],
-                        topic.get('stars', 0),
-                        created_year,
-                        repo['stars']
-                    ))
-                
-                # Har 10000 ta repositorydan keyin progress
-                if (idx + 1) % 10000 == 0:
-                    logger.info(f"Progress: {idx + 1}/{len(repositories)} ta repository qayta ishlandi")
-                
-            except Exception as e:
-                error_count += 1
-                logger.error(f"Repository qayta ishlashda xatolik ({repo.get('nameWithOwner', 'unknown')}): {e}")
-                if error_count > 100:
-                    logger.error("Ko'p xatoliklar! To'xtatilmoqda...")
-                    break
+        if columnar:
+            block = transform_repositories_columnar(repositories)
+        else:
+            block = transform_repositories(repositories)
+        self.insert_block(block, dedup_token=dedup_token, suffix=suffix, mark_rollup=mark_rollup)
+        return block.error_count
+    
+    def insert_block(self, block, dedup_token: Optional[str] = None, suffix: str = '', mark_rollup: bool = False):
+        """
+        Oldindan tayyorlangan qatorlarni ClickHouse ga yozish.
+
+        ``TransformedBlock`` qatorma-qator, ``ColumnarBlock`` esa driverning
+        columnar INSERT rejimida yuboriladi. ``dedup_token`` berilsa, har
+        jadval INSERTi ``insert_deduplication_token`` bilan belgilanadi va
+        qayta yuborilgan blok server tomonidan tashlab yuboriladi.
+        ``suffix`` berilsa qatorlar ``<jadval><suffix>`` ga (masalan staging) yoziladi.
+        'arrays' tuzilishida tillar va topiclar repositories massivlariga yoziladi.
+        ``mark_rollup`` - blok yillari yozuvdan oldin ``mark_rollup_years`` bilan
+        belgilanadi (versiyali jadvallarga qayta yozish). Istalgan jadvaldagi
+        xatolik qayta ko'tariladi.
+        """
+        if mark_rollup:
+            self.mark_rollup_years(block_column(
+                block.repositories, REPOSITORY_COLUMNS, 'created_year', isinstance(block, ColumnarBlock)
+            ))
+        repository_spec = REPOSITORY_COLUMNS
+        if self.layout == 'arrays':
+            block = attach_arrays(block)
+            repository_spec = REPOSITORY_COLUMNS + REPOSITORY_ARRAY_COLUMNS
+        main_data, language_data, topic_data, error_count = block
+        columnar = isinstance(block, ColumnarBlock)
         
         # Asosiy ma'lumotlarni qo'shish
-        if main_data:
-            logger.info(f"Repositories tableiga {len(main_data)} ta yozuv qo'shilmoqda...")
+        rows = block_row_count(main_data, columnar)
+        if rows:
+            logger.info(f"Repositories tableiga {rows} ta yozuv qo'shilmoqda...")
             try:
-                self.client.execute(
-                    '''
-                    INSERT INTO github_analytics.repositories 
-                    (owner, name, name_with_owner, description, stars, forks, watchers, 
-                     is_fork, is_archived, language_count, topic_count, disk_usage_kb, 
-                     pull_requests, issues, primary_language, created_at, pushed_at, 
-                     created_year, created_date, default_branch_commit_count, license, 
-                     assignable_user_count, code_of_conduct, forking_allowed, has_parent)
-                    VALUES
-                    ''',
-                    main_data
-                )
-                logger.info(f"✅ {len(main_data)} ta repository qo'shildi")
+                self._insert('repositories', repository_spec, main_data, columnar, dedup_token, suffix)
+                logger.info(f"✅ {rows} ta repository qo'shildi")
             except Exception as e:
                 logger.error(f"Repositories tableiga qo'shishda xatolik: {e}")
                 raise
         
         # Languages ma'lumotlarini qo'shish
-        if language_data:
-            logger.info(f"Languages tableiga {len(language_data)} ta yozuv qo'shilmoqda...")
+        rows = block_row_count(language_data, columnar)
+        if rows:
+            logger.info(f"Languages tableiga {rows} ta yozuv qo'shilmoqda...")
             try:
-                self.client.execute(
-                    '''
-                    INSERT INTO github_analytics.repository_languages 
-                    (repo_name_with_owner, language, size, created_year, repo_stars, repo_forks)
-                    VALUES
-                    ''',
-                    language_data
-                )
-                logger.info(f"✅ {len(language_data)} ta language yozuvi qo'shildi")
+                self._insert('repository_languages', LANGUAGE_COLUMNS, language_data, columnar, dedup_token, suffix)
+                logger.info(f"✅ {rows} ta language yozuvi qo'shildi")
             except Exception as e:
                 logger.error(f"Languages tableiga qo'shishda xatolik: {e}")
-                # Language xatoligi kritik emas, davom ettiramiz
+                # Qisman yozilgan blok muvaffaqiyatli hisoblanmaydi: chaqiruvchi uni qayta yuboradi
+                # (jadval nomli dedup tokeni allaqachon yozilgan jadvallarda takrorni tashlaydi)
+                raise
         
         # Topics ma'lumotlarini qo'shish
-        if topic_data:
-            logger.info(f"Topics tableiga {len(topic_data)} ta yozuv qo'shilmoqda...")
+        rows = block_row_count(topic_data, columnar)
+        if rows:
+            logger.info(f"Topics tableiga {rows} ta yozuv qo'shilmoqda...")
             try:
-                self.client.execute(
-                    '''
-                    INSERT INTO github_analytics.repository_topics 
-                    (repo_name_with_owner, topic, topic_stars, created_year, repo_stars)
-                    VALUES
-                    ''',
-                    topic_data
-                )
-                logger.info(f"✅ {len(topic_data)} ta topic yozuvi qo'shildi")
+                self._insert('repository_topics', TOPIC_COLUMNS, topic_data, columnar, dedup_token, suffix)
+                logger.info(f"✅ {rows} ta topic yozuvi qo'shildi")
             except Exception as e:
                 logger.error(f"Topics tableiga qo'shishda xatolik: {e}")
-                # Topic xatoligi kritik emas, davom ettiramiz
+                # Qisman yozilgan blok muvaffaqiyatli hisoblanmaydi: chaqiruvchi uni qayta yuboradi
+                # (jadval nomli dedup tokeni allaqachon yozilgan jadvallarda takrorni tashlaydi)
+                raise
         
         logger.info(f"✅ Import yakunlandi! Xatoliklar: {error_count}")
     
-    def get_top_languages_by_year(self, top_n: int = 5) -> Dict[int, List[Dict]]:
-        """Yil bo'yicha eng ko'p ishlatiladigan dasturlash tillari"""
-        query = '''
-            SELECT 
-                created_year,
-                language,
-                count(DISTINCT repo_name_with_owner) as repo_count,
-                sum(repo_stars) as total_stars,
-                sum(size) as total_code_size
-            FROM github_analytics.repository_languages
-            WHERE language != '' AND created_year > 0
-            GROUP BY created_year, language
-            ORDER BY created_year DESC, repo_count DESC
-        '''
-        
-        results = self.client.execute(query)
-        
-        stats_by_year = {}
-        for year, language, repo_count, total_stars, total_code_size in results:
-            if year not in stats_by_year:
-                stats_by_year[year] = []
-            
-            if len(stats_by_year[year]) < top_n:
-                stats_by_year[year].append({
-                    'language': language,
-                    'repository_count': repo_count,
-                    'total_stars': total_stars,
-                    'total_code_size_bytes': total_code_size
-                })
-        
-        return stats_by_year
+    def _insert(self, table: str, spec, data, columnar: bool = False, dedup_token: Optional[str] = None,
+                suffix: str = ''):
+        query = insert_query(table, spec, suffix)
+        query_settings = {}
+        if dedup_token:
+            query_settings['insert_deduplication_token'] = f'{dedup_token}:{table}'
+        if not columnar:
+            return self._execute(query, data, settings=query_settings, name=f'insert:{table}')
+        # clickhouse_driver numpy rejimi Array ustunlarini qo'llab-quvvatlamaydi
+        use_numpy = np is not None and not any(name in ARRAY_COLUMNS for name, _ in spec)
+        query_settings['use_numpy'] = use_numpy
+        return self._execute(
+            query,
+            prepare_columns(data, spec, use_numpy),
+            columnar=True,
+            settings=query_settings,
+            name=f'insert:{table}',
+        )
+    
+    def get_top_languages_by_year(self, top_n: int = 5, year_from: Optional[int] = None,
+                                  year_to: Optional[int] = None) -> Dict[int, List[Dict]]:
+        """Yil bo'yicha eng ko'p ishlatiladigan dasturlash tillari (har yil uchun top_n)"""
+        results = self._execute(top_languages_per_year_query(top_n, year_from, year_to), name='top_languages_per_year')
+        return format_top_languages_per_year(results)
     
     def get_language_statistics(self) -> List[Dict]:
         """Umumiy dasturlash tillari statistikasi"""
-        query = '''
-            SELECT 
-                language,
-                count(DISTINCT repo_name_with_owner) as repo_count,
-                sum(size) as total_size,
-                avg(repo_stars) as avg_stars,
-                max(repo_stars) as max_stars
-            FROM github_analytics.repository_languages
-            WHERE language != ''
-            GROUP BY language
-            ORDER BY repo_count DESC
-            LIMIT 20
-        '''
+        results = self._execute(LANGUAGE_STATISTICS_QUERY, name='language_statistics')
+        return format_language_statistics(results)
+    
+    def get_repository_detail(self, name_with_owner: str) -> Optional[Dict]:
+        """Bitta repository, uning tillari va topiclari (topilmasa None)"""
+        params = {'name': name_with_owner}
+        if self.layout == 'arrays':
+            rows = self._execute(REPOSITORY_DETAIL_ARRAYS_QUERY, params, name='repository_detail')
+            if not rows:
+                return None
+            row = rows[0]
+            base = len(REPOSITORY_COLUMNS)
+            language_names, language_sizes, topic_names, topic_stars = row[base:]
+            languages = sorted(zip(language_names, language_sizes), key=lambda item: (-item[1], item[0]))
+            return format_repository_detail(row[:base], languages, sorted(zip(topic_names, topic_stars)))
         
-        results = self.client.execute(query)
-        return [
-            {
-                'language': lang,
-                'repository_count': count,
-                'total_code_size_bytes': total_size,
-                'average_stars': round(avg_stars, 2),
-                'max_stars': max_stars
-            }
-            for lang, count, total_size, avg_stars, max_stars in results
-        ]
+        rows = self._execute(REPOSITORY_DETAIL_QUERY, params, name='repository_detail')
+        if not rows:
+            return None
+        row = rows[0]
+        params['year'] = row[REPOSITORY_COLUMNS.index(('created_year', 'H'))]
+        languages = self._execute(REPOSITORY_LANGUAGES_QUERY, params, name='repository_detail_languages')
+        topics = self._execute(REPOSITORY_TOPICS_QUERY, params, name='repository_detail_topics')
+        return format_repository_detail(row, languages, topics)
     
     def get_repository_count(self) -> int:
         """Jami repositorylar soni"""
-        result = self.client.execute('SELECT count() FROM github_analytics.repositories')
+        source = current_source('repositories', self.has_versioned_tables())
+        result = self._execute(f'SELECT count() FROM {source}', name='repository_count')
         return result[0][0]
+
+    def has_versioned_tables(self) -> bool:
+        """Asosiy jadvallar ReplacingMergeTree (versiyali) mi (eski o'rnatishlarda 0004 migratsiyasi kerak)"""
+        engines = self._execute(f'''
+            SELECT name, engine
+            FROM system.tables
+            WHERE database = 'github_analytics' AND name IN ({', '.join(f"'{t}'" for t in BASE_TABLES)})
+        ''', name='engine_check')
+        return len(engines) == len(BASE_TABLES) and all(engine.startswith('Replacing') for _, engine in engines)
+
+    def get_fingerprints(self, names: List[str]) -> Dict[str, int]:
+        """Repolarning oxirgi yozilgan fingerprintlari (yo'qlari natijada bo'lmaydi)"""
+        fingerprints = {}
+        for start in range(0, len(names), LOOKUP_CHUNK_SIZE):
+            chunk = tuple(names[start:start + LOOKUP_CHUNK_SIZE])
+            fingerprints.update(self._execute(FINGERPRINTS_QUERY, {'names': chunk}, name='fingerprints'))
+        return fingerprints
+
+    def _current_keys(self, table: str, key: str, repo_years: Dict[str, int]) -> Set[Tuple[str, str]]:
+        names = list(repo_years)
+        keys = set()
+        for start in range(0, len(names), LOOKUP_CHUNK_SIZE):
+            chunk = names[start:start + LOOKUP_CHUNK_SIZE]
+            params = {'names': tuple(chunk), 'years': tuple({repo_years[name] for name in chunk})}
+            keys.update(self._execute(CURRENT_KEYS_QUERY.format(table=table, key=key), params,
+                                      name=f'current_keys:{table}'))
+        return keys
+
+    def _insert_tombstones(self, block, repo_years: Dict[str, int]):
+        """
+        Qayta yozilayotgan repolarning yangi blokda yo'q tillari/topiclari uchun
+        ``is_deleted = 1`` qatorlar: ReplacingMergeTree ularni birlashtirishda
+        (va FINAL da) tashlab yuboradi.
+        """
+        columnar = isinstance(block, ColumnarBlock)
+        for table, spec, key, data in (
+            ('repository_languages', LANGUAGE_COLUMNS, 'language', block.languages),
+            ('repository_topics', TOPIC_COLUMNS, 'topic', block.topics),
+        ):
+            written = set(zip(block_column(data, spec, 'repo_name_with_owner', columnar),
+                              block_column(data, spec, key, columnar)))
+            removed = sorted(self._current_keys(table, key, repo_years) - written)
+            if not removed:
+                continue
+            values = {'repo_name_with_owner': 0, key: 1}
+            rows = [
+                tuple(
+                    (repo, item)[values[name]] if name in values
+                    else repo_years[repo] if name == 'created_year'
+                    else 0 if typecode else ''
+                    for name, typecode in spec
+                ) + (1,)
+                for repo, item in removed
+            ]
+            self._execute(insert_query(table, spec + [('is_deleted', 'B')]), rows, name=f'tombstones:{table}')
+            logger.info(f"✅ {table}: {len(rows)} ta olib tashlangan yozuv belgilandi")
+
+    def upsert_block(self, block, dedup_token: Optional[str] = None, refresh_rollup: bool = True) -> Set[int]:
+        """
+        Blokdagi repolarni yangi versiya sifatida yozadi: yillar rollup uchun
+        belgilanadi, keyin olib tashlangan tillar/topiclar uchun tombstone va
+        ``insert_block``. ``refresh_rollup`` bo'lsa belgilangan yillar rollupi
+        shu zahoti qayta hisoblanadi. Jadvallar hali versiyali bo'lmasa oddiy
+        ``insert_block``. Natija: tegilgan yillar.
+        """
+        columnar = isinstance(block, ColumnarBlock)
+        names = block_column(block.repositories, REPOSITORY_COLUMNS, 'name_with_owner', columnar)
+        years = block_column(block.repositories, REPOSITORY_COLUMNS, 'created_year', columnar)
+        if not self.has_versioned_tables():
+            self.insert_block(block, dedup_token=dedup_token)
+            return set(years)
+        # Tombstonelar ham view orqali rollupga tushadi: yillar ulardan oldin belgilanadi
+        self.mark_rollup_years(years)
+        if self.layout == 'tables' and names:
+            self._insert_tombstones(block, dict(zip(names, years)))
+        self.insert_block(block, dedup_token=dedup_token)
+        if refresh_rollup:
+            self.refresh_pending_rollup(years)
+        return set(years)
+
+    def insert_changed(self, repositories: List[Dict], columnar: bool = False) -> DeltaResult:
+        """
+        Delta ingest: fingerprinti saqlanganidan farq qiladigan (yoki yangi)
+        repolarni transform qilib yozadi, o'zgarmaganlarini tashlab ketadi.
+        Fingerprintlar uch jadvalga yozuv muvaffaqiyatli bo'lgandan keyingina
+        yoziladi. Rollup yangilanmaydi: yillar belgilanadi, chaqiruvchi oxirida
+        ``refresh_pending_rollup`` ni chaqiradi.
+        """
+        fingerprints = {
+            repo['nameWithOwner']: repository_fingerprint(repo)
+            for repo in repositories
+            if isinstance(repo, dict) and repo.get('nameWithOwner')
+        }
+        stored = self.get_fingerprints(list(fingerprints))
+        changed = [
+            repo for repo in repositories
+            if not isinstance(repo, dict) or stored.get(repo.get('nameWithOwner')) != fingerprints.get(repo.get('nameWithOwner'))
+        ]
+        unchanged = len(repositories) - len(changed)
+        if not changed:
+            return DeltaResult(0, unchanged, 0, set())
+
+        block = transform_repositories_columnar(changed) if columnar else transform_repositories(changed)
+        years = self.upsert_block(block, refresh_rollup=False)
+        names = block_column(block.repositories, REPOSITORY_COLUMNS, 'name_with_owner', columnar)
+        created_years = block_column(block.repositories, REPOSITORY_COLUMNS, 'created_year', columnar)
+        # Fingerprint ma'lumot yozilgandan keyin: yozish uzilsa repo keyingi safar qayta yoziladi
+        if names:
+            self._execute(
+                f'INSERT INTO {FINGERPRINTS_TABLE} (name_with_owner, fingerprint, created_year) VALUES',
+                [(name, fingerprints[name], year) for name, year in zip(names, created_years)],
+                name='insert:repository_fingerprints',
+            )
+        return DeltaResult(len(names), unchanged, block.error_count, years)
+    
+    def is_partitioned_by_year(self) -> bool:
+        """Jadvallar created_year bo'yicha partitionlanganmi (eski o'rnatishlarda 0003 migratsiyasi kerak)"""
+        keys = self._execute(f'''
+            SELECT name, partition_key
+            FROM system.tables
+            WHERE database = 'github_analytics' AND name IN ({', '.join(f"'{t}'" for t in PARTITIONED_TABLES)})
+        ''', name='partition_check')
+        return len(keys) == len(PARTITIONED_TABLES) and all(key == 'created_year' for _, key in keys)
+    
+    def create_staging_tables(self, suffix: str = STAGING_SUFFIX):
+        """Asosiy jadvallar tuzilishining bo'sh nusxalari (REPLACE PARTITION bir xil tuzilishni talab qiladi)"""
+        for table in PARTITIONED_TABLES:
+            self._execute(f'DROP TABLE IF EXISTS github_analytics.{table}{suffix}')
+            self._execute(f'CREATE TABLE github_analytics.{table}{suffix} AS github_analytics.{table}')
+        logger.info("✅ Staging jadvallar yaratildi")
+    
+    def drop_staging_tables(self, suffix: str = STAGING_SUFFIX):
+        for table in PARTITIONED_TABLES:
+            self._execute(f'DROP TABLE IF EXISTS github_analytics.{table}{suffix}')
+    
+    def replace_years_from_staging(self, years: List[int], suffix: str = STAGING_SUFFIX) -> Dict[int, int]:
+        """
+        Staging jadvallardagi yillarni asosiy jadvallarga ``REPLACE PARTITION``
+        bilan ko'chiradi. Har bir partition atomik almashtiriladi: o'qishlar
+        eski yoki yangi ma'lumotni ko'radi, bo'sh holatni emas. Rollup ham
+        staging tillar jadvalidan hisoblanib, xuddi shunday almashtiriladi.
+        Staging da qatori yo'q yillar o'zgartirilmaydi. Natija: {yil: repolar soni}.
+        """
+        year_list = ', '.join(str(int(year)) for year in years)
+        for select in (language_rollup_select(f'github_analytics.repository_languages{suffix}'),
+                       language_rollup_arrays_select(f'github_analytics.repositories{suffix}')):
+            self._execute(f'INSERT INTO {LANGUAGE_ROLLUP_TABLE}{suffix} {select}', name='rollup_staging')
+        counts = dict(self._execute(f'''
+            SELECT created_year, count()
+            FROM github_analytics.repositories{suffix}
+            WHERE created_year IN ({year_list})
+            GROUP BY created_year
+        ''', name='staging_count'))
+        
+        # Yangi ClickHouse versiyalari bo'sh manbadan REPLACE PARTITION ni rad etadi:
+        # staging da partiti yo'q jadvallar uchun (masalan topicsiz yil) partition o'chiriladi
+        staged = {
+            (table, int(partition))
+            for table, partition in self._execute(f'''
+                SELECT DISTINCT table, partition
+                FROM system.parts
+                WHERE database = 'github_analytics' AND active
+                  AND table IN ({', '.join(f"'{t}{suffix}'" for t in PARTITIONED_TABLES)})
+            ''', name='staging_parts')
+        }
+        
+        replaced = {}
+        for year in years:
+            if not counts.get(year):
+                logger.warning(f"{year} yil uchun staging da ma'lumot yo'q, partition o'zgartirilmadi")
+                continue
+            for table in PARTITIONED_TABLES:
+                if (f'{table}{suffix}', year) in staged:
+                    self._execute(f'''
+                        ALTER TABLE github_analytics.{table}
+                        REPLACE PARTITION {int(year)} FROM github_analytics.{table}{suffix}
+                    ''', name='replace_partition')
+                else:
+                    self._execute(f'ALTER TABLE github_analytics.{table} DROP PARTITION {int(year)}',
+                                  name='drop_partition')
+            replaced[year] = counts[year]
+            logger.info(f"✅ {year} yil partitioni almashtirildi ({counts[year]} ta repository)")
+        return replaced
+    
+    def drop_years(self, years: List[int]):
+        """Berilgan yillarning partitionlarini barcha jadvallar va rollupdan o'chirish"""
+        for year in years:
+            for table in PARTITIONED_TABLES:
+                self._execute(f'ALTER TABLE github_analytics.{table} DROP PARTITION {int(year)}', name='drop_partition')
+            logger.info(f"✅ {year} yil ma'lumotlari o'chirildi")
     
     def clear_data(self):
         """Barcha ma'lumotlarni o'chirish"""
-        self.client.execute('TRUNCATE TABLE IF EXISTS github_analytics.repositories')
-        self.client.execute('TRUNCATE TABLE IF EXISTS github_analytics.repository_languages')
-        self.client.execute('TRUNCATE TABLE IF EXISTS github_analytics.repository_topics')
+        self._execute('TRUNCATE TABLE IF EXISTS github_analytics.repositories')
+        self._execute('TRUNCATE TABLE IF EXISTS github_analytics.repository_languages')
+        self._execute('TRUNCATE TABLE IF EXISTS github_analytics.repository_topics')
+        self._execute(f'TRUNCATE TABLE IF EXISTS {LANGUAGE_ROLLUP_TABLE}')
+        self._execute(f'TRUNCATE TABLE IF EXISTS {FINGERPRINTS_TABLE}')
+        self._execute(f'TRUNCATE TABLE IF EXISTS {PENDING_ROLLUP_TABLE}')
         logger.info("✅ Barcha ma'lumotlar tozalandi")
\ No newline at end of file
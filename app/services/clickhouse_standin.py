@@ -0,0 +1,169 @@
+# services/clickhouse_standin.py
+
+import re
+import threading
+import time
+from collections import defaultdict
+
+from clickhouse_driver.block import ColumnOrientedBlock, RowOrientedBlock
+from clickhouse_driver.bufferedwriter import BufferedSocketWriter
+from clickhouse_driver.context import Context
+from clickhouse_driver.streams.native import BlockOutputStream
+from clickhouse_driver.util.helpers import chunks, column_chunks
+
+from app.services import clickhouse_service as ch
+
+CH_TYPES = {'B': 'UInt8', 'H': 'UInt16', 'I': 'UInt32', 'Q': 'UInt64', 'q': 'Int64'}
+INSERT_BLOCK_SIZE = 1048576  # clickhouse_driver insert_block_size default
+
+TABLE_SPECS = {
+    'github_analytics.repositories': ch.REPOSITORY_COLUMNS,
+    'github_analytics.repository_languages': ch.LANGUAGE_COLUMNS,
+    'github_analytics.repository_topics': ch.TOPIC_COLUMNS,
+    'github_analytics.repository_fingerprints': [('name_with_owner', None), ('fingerprint', 'q'), ('created_year', 'H')],
+    'github_analytics.rollup_pending_years': [('created_year', 'H')],
+}
+
+_INSERT_RE = re.compile(r'^\s*INSERT\s+INTO\s+([\w.]+)', re.IGNORECASE)
+_COUNT_RE = re.compile(r'^\s*SELECT\s+count\(\)\s+FROM\s+([\w.]+)(?:\s+FINAL)?\s*$', re.IGNORECASE)
+_EXISTS_RE = re.compile(r'^\s*EXISTS\s+TABLE\b', re.IGNORECASE)
+_TRUNCATE_RE = re.compile(r'^\s*TRUNCATE\s+TABLE\s+(?:IF\s+EXISTS\s+)?([\w.]+)', re.IGNORECASE)
+
+
+class _CountingSocket:
+    """Yuborilgan baytlarni faqat sanaydigan soket o'rnini bosuvchi."""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    def sendall(self, data):
+        self.bytes_sent += len(data)
+
+
+class _ServerInfo:
+    used_revision = 54468
+    revision = 54468
+
+    def get_timezone(self):
+        return 'UTC'
+
+
+def column_types(spec):
+    types = []
+    for name, typecode in spec:
+        if name in ch.DATETIME_COLUMNS:
+            types.append((name, 'DateTime'))
+        elif name in ch.DATE_COLUMNS:
+            types.append((name, 'Date'))
+        else:
+            types.append((name, CH_TYPES[typecode] if typecode else 'String'))
+    return types
+
+
+def serialize_native(data, spec, columnar: bool, use_numpy: bool = False) -> int:
+    """
+    clickhouse_driver ning ``Client.send_data`` yo'lini tarmoqsiz takrorlaydi:
+    blok sinfi, bo'laklash va Native formatga yozish bir xil. Yozilgan
+    baytlar sonini qaytaradi.
+    """
+    context = Context()
+    context.server_info = _ServerInfo()
+    context.settings = {}
+    context.client_settings = {
+        'use_numpy': use_numpy,
+        'strings_as_bytes': False,
+        'strings_encoding': 'utf-8',
+        'input_format_null_as_default': False,
+    }
+    sock = _CountingSocket()
+    stream = BlockOutputStream(BufferedSocketWriter(sock, 1 << 20), context)
+    columns_with_types = column_types(spec)
+
+    if columnar:
+        if use_numpy:
+            from clickhouse_driver.numpy.helpers import column_chunks as numpy_column_chunks
+            parts = numpy_column_chunks(data, INSERT_BLOCK_SIZE)
+        else:
+            parts = column_chunks(data, INSERT_BLOCK_SIZE)
+        block_cls = ColumnOrientedBlock
+    else:
+        parts = chunks(data, INSERT_BLOCK_SIZE)
+        block_cls = RowOrientedBlock
+
+    for part in parts:
+        stream.write(block_cls(columns_with_types, part))
+    return sock.bytes_sent
+
+
+class StandInStats:
+    """Bir nechta stand-in mijozlar uchun umumiy hisoblagichlar (thread-safe)."""
+
+    def __init__(self):
+        self.rows = defaultdict(int)
+        self.bytes_sent = 0
+        self.insert_seconds = 0.0
+        self.inserts = 0
+        self._lock = threading.Lock()
+
+    def record_insert(self, table: str, rows: int, bytes_sent: int, seconds: float):
+        with self._lock:
+            self.rows[table] += rows
+            self.bytes_sent += bytes_sent
+            self.insert_seconds += seconds
+            self.inserts += 1
+
+    def truncate(self, table: str):
+        with self._lock:
+            self.rows.pop(table, None)
+
+
+class _StandInConnection:
+    connected = False
+
+    def ping(self):
+        return True
+
+
+class InProcessClickHouseClient:
+    """
+    Benchmarklar uchun serversiz ``clickhouse_driver.Client`` o'rnini bosuvchi.
+
+    INSERT ma'lumotlari haqiqiy mijoz kabi Native formatga seriyalanadi
+    (CPU va xotira narxi saqlanadi), lekin hech qayerga yuborilmaydi.
+    ``SELECT count()`` qo'shilgan qatorlar sonini, ``EXISTS TABLE`` 1 ni
+    qaytaradi, qolgan so'rovlar (DDL, TRUNCATE va h.k.) bo'sh natija beradi.
+    """
+
+    def __init__(self, stats: StandInStats = None):
+        self.stats = stats or StandInStats()
+        self.connection = _StandInConnection()
+
+    def execute(self, query: str, params=None, with_column_types: bool = False,
+                columnar: bool = False, settings=None, **kwargs):
+        match = _INSERT_RE.match(query)
+        # INSERT ... SELECT (rollup backfill) server ichida bajariladi: ma'lumot yo'q
+        if match and params is not None:
+            table = match.group(1)
+            started = time.perf_counter()
+            use_numpy = bool((settings or {}).get('use_numpy'))
+            # Staging (<jadval>__staging) jadvallari asosiy jadval ustunlariga ega
+            bytes_sent = serialize_native(params, TABLE_SPECS[table.split('__', 1)[0]], columnar, use_numpy)
+            rows = ch.block_row_count(params, columnar)
+            self.stats.record_insert(table, rows, bytes_sent, time.perf_counter() - started)
+            return rows
+
+        match = _COUNT_RE.match(query)
+        if match:
+            return [[self.stats.rows.get(match.group(1), 0)]]
+
+        if _EXISTS_RE.match(query):
+            # Jadvallar allaqachon bor deb hisoblanadi: backfill kerak emas
+            return [[1]]
+
+        match = _TRUNCATE_RE.match(query)
+        if match:
+            self.stats.truncate(match.group(1))
+        return []
+
+    def disconnect(self):
+        pass
@@ -0,0 +1,234 @@
+# services/export.py
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from django.db.models import Q
+
+from app.models import Repo
+from app.services.clickhouse_service import ClickHouseService, current_source
+from app.services.metrics import track_query
+
+try:
+    # Parquet eksporti ixtiyoriy: pyarrow o'rnatilmagan bo'lsa faqat CSV/NDJSON
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# (nom, ClickHouse ustuni, ORM maydoni, tur)
+EXPORT_COLUMNS: List[Tuple[str, str, str, str]] = [
+    ('name_with_owner', 'name_with_owner', 'name_with_owner', 'string'),
+    ('owner', 'owner', 'owner__login', 'string'),
+    ('name', 'name', 'name', 'string'),
+    ('description', 'description', 'description', 'string'),
+    ('primary_language', 'primary_language', 'primary_language__name', 'string'),
+    ('license', 'license', 'license', 'string'),
+    ('stars', 'stars', 'stars', 'int'),
+    ('forks', 'forks', 'forks', 'int'),
+    ('watchers', 'watchers', 'watchers', 'int'),
+    ('disk_usage_kb', 'disk_usage_kb', 'disk_usage_kb', 'int'),
+    ('is_fork', 'is_fork', 'is_fork', 'bool'),
+    ('is_archived', 'is_archived', 'is_archived', 'bool'),
+    ('created_year', 'created_year', 'created_year', 'int'),
+    ('created_at', 'created_at', 'created_at', 'datetime'),
+    ('pushed_at', 'pushed_at', 'pushed_at', 'datetime'),
+]
+
+COLUMN_NAMES = [name for name, _, _, _ in EXPORT_COLUMNS]
+
+# ClickHouse bloki / ORM sahifasi / Parquet row group hajmi
+DEFAULT_BLOCK_SIZE = 10000
+# CSV/NDJSON qatorlari shu hajmgacha yig'ilib bitta chunk sifatida yuboriladi
+CHUNK_BYTES = 64 * 1024
+
+
+class ExportFilters(NamedTuple):
+    year: Optional[int] = None
+    language: Optional[str] = None
+    min_stars: Optional[int] = None
+    max_stars: Optional[int] = None
+
+
+def _normalize(rows: Iterable[tuple]) -> Iterator[tuple]:
+    # ClickHouse UInt8 -> bool, naive DateTime -> UTC (ORM allaqachon aware qaytaradi)
+    kinds = [kind for _, _, _, kind in EXPORT_COLUMNS]
+    for row in rows:
+        yield tuple(
+            bool(value) if kind == 'bool' and value is not None
+            else value.replace(tzinfo=timezone.utc) if kind == 'datetime' and value is not None and value.tzinfo is None
+            else value
+            for kind, value in zip(kinds, row)
+        )
+
+
+def clickhouse_rows(filters: ExportFilters, block_size: int = DEFAULT_BLOCK_SIZE,
+                    service: Optional[ClickHouseService] = None) -> Iterator[tuple]:
+    """ClickHouse dan bloklab o'qish; tartib kafolatlanmaydi (saralash butun natijani kutadi)."""
+    conditions, params = [], {}
+    if filters.year is not None:
+        conditions.append('created_year = %(year)s')
+        params['year'] = filters.year
+    if filters.language is not None:
+        conditions.append('primary_language = %(language)s')
+        params['language'] = filters.language
+    if filters.min_stars is not None:
+        conditions.append('stars >= %(min_stars)s')
+        params['min_stars'] = filters.min_stars
+    if filters.max_stars is not None:
+        conditions.append('stars <= %(max_stars)s')
+        params['max_stars'] = filters.max_stars
+    service = service or ClickHouseService()
+    query = f'''
+        SELECT {', '.join(column for _, column, _, _ in EXPORT_COLUMNS)}
+        FROM {current_source('repositories', service.has_versioned_tables())}
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+    '''
+    rows = service.stream(query, params, settings={'max_block_size': block_size}, name='export')
+    return _normalize(rows)
+
+
+def orm_rows(filters: ExportFilters, page_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[tuple]:
+    """
+    ``Repo`` jadvalidan (stars, id) bo'yicha keyset sahifalash: har sahifa
+    oldingisining oxirgi kalitidan davom etadi, OFFSET ishlatilmaydi, shuning
+    uchun keyingi sahifalar sekinlashmaydi.
+    """
+    queryset = Repo.objects.all()
+    if filters.year is not None:
+        queryset = queryset.filter(created_year=filters.year)
+    if filters.language is not None:
+        queryset = queryset.filter(primary_language__name=filters.language)
+    if filters.min_stars is not None:
+        queryset = queryset.filter(stars__gte=filters.min_stars)
+    if filters.max_stars is not None:
+        queryset = queryset.filter(stars__lte=filters.max_stars)
+    fields = [field for _, _, field, _ in EXPORT_COLUMNS]
+    stars_index = fields.index('stars')
+    queryset = queryset.order_by('stars', 'id')
+
+    def pages():
+        last = None
+        while True:
+            page = queryset
+            if last is not None:
+                page = page.filter(Q(stars__gt=last[0]) | Q(stars=last[0], id__gt=last[1]))
+            with track_query('orm', 'export_page') as record:
+                rows = list(page.values_list(*fields, 'id')[:page_size])
+                record.result_rows = len(rows)
+            for row in rows:
+                yield row[:-1]
+            if len(rows) < page_size:
+                return
+            last = (rows[-1][stars_index], rows[-1][-1])
+
+    return _normalize(pages())
+
+
+def _text(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _chunked(lines: Iterable[str]) -> Iterator[bytes]:
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+class _Line:
+    """csv.writer yozgan satrni qaytaradi (butun faylni xotirada yig'maslik uchun)."""
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(rows: Iterable[tuple]) -> Iterator[bytes]:
+    writer = csv.writer(_Line())
+
+    def lines():
+        yield writer.writerow(COLUMN_NAMES)
+        for row in rows:
+            yield writer.writerow(['' if value is None else _text(value) for value in row])
+
+    return _chunked(lines())
+
+
+def ndjson_chunks(rows: Iterable[tuple]) -> Iterator[bytes]:
+    return _chunked(
+        json.dumps({name: _text(value) for name, value in zip(COLUMN_NAMES, row)}, ensure_ascii=False) + '\n'
+        for row in rows
+    )
+
+
+class _ChunkSink(io.RawIOBase):
+    """ParquetWriter yozgan baytlarni yig'adi; ``drain`` ularni olib, buferni bo'shatadi."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_schema():
+    types = {'string': pa.string(), 'int': pa.int64(), 'bool': pa.bool_(), 'datetime': pa.timestamp('s', tz='UTC')}
+    return pa.schema([(name, types[kind]) for name, _, _, kind in EXPORT_COLUMNS])
+
+
+def parquet_chunks(rows: Iterable[tuple], row_group_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[bytes]:
+    """Har ``row_group_size`` qator alohida row group bo'lib yoziladi va darhol yuboriladi."""
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def write(batch):
+        columns = list(zip(*batch))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema,
+        ))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= row_group_size:
+            write(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        write(batch)
+    writer.close()
+    yield sink.drain()
+
+
+# format -> (content type, fayl kengaytmasi, yozuvchi)
+FORMATS: Dict[str, Tuple[str, str, object]] = {
+    'csv': ('text/csv; charset=utf-8', 'csv', csv_chunks),
+    'ndjson': ('application/x-ndjson', 'ndjson', ndjson_chunks),
+    'parquet': ('application/vnd.apache.parquet', 'parquet', parquet_chunks),
+}
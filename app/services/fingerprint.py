@@ -0,0 +1,27 @@
+# services/fingerprint.py
+
+import hashlib
+import json
+from typing import Dict
+
+# Saqlanadigan ma'lumotga ta'sir qiluvchi JSON maydonlari (ClickHouse va ORM importlari uchun umumiy)
+FINGERPRINT_FIELDS = (
+    'nameWithOwner', 'owner', 'name', 'description', 'stars', 'forks', 'watchers',
+    'isFork', 'isArchived', 'languageCount', 'topicCount', 'diskUsageKb', 'pullRequests',
+    'issues', 'primaryLanguage', 'createdAt', 'pushedAt', 'defaultBranchCommitCount',
+    'license', 'assignableUserCount', 'codeOfConduct', 'forkingAllowed', 'languages', 'topics',
+)
+
+
+def repository_fingerprint(repo: Dict) -> int:
+    """
+    Repository yozuvining 64 bitli (ishorali, BIGINT/Int64 ga sig'adi) blake2b
+    xeshi. Kunlik dampdagi yozuv o'zgarmagan bo'lsa xesh ham o'zgarmaydi,
+    shuning uchun delta rejimi uni qayta transform qilmaydi va yozmaydi.
+    """
+    values = [repo.get(field) for field in FINGERPRINT_FIELDS]
+    # parent obyektining o'zi saqlanmaydi, faqat bor-yo'qligi (has_parent)
+    values.append(bool(repo.get('parent')))
+    payload = json.dumps(values, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
@@ -0,0 +1,96 @@
+# services/ingest_checkpoint.py
+
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointMismatch(Exception):
+    """Checkpoint boshqa fayl yoki boshqa batch size uchun yozilgan."""
+
+
+class IngestCheckpoint:
+    """
+    ``ingest_to_clickhouse`` uchun tugallangan batchlar jurnali.
+
+    Fayl har bir muvaffaqiyatli batchdan keyin atomik (tmp + rename) qayta
+    yoziladi. ``run_id`` birinchi ishga tushirishda yaratiladi va qayta
+    ishga tushirishlarda saqlanadi: shu sababli bir xil batch uchun
+    deduplikatsiya tokeni o'zgarmaydi, yangi import esa (masalan
+    ``clear_clickhouse_data`` dan keyin) boshqa tokenlar oladi.
+    """
+
+    def __init__(self, path: str, source: str, batch_size: int):
+        self.path = path
+        self.source = self._describe_source(source)
+        self.batch_size = batch_size
+        self.run_id = uuid.uuid4().hex
+        self.completed = set()
+        self.resumed = False
+        self._load()
+
+    @staticmethod
+    def _describe_source(source: str) -> Dict:
+        stat = os.stat(source)
+        return {'path': os.path.abspath(source), 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('source') != self.source:
+            raise CheckpointMismatch(
+                f"Checkpoint {self.path} boshqa fayl uchun yozilgan ({state.get('source')}). "
+                f"Uni o'chiring yoki boshqa --checkpoint yo'lini bering."
+            )
+        if state.get('batch_size') != self.batch_size:
+            raise CheckpointMismatch(
+                f"Checkpoint batch_size={state.get('batch_size')} bilan yozilgan, "
+                f"hozirgi --batch-size={self.batch_size}."
+            )
+        self.run_id = state['run_id']
+        self.completed = set(state.get('completed', []))
+        self.resumed = True
+        logger.info(f"Checkpoint yuklandi: {len(self.completed)} ta batch tugallangan")
+
+    def _save(self):
+        state = {
+            'run_id': self.run_id,
+            'source': self.source,
+            'batch_size': self.batch_size,
+            'completed': sorted(self.completed),
+        }
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def is_done(self, batch_num: int) -> bool:
+        return batch_num in self.completed
+
+    def mark_done(self, batch_num: int):
+        self.completed.add(batch_num)
+        self._save()
+
+    def dedup_token(self, batch_num: int) -> str:
+        """Batch uchun deterministik token (jadval nomi INSERT paytida qo'shiladi)."""
+        raw = f'{self.run_id}:{self.batch_size}:{batch_num}'
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    def finish(self):
+        """Import to'liq tugaganda checkpoint o'chiriladi."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def default_checkpoint_path(source: str) -> str:
+    return f'{source}.checkpoint.json'
+
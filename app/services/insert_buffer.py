@@ -0,0 +1,342 @@
+# services/insert_buffer.py
+
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from app.services.clickhouse_service import (
+    REPOSITORY_COLUMNS,
+    ClickHouseService,
+    ColumnarBlock,
+    transform_repositories_columnar,
+)
+from app.services.metrics import REGISTRY, Counter, Histogram, ROWS_BUCKETS
+from app.services.parallel_transform import merge_columnar_blocks
+from app.services.query_cache import CLICKHOUSE, bump_data_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_SETTINGS = {
+    'max_rows': 50000,                 # shuncha repository yig'ilsa yoziladi
+    'max_bytes': 32 * 1024 * 1024,     # yoki taxminiy hajm shundan oshsa
+    'max_wait': 5.0,                   # yoki eng eski yozuv shuncha soniya kutgan bo'lsa
+    'max_pending_rows': 200000,        # buferdagi + yozilayotgan qatorlar chegarasi (backpressure)
+    'put_timeout': 0,                  # to'la buferda joy bo'shashini kutish (soniya)
+    'retry_backoff': 1.0,              # muvaffaqiyatsiz flushdan keyingi kutish, har safar ikki baravar
+    'max_retry_backoff': 30.0,
+    'rollup_interval': 60.0,           # flushlardan keyin rollup shuncha soniyada bir qayta hisoblanadi
+}
+
+BUFFER_ROWS = REGISTRY.register(Counter(
+    'app_insert_buffer_rows_total', "Yangilanish buferi orqali o'tgan repositorylar (stage: accepted, rejected, flushed)",
+))
+BUFFER_FLUSHES = REGISTRY.register(Counter(
+    'app_insert_buffer_flushes_total', "Bufer flushlari (reason: rows, bytes, time, manual; result: ok, error)",
+))
+BUFFER_FLUSH_ROWS = REGISTRY.register(Histogram(
+    'app_insert_buffer_flush_rows', "Bitta flushda yozilgan repositorylar soni", ROWS_BUCKETS,
+))
+
+
+class BufferFull(Exception):
+    """Buferda joy yo'q: ClickHouse yozishga ulgurmayapti, so'rovni keyinroq qaytarish kerak."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def block_bytes(block: ColumnarBlock) -> int:
+    """Ustunli blokning taxminiy hajmi (satrlar uzunligi + sonli ustunlar baytlari)."""
+    total = 0
+    for columns in (block.repositories, block.languages, block.topics):
+        for column in columns:
+            if isinstance(column, array):
+                total += column.itemsize * len(column)
+            else:
+                total += sum(len(value) for value in column)
+    return total
+
+
+def _block_rows(block: ColumnarBlock) -> int:
+    return len(block.repositories[0]) if block.repositories else 0
+
+
+NAME_INDEX = [name for name, _ in REPOSITORY_COLUMNS].index('name_with_owner')
+
+
+def _select_rows(columns: List, keep: List[int]) -> List:
+    return [
+        array(column.typecode, (column[i] for i in keep)) if isinstance(column, array) else [column[i] for i in keep]
+        for column in columns
+    ]
+
+
+def latest_updates(blocks: List[ColumnarBlock]) -> List[ColumnarBlock]:
+    """
+    Bir flushda bitta repo bir necha marta kelgan bo'lsa faqat oxirgi
+    yangilanish qoladi: bitta INSERT dagi qatorlar bir xil versiya oladi va
+    ReplacingMergeTree ulardan qaysi birini qoldirishi kafolatlanmaydi.
+    Har blok ichida nomlar takrorlanmaydi (``add`` da).
+    """
+    seen = set()
+    latest = []
+    for block in reversed(blocks):
+        names = block.repositories[NAME_INDEX] if block.repositories else []
+        keep = [i for i, name in enumerate(names) if name not in seen]
+        seen.update(names)
+        if len(keep) < len(names):
+            kept = {names[i] for i in keep}
+            block = ColumnarBlock(
+                _select_rows(block.repositories, keep),
+                *(
+                    _select_rows(data, [i for i, name in enumerate(data[0]) if name in kept]) if data else data
+                    for data in (block.languages, block.topics)
+                ),
+                block.error_count,
+            )
+        latest.append(block)
+    latest.reverse()
+    return latest
+
+
+class InsertBuffer:
+    """
+    Kichik yangilanishlarni yig'ib, ClickHouse ga katta bloklar bilan
+    yozadigan write-behind bufer.
+
+    ``add`` yozuvlarni shu zahoti transform qiladi va buferga qo'yadi;
+    fon thread qatorlar soni, hajm yoki kutish vaqti chegarasiga yetganda
+    hammasini bitta INSERT bilan yozadi (har chaqiruv uchun alohida part
+    yaratilmaydi). Bir repoga kelgan yangilanishlardan oxirgisi yoziladi
+    (``upsert_block``: eski versiya almashtiriladi). Yozish muvaffaqiyatsiz bo'lsa, blok o'sha dedup token
+    bilan qayta yuboriladi. Buferdagi va yozilayotgan qatorlar
+    ``max_pending_rows`` dan oshsa ``add`` ``BufferFull`` ko'taradi.
+
+    Rollup har flushda emas, oxirgi muvaffaqiyatli flushdan ``rollup_interval``
+    soniya keyin (va yopilishda) ``refresh_pending_rollup`` bilan yangilanadi:
+    yozilgan yillar ``rollup_pending_years`` da turadi, jarayon to'xtasa
+    keyingi ingest ularni yangilaydi.
+    """
+
+    def __init__(self, service: Optional[ClickHouseService] = None, max_rows: int = 50000,
+                 max_bytes: int = 32 * 1024 * 1024, max_wait: float = 5.0, max_pending_rows: int = 200000,
+                 put_timeout: float = 0, retry_backoff: float = 1.0, max_retry_backoff: float = 30.0,
+                 rollup_interval: float = 60.0):
+        self.service = service or ClickHouseService()
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_wait = max_wait
+        self.max_pending_rows = max(max_pending_rows, max_rows)
+        self.put_timeout = put_timeout
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.rollup_interval = rollup_interval
+        self.pid = os.getpid()
+
+        self._blocks: List[ColumnarBlock] = []
+        self._rows = 0
+        self._bytes = 0
+        self._oldest: Optional[float] = None
+        self._inflight_rows = 0
+        self._flush_requested = False
+        self._closing = False
+        self._rollup_due: Optional[float] = None  # yangilanmagan flush bor bo'lsa rollup vaqti
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='clickhouse-insert-buffer', daemon=True)
+        self._thread.start()
+
+    @property
+    def pending_rows(self) -> int:
+        """Buferdagi va hozir yozilayotgan repositorylar soni."""
+        return self._rows + self._inflight_rows
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {'buffered_rows': self._rows, 'buffered_bytes': self._bytes, 'inflight_rows': self._inflight_rows}
+
+    def add(self, repositories: List[Dict]) -> Tuple[int, int]:
+        """Yozuvlarni buferga qo'shadi. ``(qabul qilingan, xatolik)`` juftligini qaytaradi."""
+        if len(repositories) > self.max_pending_rows:
+            raise ValueError(f"Bir so'rovda ko'pi bilan {self.max_pending_rows} ta repository")
+        # So'rov ichida takrorlangan repodan oxirgisi olinadi
+        repositories = list({
+            repo.get('nameWithOwner') or index if isinstance(repo, dict) else index: repo
+            for index, repo in enumerate(repositories)
+        }.values())
+        # Har bir yozuv uchun javob beriladi: xatoliklar ko'p bo'lsa ham to'xtatilmaydi
+        block = transform_repositories_columnar(repositories, max_errors=len(repositories))
+        rows = _block_rows(block)
+        if not rows:
+            return 0, block.error_count
+        size = block_bytes(block)
+
+        deadline = time.monotonic() + self.put_timeout
+        with self._condition:
+            while self.pending_rows + rows > self.max_pending_rows:
+                remaining = deadline - time.monotonic()
+                if self._closing or remaining <= 0:
+                    BUFFER_ROWS.inc(rows, stage='rejected')
+                    raise BufferFull(
+                        f"Yangilanish buferi to'la ({self.pending_rows}/{self.max_pending_rows} ta repository)",
+                        retry_after=self.max_wait,
+                    )
+                self._condition.wait(remaining)
+            self._blocks.append(block)
+            self._rows += rows
+            self._bytes += size
+            first = self._oldest is None
+            if first:
+                self._oldest = time.monotonic()
+            BUFFER_ROWS.inc(rows, stage='accepted')
+            # Birinchi yozuv fon threadning max_wait taymerini boshlaydi
+            if first or self._rows >= self.max_rows or self._bytes >= self.max_bytes:
+                self._condition.notify_all()
+        return rows, block.error_count
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Buferdagini darhol yozdiradi va tugashini kutadi. Vaqt tugasa False."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            while self.pending_rows:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 30):
+        """Qolgan yozuvlarni yozib, fon threadni to'xtatadi."""
+        flushed = self.flush(timeout)
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        if not flushed:
+            logger.error(f"Yangilanish buferi yopildi, {self.pending_rows} ta repository yozilmadi")
+
+    def _flush_reason(self, now: float) -> Optional[str]:
+        if not self._rows:
+            return None
+        if self._rows >= self.max_rows:
+            return 'rows'
+        if self._bytes >= self.max_bytes:
+            return 'bytes'
+        if self._flush_requested or self._closing:
+            return 'manual'
+        if now - self._oldest >= self.max_wait:
+            return 'time'
+        return None
+
+    def _wait_timeout(self, now: float) -> Optional[float]:
+        deadlines = [due for due in (self._oldest and self._oldest + self.max_wait, self._rollup_due) if due]
+        return min(deadlines) - now if deadlines else None
+
+    def _take(self) -> Tuple[Optional[ColumnarBlock], Optional[str]]:
+        """
+        Flush vaqti kelguncha kutadi va buferdagi bloklarni oladi (lock ichida).
+        Rollup vaqti flushdan oldin kelsa ``(None, 'rollup')``.
+        """
+        while True:
+            now = time.monotonic()
+            reason = self._flush_reason(now)
+            if reason is not None:
+                break
+            if self._closing:
+                return None, None
+            if self._rollup_due is not None and now >= self._rollup_due:
+                return None, 'rollup'
+            self._flush_requested = False
+            self._condition.wait(self._wait_timeout(now))
+        blocks, self._blocks = self._blocks, []
+        self._inflight_rows, self._rows, self._bytes, self._oldest = self._rows, 0, 0, None
+        self._flush_requested = False
+        return merge_columnar_blocks(latest_updates(blocks)), reason
+
+    def _run(self):
+        while True:
+            with self._condition:
+                block, reason = self._take()
+            if block is None:
+                if self._rollup_due is not None:
+                    self._refresh_rollup()
+                if reason is None:
+                    return
+                continue
+            self._write(block, reason)
+            with self._condition:
+                self._inflight_rows = 0
+                self._condition.notify_all()
+
+    def _write(self, block: ColumnarBlock, reason: str):
+        rows = _block_rows(block)
+        # Qayta urinishlar bir xil token bilan: server avval yozilgan jadvallarni tashlab yuboradi
+        dedup_token = uuid.uuid4().hex
+        backoff = self.retry_backoff
+        while True:
+            try:
+                self.service.upsert_block(block, dedup_token=dedup_token, refresh_rollup=False)
+                break
+            except Exception as e:
+                BUFFER_FLUSHES.inc(reason=reason, result='error')
+                logger.error(f"Yangilanish buferini yozishda xatolik ({rows} ta repository), "
+                             f"{backoff:g} s dan keyin qayta urinamiz: {e}")
+                with self._condition:
+                    if self._closing:
+                        logger.error(f"Bufer yopilmoqda: {rows} ta repository yozilmadi")
+                        return
+                    self._condition.wait(backoff)
+                backoff = min(backoff * 2, self.max_retry_backoff)
+        BUFFER_FLUSHES.inc(reason=reason, result='ok')
+        BUFFER_FLUSH_ROWS.observe(rows)
+        BUFFER_ROWS.inc(rows, stage='flushed')
+        logger.info(f"✅ Yangilanish buferi yozildi: {rows} ta repository ({reason})")
+        bump_data_version(CLICKHOUSE)
+        with self._condition:
+            if self._rollup_due is None:
+                self._rollup_due = time.monotonic() + self.rollup_interval
+
+    def _refresh_rollup(self):
+        try:
+            years = self.service.refresh_pending_rollup()
+        except Exception as e:
+            # Yillar rollup_pending_years da qoladi: keyingi urinish yoki ingest yangilaydi
+            logger.error(f"Bufer yozgan yillar rollupini yangilashda xatolik: {e}")
+            with self._condition:
+                self._rollup_due = time.monotonic() + self.rollup_interval
+            return
+        with self._condition:
+            self._rollup_due = None
+        logger.info(f"✅ Bufer yozgan yillar rollupi yangilandi: {', '.join(map(str, years))}")
+        bump_data_version(CLICKHOUSE)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def build_buffer_from_settings() -> InsertBuffer:
+    config = settings.CLICKHOUSE_SETTINGS.get('insert_buffer', {})
+    return InsertBuffer(**{**DEFAULT_BUFFER_SETTINGS, **config})
+
+
+def get_insert_buffer() -> InsertBuffer:
+    """Jarayon bo'yicha yagona bufer; jarayon tugaganda qolgani yoziladi."""
+    global _buffer
+    buffer = _buffer
+    if buffer is not None and buffer.pid == os.getpid():
+        return buffer
+    with _buffer_lock:
+        if _buffer is None or _buffer.pid != os.getpid():
+            _buffer = build_buffer_from_settings()
+            atexit.register(_buffer.close)
+        return _buffer
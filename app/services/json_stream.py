@@ -0,0 +1,117 @@
+# services/json_stream.py
+
+import json
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+# Fayldan bir martada o'qiladigan qism hajmi (belgilar soni)
+CHUNK_SIZE = 1 << 20
+# Bitta obyektning eng katta hajmi: buzilgan (yopilmagan) obyektda bufer cheksiz o'smasligi uchun
+MAX_OBJECT_SIZE = 16 * CHUNK_SIZE
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+
+
+def _decode_error(msg: str, buf: str, pos: int, offset: int, line: int, line_start: int) -> json.JSONDecodeError:
+    """Bufer ichidagi ``pos`` ni fayl boshidan hisoblangan qator/ustun/belgi bilan xatoga aylantiradi."""
+    char = offset + pos
+    newlines = buf.count('\n', 0, pos)
+    if newlines:
+        line_start = offset + buf.rindex('\n', 0, pos) + 1
+    err = json.JSONDecodeError(msg, buf, pos)
+    err.pos = char
+    err.lineno = line + newlines + 1
+    err.colno = char - line_start + 1
+    err.args = (f'{msg}: line {err.lineno} column {err.colno} (char {char})',)
+    return err
+
+
+def iter_repositories(
+    path: str, chunk_size: int = CHUNK_SIZE, max_object_size: int = MAX_OBJECT_SIZE
+) -> Iterator[Dict]:
+    """
+    JSON fayldan repository obyektlarini bittalab o'qiydi.
+
+    Yuqori darajadagi massiv (``[{...}, {...}]``) ham, NDJSON (har qatorda
+    bitta obyekt) ham qo'llab-quvvatlanadi. Xotirada faqat joriy qism va
+    bitta obyekt saqlanadi, butun fayl emas. ``max_object_size`` dan katta
+    yoki buzilgan obyektda fayldagi pozitsiyasi bilan ``JSONDecodeError``.
+    """
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        buf = ''
+        pos = 0
+        eof = False
+        in_array = None
+        # buf[0] ning fayldagi o'rni, undan oldingi qatorlar soni va joriy qator boshi
+        offset = line = line_start = 0
+
+        def error(msg, at):
+            return _decode_error(msg, buf, at, offset, line, line_start)
+
+        def read_more():
+            nonlocal buf, pos, eof, offset, line, line_start
+            pending = len(buf) - pos
+            if pending >= max_object_size:
+                raise error(f"Obyekt {max_object_size} belgidan katta yoki yopilmagan", pos)
+            # Tugallanmagan obyekt bilan bufer ikki baravar o'sadi: qayta urinishlar soni logarifmik
+            chunk = f.read(max(chunk_size, pending))
+            if not chunk:
+                eof = True
+                return
+            newlines = buf.count('\n', 0, pos)
+            if newlines:
+                line += newlines
+                line_start = offset + buf.rindex('\n', 0, pos) + 1
+            offset += pos
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        while True:
+            # Bo'sh joylarni (massiv ichida esa vergullarni ham) o'tkazib yuborish
+            while True:
+                while pos < len(buf) and (buf[pos] in _WHITESPACE or (in_array and buf[pos] == ',')):
+                    pos += 1
+                if pos < len(buf) or eof:
+                    break
+                read_more()
+
+            if pos >= len(buf):
+                if in_array:
+                    raise error("Massiv yopilmagan", pos)
+                return
+
+            if in_array is None:
+                in_array = buf[pos] == '['
+                if in_array:
+                    pos += 1
+                continue
+
+            if in_array and buf[pos] == ']':
+                return
+
+            try:
+                obj, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise error(e.msg, e.pos) from None
+                read_more()
+                continue
+
+            # Qism chegarasida kesilgan skalyar qiymatlar uchun
+            if end == len(buf) and not eof:
+                read_more()
+                continue
+
+            pos = end
+            yield obj
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[List]:
+    """Iteratorni ``batch_size`` o'lchamli ro'yxatlarga bo'ladi."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,83 @@
+import logging
+from typing import Dict, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from app.models import LanguageYearStat, RepoLanguage
+
+logger = logging.getLogger(__name__)
+
+# (year, language_id) -> (total_size, repo_count)
+Totals = Dict[Tuple[int, int], Tuple[int, int]]
+
+
+def language_year_totals(**repo_language_filters) -> Totals:
+    """Aggregate the RepoLanguage rows matching ``repo_language_filters`` by (created_year, language)."""
+    rows = (
+        RepoLanguage.objects
+        .filter(repo__created_year__isnull=False, **repo_language_filters)
+        .values_list('repo__created_year', 'language_id')
+        .annotate(total_size=Sum('size'), repo_count=Count('id'))
+        .order_by()
+    )
+    return {(year, language_id): (int(size or 0), count) for year, language_id, size, count in rows}
+
+
+@transaction.atomic
+def apply_language_year_changes(before: Totals, after: Totals) -> int:
+    """
+    Add ``after - before`` to LanguageYearStat.
+
+    Callers take ``before`` and ``after`` over the same set of repos around
+    a write, so rows skipped by ``ignore_conflicts`` or replaced in delta
+    mode are accounted for exactly. Returns the number of stat rows touched.
+    """
+    changes = {}
+    for key in before.keys() | after.keys():
+        old_size, old_count = before.get(key, (0, 0))
+        new_size, new_count = after.get(key, (0, 0))
+        if new_size != old_size or new_count != old_count:
+            changes[key] = (new_size - old_size, new_count - old_count)
+    if not changes:
+        return 0
+
+    existing = {
+        (stat.year, stat.language_id): stat
+        for stat in LanguageYearStat.objects.select_for_update().filter(
+            year__in={year for year, _ in changes},
+            language_id__in={language_id for _, language_id in changes},
+        )
+    }
+    to_create, to_update, emptied = [], [], []
+    for (year, language_id), (size, count) in changes.items():
+        stat = existing.get((year, language_id))
+        if stat is None:
+            to_create.append(LanguageYearStat(year=year, language_id=language_id, total_size=size, repo_count=count))
+            continue
+        stat.total_size += size
+        stat.repo_count += count
+        if stat.repo_count <= 0:
+            emptied.append(stat.id)
+        else:
+            to_update.append(stat)
+    LanguageYearStat.objects.bulk_create(to_create)
+    LanguageYearStat.objects.bulk_update(to_update, ['total_size', 'repo_count'], batch_size=500)
+    LanguageYearStat.objects.filter(id__in=emptied).delete()
+    return len(changes)
+
+
+@transaction.atomic
+def rebuild_language_year_stats() -> int:
+    """Recompute LanguageYearStat from scratch with one aggregate query. Returns the row count."""
+    totals = language_year_totals()
+    LanguageYearStat.objects.all().delete()
+    LanguageYearStat.objects.bulk_create(
+        [
+            LanguageYearStat(year=year, language_id=language_id, total_size=size, repo_count=count)
+            for (year, language_id), (size, count) in totals.items()
+        ],
+        batch_size=1000,
+    )
+    logger.info("LanguageYearStat rebuilt: %d rows", len(totals))
+    return len(totals)
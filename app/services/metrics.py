@@ -0,0 +1,184 @@
+# services/metrics.py
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+# Prometheus client kutubxonasidagi standart chegaralar (soniya)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Natija/o'qilgan qatorlar uchun
+ROWS_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: Tuple, extra: Tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ''
+    escaped = (
+        f'{name}="' + value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') + '"'
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def collect(self) -> Iterable[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(key)} {_format_value(value)}'
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # key -> [bucket sanoqlari, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(_label_key(labels))
+        return state[2] if state else 0
+
+    def collect(self) -> Iterable[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        for key, (buckets, total, count) in items:
+            cumulative = 0
+            for bound, observed in zip(self.buckets, buckets):
+                cumulative += observed
+                yield f'{self.name}_bucket{_format_labels(key, (("le", _format_value(bound)),))} {cumulative}'
+            yield f'{self.name}_bucket{_format_labels(key, (("le", "+Inf"),))} {count}'
+            yield f'{self.name}_sum{_format_labels(key)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(key)} {count}'
+
+
+class Registry:
+    """Jarayon bo'yicha metrikalar. Har bir worker jarayon o'z qiymatlarini beradi."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+QUERY_DURATION = REGISTRY.register(Histogram(
+    'app_query_duration_seconds', "Analitik so'rovlarning bajarilish vaqti (backend, query bo'yicha)",
+))
+QUERY_ROWS_READ = REGISTRY.register(Histogram(
+    'app_query_rows_read', "So'rov o'qigan qatorlar (ClickHouse progress ma'lumoti)", ROWS_BUCKETS,
+))
+QUERY_BYTES_READ = REGISTRY.register(Counter(
+    'app_query_bytes_read_total', "So'rovlar o'qigan baytlar yig'indisi",
+))
+QUERY_RESULT_ROWS = REGISTRY.register(Histogram(
+    'app_query_result_rows', "So'rov natijasidagi qatorlar soni", ROWS_BUCKETS,
+))
+QUERY_ERRORS = REGISTRY.register(Counter(
+    'app_query_errors_total', "Xatolik bilan tugagan so'rovlar",
+))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    'app_http_request_duration_seconds', "Endpointlar javob vaqti (endpoint, method, status bo'yicha)",
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'app_query_cache_requests_total', "Natija keshiga murojaatlar (result: hit, miss, coalesced)",
+))
+
+
+class QueryRecord:
+    """``track_query`` ichida to'ldiriladigan qiymatlar (noma'lumlari None qoladi)."""
+
+    __slots__ = ('rows_read', 'bytes_read', 'result_rows')
+
+    def __init__(self):
+        self.rows_read: Optional[int] = None
+        self.bytes_read: Optional[int] = None
+        self.result_rows: Optional[int] = None
+
+
+@contextmanager
+def track_query(backend: str, name: str):
+    """
+    So'rovni o'lchaydi: ``with track_query('clickhouse', 'language_statistics') as record``.
+    Vaqt har doim yoziladi, o'qilgan qatorlar/baytlar va natija hajmi esa
+    ``record`` da berilgan bo'lsa.
+    """
+    record = QueryRecord()
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        QUERY_ERRORS.inc(backend=backend, query=name)
+        raise
+    finally:
+        QUERY_DURATION.observe(time.perf_counter() - started, backend=backend, query=name)
+    if record.rows_read is not None:
+        QUERY_ROWS_READ.observe(record.rows_read, backend=backend, query=name)
+    if record.bytes_read is not None:
+        QUERY_BYTES_READ.inc(record.bytes_read, backend=backend, query=name)
+    if record.result_rows is not None:
+        QUERY_RESULT_ROWS.observe(record.result_rows, backend=backend, query=name)
+
+
+def record_cache(scope: str, key: str, result: str):
+    # Kalitning parametrsiz qismi (yil/limit label sifatida kardinallikni oshirmasin)
+    CACHE_REQUESTS.inc(scope=scope, name=key.split(':', 1)[0], result=result)
+
+
+def render() -> str:
+    return REGISTRY.render()
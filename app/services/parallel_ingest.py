@@ -0,0 +1,166 @@
+# services/parallel_ingest.py
+
+import logging
+import multiprocessing
+import queue
+from collections import deque
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from app.services import arrow_ingest
+from app.services.clickhouse_service import ClickHouseService
+
+logger = logging.getLogger(__name__)
+
+# Har bir ishchiga navbatda shuncha batch kutadi: xotira ~ workers * (QUEUE_DEPTH + 1) batch
+QUEUE_DEPTH = 2
+# Natija kutilayotganda ishchilar tirikligi shu oraliqda tekshiriladi (soniya)
+POLL_INTERVAL = 0.5
+
+
+class BatchResult(NamedTuple):
+    batch_num: int
+    rows: int
+    error_count: int
+    error: Optional[str]  # batch yuklanmagan bo'lsa xatolik matni
+    worker: int
+
+
+class WorkerCrashed(Exception):
+    """Ishchi jarayon batchni tugatmasdan to'xtadi."""
+
+
+def _ingest_worker(worker_id: int, tasks, results, columnar: bool, arrow: bool, suffix: str, mark_rollup: bool):
+    """
+    Ishchi jarayon: navbatdan ``(batch_num, batch, dedup_token)`` olib,
+    transform qiladi va o'z ulanishi orqali yozadi. ``None`` - to'xtash belgisi.
+    """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        # spawn rejimida (macOS/Windows) Django qayta sozlanadi
+        django.setup()
+
+    # get_pool() jarayon PID siga qaraydi: ishchi ota jarayon soketlarini emas, o'z havzasini oladi
+    service = ClickHouseService()
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            batch_num, batch, dedup_token = task
+            try:
+                if arrow:
+                    block = arrow_ingest.batch_to_block(batch)
+                    service.insert_block(block, dedup_token=dedup_token, suffix=suffix, mark_rollup=mark_rollup)
+                    error_count = block.error_count
+                else:
+                    error_count = service.insert_repository_date(
+                        batch, columnar=columnar, dedup_token=dedup_token, suffix=suffix, mark_rollup=mark_rollup
+                    ) or 0
+                results.put(BatchResult(batch_num, len(batch), error_count, None, worker_id))
+            except Exception as e:
+                logger.error(f"Ishchi {worker_id}: batch {batch_num} da xatolik: {e}")
+                results.put(BatchResult(batch_num, len(batch), 0, str(e) or type(e).__name__, worker_id))
+    finally:
+        service.pool.close()
+
+
+class ParallelIngester:
+    """
+    Batchlarni ``workers`` ta jarayonga taqsimlab ClickHouse ga yozadi.
+
+    Har bir ishchi batchni o'zi transform qiladi va o'z ulanishi orqali
+    yuboradi. Vazifalar navbati chegaralangan: ishchilar ortda qolsa,
+    o'qish to'xtab turadi. ``ingest`` natijalarni batchlar yuborilgan
+    tartibda qaytaradi, shuning uchun progress va checkpoint ketma-ket
+    yuradi; tugallangan, lekin hali qaytarilmagan batchlar qayta ishga
+    tushirishda yana yuboriladi va dedup token bilan tashlab yuboriladi.
+    ``mark_rollup`` - ishchilar batch yillarini rollup uchun belgilaydi
+    (``ClickHouseService.insert_block``).
+    """
+
+    def __init__(self, workers: int, columnar: bool = False, arrow: bool = False,
+                 suffix: str = '', queue_depth: int = QUEUE_DEPTH, mark_rollup: bool = False):
+        self.workers = workers
+        context = multiprocessing.get_context()
+        self.tasks = context.Queue(maxsize=workers * queue_depth)
+        self.results = context.Queue()
+        self.processes = [
+            context.Process(
+                target=_ingest_worker,
+                args=(worker_id, self.tasks, self.results, columnar, arrow, suffix, mark_rollup),
+                name=f'ingest-worker-{worker_id}',
+                daemon=True,
+            )
+            for worker_id in range(1, workers + 1)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def _check_workers(self):
+        dead = [process for process in self.processes if not process.is_alive()]
+        if dead:
+            raise WorkerCrashed(
+                ', '.join(f'{process.name} (exit code {process.exitcode})' for process in dead)
+                + " kutilmaganda to'xtadi"
+            )
+
+    def _collect(self, done: Dict[int, BatchResult], timeout: Optional[float]):
+        """Kelgan natijalarni ``done`` ga yig'adi; ``timeout`` berilsa birinchisini shuncha kutadi."""
+        try:
+            result = self.results.get(timeout=timeout) if timeout else self.results.get_nowait()
+        except queue.Empty:
+            self._check_workers()
+            return
+        while True:
+            done[result.batch_num] = result
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                return
+
+    def ingest(self, batches: Iterable[Tuple[int, object, Optional[str]]]) -> Iterator[BatchResult]:
+        """``(batch_num, batch, dedup_token)`` lar uchun ``BatchResult`` larni yuborilish tartibida qaytaradi."""
+        order = deque()
+        done: Dict[int, BatchResult] = {}
+
+        def ready():
+            while order and order[0] in done:
+                yield done.pop(order.popleft())
+
+        for batch_num, batch, dedup_token in batches:
+            while True:
+                try:
+                    self.tasks.put((batch_num, batch, dedup_token), timeout=POLL_INTERVAL)
+                    break
+                except queue.Full:
+                    # Navbat to'la: o'qish to'xtaydi, shu orada tayyor natijalar chiqariladi
+                    self._collect(done, timeout=None)
+                    yield from ready()
+            order.append(batch_num)
+            self._collect(done, timeout=None)
+            yield from ready()
+
+        while order:
+            self._collect(done, timeout=POLL_INTERVAL)
+            yield from ready()
+
+    def close(self, abort: bool = False):
+        if not abort:
+            for _ in self.processes:
+                self.tasks.put(None)
+            for process in self.processes:
+                process.join()
+        else:
+            # Navbatdagi batchlar yuborilmaydi
+            self.tasks.cancel_join_thread()
+            for process in self.processes:
+                process.terminate()
+            for process in self.processes:
+                process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(abort=exc_type is not None)
@@ -0,0 +1,112 @@
+# services/parallel_transform.py
+
+from concurrent.futures import ProcessPoolExecutor, Future
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from app.services.clickhouse_service import (
+    ColumnarBlock,
+    TransformedBlock,
+    transform_repositories,
+    transform_repositories_columnar,
+)
+
+
+def split_batch(batch: List[Dict], parts: int) -> List[List[Dict]]:
+    """Batchni taxminan teng ``parts`` bo'lakka ajratadi (tartib saqlanadi)."""
+    size = max(1, -(-len(batch) // parts))
+    return [batch[i:i + size] for i in range(0, len(batch), size)]
+
+
+def merge_blocks(blocks: Iterable[TransformedBlock]) -> TransformedBlock:
+    """Ishchilardan qaytgan bloklarni bitta blokka birlashtiradi."""
+    main_data, language_data, topic_data = [], [], []
+    error_count = 0
+    for block in blocks:
+        main_data.extend(block.repositories)
+        language_data.extend(block.languages)
+        topic_data.extend(block.topics)
+        error_count += block.error_count
+    return TransformedBlock(main_data, language_data, topic_data, error_count)
+
+
+def merge_columnar_blocks(blocks: Iterable[ColumnarBlock]) -> ColumnarBlock:
+    """Ustunli bloklarni ustunma-ustun birlashtiradi."""
+    merged = None
+    error_count = 0
+    for block in blocks:
+        error_count += block.error_count
+        if merged is None:
+            merged = (block.repositories, block.languages, block.topics)
+            continue
+        for target, source in zip(merged, (block.repositories, block.languages, block.topics)):
+            for column, part in zip(target, source):
+                column.extend(part)
+    if merged is None:
+        return ColumnarBlock([], [], [], 0)
+    return ColumnarBlock(*merged, error_count)
+
+
+class ParallelTransformer:
+    """
+    ``transform_repositories`` ni bir nechta jarayonda bajaradi.
+
+    Har bir batch ``workers`` ta bo'lakka bo'linadi. ``transform_batches``
+    keyingi batchni ishchilarga yuborib bo'lgach joriy blokni qaytaradi,
+    shuning uchun oldingi blokni ClickHouse ga yozish bilan keyingisini
+    transform qilish bir vaqtda kechadi. ``max_errors`` butun batch uchun:
+    birlashtirishda chegaradan oshgan bo'lak qolgan ulush bilan qayta
+    transform qilinadi, keyingi bo'laklar tashlanadi, natija ketma-ket
+    ``transform_repositories`` bilan bir xil bo'ladi.
+    """
+
+    def __init__(self, workers: int, columnar: bool = False, max_errors: int = 100):
+        self.workers = workers
+        self.columnar = columnar
+        self.max_errors = max_errors
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    @property
+    def transform(self):
+        return transform_repositories_columnar if self.columnar else transform_repositories
+
+    def submit(self, batch: List[Dict]) -> List[Future]:
+        # Bitta bo'lak butun batch chegarasidan oshsa batch ham oshadi: undan ortig'i kerak emas
+        transform = partial(self.transform, max_errors=self.max_errors)
+        return [self.executor.submit(transform, part) for part in split_batch(batch, self.workers)]
+
+    def collect(self, futures: List[Future], batch: List[Dict]):
+        merge = merge_columnar_blocks if self.columnar else merge_blocks
+        blocks = []
+        error_count = 0
+        for part, future in zip(split_batch(batch, self.workers), futures):
+            block = future.result()
+            if error_count + block.error_count > self.max_errors:
+                # Ketma-ket transform shu bo'lak ichida to'xtagan bo'lardi
+                blocks.append(self.transform(part, max_errors=self.max_errors - error_count))
+                for rest in futures:
+                    rest.cancel()
+                break
+            error_count += block.error_count
+            blocks.append(block)
+        return merge(blocks)
+
+    def transform_batches(self, batches: Iterable[Tuple[int, List[Dict]]]) -> Iterator[Tuple[int, List[Dict], TransformedBlock]]:
+        """``(batch_num, batch)`` juftliklari uchun ``(batch_num, batch, block)`` ni tartib bilan qaytaradi."""
+        pending = None
+        for batch_num, batch in batches:
+            futures = self.submit(batch)
+            if pending is not None:
+                yield pending[0], pending[1], self.collect(pending[2], pending[1])
+            pending = (batch_num, batch, futures)
+        if pending is not None:
+            yield pending[0], pending[1], self.collect(pending[2], pending[1])
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
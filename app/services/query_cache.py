@@ -0,0 +1,158 @@
+# services/query_cache.py
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+
+from app.services.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+# Ma'lumot manbalari: har biri o'z versiyasiga ega
+CLICKHOUSE = 'clickhouse'
+ORM = 'orm'
+
+_MISSING = object()
+# Kalit bo'yicha lock lug'ati versiya o'zgargan sari cheksiz o'sardi: qat'iy sonli
+# lock, bir lockka tushgan turli kalitlar faqat navbat bilan hisoblanadi
+LOCAL_LOCK_STRIPES = 64
+_local_locks = [threading.Lock() for _ in range(LOCAL_LOCK_STRIPES)]
+
+
+def _setting(name: str, default):
+    return getattr(settings, 'QUERY_CACHE', {}).get(name, default)
+
+
+def _cache():
+    # QUERY_CACHE['CACHE_ALIAS'] (berilmasa Django ning 'default' keshi)
+    return caches[_setting('CACHE_ALIAS', DEFAULT_CACHE_ALIAS)]
+
+
+def _version_key(scope: str) -> str:
+    return f'data_version:{scope}'
+
+
+def _next_version(current=None) -> int:
+    """
+    Versiya nanosekundlardagi vaqtdan kichik bo'lmaydi: versiya kaliti keshdan
+    chiqib ketsa (cull/eviction) ham yangisi avvalgi versiyalarni takrorlamaydi
+    va eski yozuvlar qayta o'qilmaydi.
+    """
+    return max(time.time_ns(), (current or 0) + 1)
+
+
+def get_data_version(scope: str) -> int:
+    """Manba ma'lumotlarining joriy versiyasi (kesh kalitining bir qismi)."""
+    cache = _cache()
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        version = _next_version()
+        cache.add(key, version, None)
+        version = cache.get(key) or version
+    return version
+
+
+def bump_data_version(scope: str) -> int:
+    """
+    Versiyani oshiradi: eski versiyali barcha kesh yozuvlari endi o'qilmaydi
+    va TTL bo'yicha o'z-o'zidan chiqib ketadi. Import/tozalash buyruqlari chaqiradi.
+    """
+    cache = _cache()
+    key = _version_key(scope)
+    # incr() emas: ba'zi backendlar (FileBasedCache) u bilan kalit muddatini standart
+    # TIMEOUT ga qaytaradi va versiya keyinchalik eskirib qoladi. Versiya muddatsiz
+    version = _next_version(cache.get(key))
+    cache.set(key, version, None)
+    logger.info(f"Kesh versiyasi oshirildi: {scope} -> {version}")
+    return version
+
+
+def versioned_key(scope: str, key: str) -> str:
+    # Manba nomi ham kalitda: ikki manba versiyalari teng bo'lsa ham yozuvlar aralashmaydi
+    return f'{scope}:{key}:v{get_data_version(scope)}'
+
+
+def _local_lock(key: str) -> threading.Lock:
+    return _local_locks[hash(key) % LOCAL_LOCK_STRIPES]
+
+
+def cached_query(scope: str, key: str, compute: Callable[[], Any], timeout: int = None) -> Any:
+    """
+    Versiyalangan kesh + single-flight.
+
+    Kalit bo'sh bo'lsa, faqat bitta so'rov (``cache.add`` bilan olingan lock
+    egasi) ``compute()`` ni bajaradi; qolganlari natija keshga tushishini
+    kutadi. Lock muddati tugasa yoki egasi xato bilan chiqsa, kutayotgan
+    so'rov o'zi hisoblaydi. Jarayonlar orasidagi lock backend ``add`` i
+    atomik bo'lgandagina qat'iy (Redis/Memcached; FileBasedCache da emas).
+    """
+    timeout = _setting('TIMEOUT', 60 * 60 * 24) if timeout is None else timeout
+    lock_timeout = _setting('LOCK_TIMEOUT', 30)
+    poll_interval = _setting('POLL_INTERVAL', 0.05)
+    cache = _cache()
+
+    full_key = versioned_key(scope, key)
+    value = cache.get(full_key, _MISSING)
+    if value is not _MISSING:
+        record_cache(scope, key, 'hit')
+        return value
+
+    # Bir jarayon ichidagi threadlar umumiy keshga urinmasdan shu yerda navbat kutadi
+    with _local_lock(full_key):
+        lock_key = f'lock:{full_key}'
+        deadline = time.monotonic() + lock_timeout
+        while True:
+            value = cache.get(full_key, _MISSING)
+            if value is not _MISSING:
+                # Boshqa so'rov hisoblagan natija
+                record_cache(scope, key, 'coalesced')
+                return value
+            if cache.add(lock_key, 1, lock_timeout) or time.monotonic() >= deadline:
+                record_cache(scope, key, 'miss')
+                try:
+                    value = compute()
+                    cache.set(full_key, value, timeout)
+                    return value
+                finally:
+                    cache.delete(lock_key)
+            time.sleep(poll_interval)
+
+
+async def acached_query(scope: str, key: str, compute: Callable[[], Awaitable[Any]], timeout: int = None) -> Any:
+    """``cached_query`` ning asinxron varianti (aget/aadd, kutish asyncio.sleep bilan)."""
+    timeout = _setting('TIMEOUT', 60 * 60 * 24) if timeout is None else timeout
+    lock_timeout = _setting('LOCK_TIMEOUT', 30)
+    poll_interval = _setting('POLL_INTERVAL', 0.05)
+    cache = _cache()
+
+    version = await cache.aget(_version_key(scope))
+    if version is None:
+        version = _next_version()
+        await cache.aadd(_version_key(scope), version, None)
+        version = await cache.aget(_version_key(scope)) or version
+    full_key = f'{scope}:{key}:v{version}'
+
+    lock_key = f'lock:{full_key}'
+    deadline = time.monotonic() + lock_timeout
+    waited = False
+    while True:
+        value = await cache.aget(full_key, _MISSING)
+        if value is not _MISSING:
+            record_cache(scope, key, 'coalesced' if waited else 'hit')
+            return value
+        if await cache.aadd(lock_key, 1, lock_timeout) or time.monotonic() >= deadline:
+            record_cache(scope, key, 'miss')
+            try:
+                value = await compute()
+                await cache.aset(full_key, value, timeout)
+                return value
+            finally:
+                await cache.adelete(lock_key)
+        waited = True
+        await asyncio.sleep(poll_interval)
@@ -0,0 +1,209 @@
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+
+from app.models import Owner, Repo, Language, RepoLanguage, Topic, RepoTopic
+from app.services.fingerprint import repository_fingerprint
+from app.services.language_stats import apply_language_year_changes, language_year_totals
+
+logger = logging.getLogger(__name__)
+
+# Repo fields rewritten when an existing row is upserted
+REPO_UPDATE_FIELDS = [
+    'owner', 'name', 'description', 'stars', 'forks', 'watchers', 'issues',
+    'pull_requests', 'disk_usage_kb', 'assignable_user_count',
+    'default_branch_commit_count', 'is_fork', 'is_archived', 'forking_allowed',
+    'code_of_conduct', 'license', 'created_at', 'pushed_at', 'language_count',
+    'created_year', 'primary_language', 'fingerprint',
+]
+
+
+def parse_iso(dt_str):
+    if not dt_str:
+        return None
+    try:
+        return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
+    except Exception:
+        return None
+
+
+def repo_identity(item: Dict):
+    owner_login = item.get('owner') or item.get('owner_login') or ''
+    name = item.get('name') or ''
+    name_with_owner = item.get('nameWithOwner') or f"{owner_login}/{name}"
+    return owner_login, name, name_with_owner
+
+
+def repo_fields(item: Dict) -> Dict:
+    """Map a raw JSON record to Repo field values (without owner / primary_language)."""
+    owner_login, name, name_with_owner = repo_identity(item)
+    fields = {
+        'name': name,
+        'name_with_owner': name_with_owner,
+        'description': item.get('description'),
+        'stars': item.get('stars', 0),
+        'forks': item.get('forks', 0),
+        'watchers': item.get('watchers', 0),
+        'issues': item.get('issues', 0),
+        'pull_requests': item.get('pullRequests', 0),
+        'disk_usage_kb': item.get('diskUsageKb', 0),
+        'assignable_user_count': item.get('assignableUserCount', 0),
+        'default_branch_commit_count': item.get('defaultBranchCommitCount', 0),
+        'is_fork': item.get('isFork', False),
+        'is_archived': item.get('isArchived', False),
+        'forking_allowed': item.get('forkingAllowed', True),
+        'code_of_conduct': item.get('codeOfConduct'),
+        'license': item.get('license'),
+        'created_at': parse_iso(item.get('createdAt')),
+        'pushed_at': parse_iso(item.get('pushedAt')),
+        'language_count': item.get('languageCount'),
+        'created_year': None,
+    }
+    if fields['created_at']:
+        fields['created_year'] = fields['created_at'].year
+    return fields
+
+
+class BulkRepoImporter:
+    """
+    Set-based importer: every chunk of records costs a constant number of
+    queries instead of several per repo.
+
+    Owners, languages and topics are resolved per chunk with one
+    ``bulk_create(ignore_conflicts=True)`` plus one ``IN`` lookup, repos are
+    upserted with ``bulk_create(update_conflicts=True)`` on
+    ``name_with_owner``, and RepoLanguage / RepoTopic rows are inserted with
+    conflict-ignore semantics.
+
+    LanguageYearStat is adjusted by the difference of the chunk's
+    language totals before and after the write, unless
+    ``maintain_stats=False`` (the caller rebuilds it afterwards).
+
+    With ``delta=True`` records whose fingerprint matches the stored
+    ``Repo.fingerprint`` are skipped before any lookup or write, and the
+    languages/topics of changed repos are replaced rather than merged.
+    """
+
+    def __init__(self, chunk_size: int = 1000, delta: bool = False, maintain_stats: bool = True):
+        self.chunk_size = chunk_size
+        self.delta = delta
+        self.maintain_stats = maintain_stats
+        # languages and topics are low-cardinality, keep them across chunks
+        self.language_ids: Dict[str, int] = {}
+        self.topic_ids: Dict[str, int] = {}
+        self.stats = {'processed': 0, 'repos_upserted': 0, 'unchanged': 0, 'repo_languages': 0, 'repo_topics': 0}
+
+    def _resolve(self, model, field: str, names, cache: Dict[str, int] = None) -> Dict[str, int]:
+        """Return name -> id for ``names``, creating missing rows in bulk."""
+        names = set(names)
+        resolved = {}
+        if cache is not None:
+            resolved = {n: cache[n] for n in names if n in cache}
+            names -= resolved.keys()
+        if names:
+            found = dict(model.objects.filter(**{f'{field}__in': names}).values_list(field, 'id'))
+            missing = names - found.keys()
+            if missing:
+                model.objects.bulk_create([model(**{field: n}) for n in missing], ignore_conflicts=True)
+                found.update(model.objects.filter(**{f'{field}__in': missing}).values_list(field, 'id'))
+            resolved.update(found)
+            if cache is not None:
+                cache.update(found)
+        return resolved
+
+    def import_items(self, items: Iterable[Dict], progress=None) -> Dict:
+        chunk = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+                if progress:
+                    progress(self.stats)
+        if chunk:
+            self.import_chunk(chunk)
+            if progress:
+                progress(self.stats)
+        return self.stats
+
+    @transaction.atomic
+    def import_chunk(self, items: List[Dict]):
+        # last record wins when the same repo appears twice in one chunk
+        records = {}
+        for item in items:
+            records[repo_identity(item)[2]] = item
+        self.stats['processed'] += len(items)
+
+        fingerprints = {name: repository_fingerprint(item) for name, item in records.items()}
+        existing = set()
+        if self.delta:
+            stored = dict(
+                Repo.objects.filter(name_with_owner__in=records.keys()).values_list('name_with_owner', 'fingerprint')
+            )
+            existing = stored.keys()
+            changed = {name: item for name, item in records.items() if stored.get(name) != fingerprints[name]}
+            self.stats['unchanged'] += len(records) - len(changed)
+            records = changed
+            if not records:
+                return
+
+        owner_ids = self._resolve(Owner, 'login', (repo_identity(i)[0] for i in records.values()))
+
+        lang_names = set()
+        topic_names = set()
+        for item in records.values():
+            if item.get('primaryLanguage'):
+                lang_names.add(item['primaryLanguage'])
+            lang_names.update(l.get('name') for l in item.get('languages', []) if l.get('name'))
+            topic_names.update(t.get('name') for t in item.get('topics', []) if t.get('name'))
+        language_ids = self._resolve(Language, 'name', lang_names, self.language_ids)
+        topic_ids = self._resolve(Topic, 'name', topic_names, self.topic_ids)
+
+        if self.maintain_stats:
+            stats_before = language_year_totals(repo__name_with_owner__in=records.keys())
+
+        repos = []
+        for item in records.values():
+            fields = repo_fields(item)
+            fields['owner_id'] = owner_ids[repo_identity(item)[0]]
+            fields['primary_language_id'] = language_ids.get(item.get('primaryLanguage'))
+            fields['fingerprint'] = fingerprints[fields['name_with_owner']]
+            repos.append(Repo(**fields))
+        Repo.objects.bulk_create(
+            repos,
+            update_conflicts=True,
+            unique_fields=['name_with_owner'],
+            update_fields=REPO_UPDATE_FIELDS,
+        )
+        self.stats['repos_upserted'] += len(repos)
+        repo_ids = dict(
+            Repo.objects.filter(name_with_owner__in=records.keys()).values_list('name_with_owner', 'id')
+        )
+
+        # changed repos get their current language/topic sets, not a union with the old ones
+        stale = [repo_ids[name] for name in records if name in existing]
+        if stale:
+            RepoLanguage.objects.filter(repo_id__in=stale).delete()
+            RepoTopic.objects.filter(repo_id__in=stale).delete()
+
+        repo_langs = []
+        repo_topics = []
+        for name_with_owner, item in records.items():
+            repo_id = repo_ids[name_with_owner]
+            for lang in item.get('languages', []):
+                if lang.get('name'):
+                    repo_langs.append(RepoLanguage(
+                        repo_id=repo_id, language_id=language_ids[lang['name']], size=lang.get('size', 0) or 0
+                    ))
+            for topic in item.get('topics', []):
+                if topic.get('name'):
+                    repo_topics.append(RepoTopic(repo_id=repo_id, topic_id=topic_ids[topic['name']]))
+        RepoLanguage.objects.bulk_create(repo_langs, ignore_conflicts=True)
+        RepoTopic.objects.bulk_create(repo_topics, ignore_conflicts=True)
+        self.stats['repo_languages'] += len(repo_langs)
+        self.stats['repo_topics'] += len(repo_topics)
+
+        if self.maintain_stats:
+            apply_language_year_changes(stats_before, language_year_totals(repo_id__in=list(repo_ids.values())))
@@ -0,0 +1,107 @@
+# services/synthetic.py
+
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+LANGUAGES = [
+    'JavaScript', 'Python', 'TypeScript', 'Java', 'Go', 'C++', 'C', 'C#', 'PHP', 'Ruby',
+    'Rust', 'Shell', 'Kotlin', 'Swift', 'HTML', 'CSS', 'Dart', 'Scala', 'Lua', 'Haskell',
+]
+TOPICS = [
+    'machine-learning', 'web', 'cli', 'api', 'database', 'react', 'django', 'docker',
+    'kubernetes', 'security', 'game', 'android', 'ios', 'devops', 'data-science',
+    'deep-learning', 'nlp', 'blockchain', 'compiler', 'testing',
+]
+LICENSES = ['MIT License', 'Apache License 2.0', 'GNU General Public License v3.0', 'BSD 3-Clause "New" or "Revised" License']
+CODES_OF_CONDUCT = ['Contributor Covenant', 'Citizen Code of Conduct']
+
+START = datetime(2008, 1, 1, tzinfo=timezone.utc)
+END = datetime(2025, 12, 31, tzinfo=timezone.utc)
+
+
+def _iso(value: datetime) -> str:
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _skewed(rng: random.Random, scale: float, cap: int) -> int:
+    """Pareto taqsimotli butun son: ko'p repolar kichik, ozchiligi juda katta."""
+    return min(cap, int(rng.paretovariate(1.2) * scale) - int(scale))
+
+
+def generate_repository(index: int, rng: random.Random) -> Dict:
+    """``import_repos`` va ``ingest_to_clickhouse`` kutadigan formatdagi bitta repository."""
+    owner = f'owner{rng.randrange(max(1, index // 3 + 1))}'
+    name = f'repo{index}'
+    span = (END - START).total_seconds()
+    created_at = START + timedelta(seconds=rng.random() * span)
+    pushed_at = created_at + timedelta(seconds=rng.random() * (END - created_at).total_seconds())
+    stars = _skewed(rng, 3, 400000)
+
+    # Tillar soni kam, lekin ba'zan ko'p bo'ladi; birinchisi eng kattasi
+    languages = []
+    for lang in rng.sample(LANGUAGES, min(len(LANGUAGES), int(rng.expovariate(0.6)))):
+        languages.append({'name': lang, 'size': _skewed(rng, 2000, 10 ** 9)})
+    languages.sort(key=lambda item: item['size'], reverse=True)
+
+    topics = [
+        {'name': topic, 'stars': _skewed(rng, 50, 10 ** 6)}
+        for topic in rng.sample(TOPICS, min(len(TOPICS), int(rng.expovariate(0.4))))
+    ]
+
+    def maybe(value, probability: float = 0.3) -> Optional[object]:
+        return None if rng.random() < probability else value
+
+    return {
+        'owner': owner,
+        'name': name,
+        'nameWithOwner': f'{owner}/{name}',
+        'description': maybe(f'Synthetic repository number {index}' + ' lorem ipsum' * rng.randrange(0, 8)),
+        'stars': stars,
+        'forks': _skewed(rng, 1, 100000),
+        'watchers': _skewed(rng, 1, 10000),
+        'isFork': rng.random() < 0.1,
+        'isArchived': rng.random() < 0.05,
+        'languageCount': len(languages),
+        'topicCount': len(topics),
+        'diskUsageKb': _skewed(rng, 500, 10 ** 7),
+        'pullRequests': _skewed(rng, 2, 50000),
+        'issues': _skewed(rng, 2, 50000),
+        'primaryLanguage': languages[0]['name'] if languages else None,
+        'createdAt': _iso(created_at),
+        'pushedAt': _iso(pushed_at),
+        'defaultBranchCommitCount': maybe(_skewed(rng, 20, 10 ** 6), 0.1),
+        'license': maybe(rng.choice(LICENSES), 0.4),
+        'assignableUserCount': min(65535, _skewed(rng, 1, 5000)),
+        'codeOfConduct': maybe(rng.choice(CODES_OF_CONDUCT), 0.9),
+        'forkingAllowed': rng.random() < 0.98,
+        'parent': maybe({'nameWithOwner': f'owner0/repo{rng.randrange(index + 1)}'}, 0.9),
+        'languages': languages,
+        'topics': topics,
+    }
+
+
+def iter_repositories(count: int, seed: int = 42) -> Iterator[Dict]:
+    rng = random.Random(seed)
+    for index in range(count):
+        yield generate_repository(index, rng)
+
+
+def generate_repositories(count: int, seed: int = 42) -> List[Dict]:
+    return list(iter_repositories(count, seed))
+
+
+def write_repositories(path: str, count: int, seed: int = 42, ndjson: bool = False) -> int:
+    """Sintetik dumpni faylga oqim bilan yozadi (JSON massiv yoki NDJSON); fayl hajmini qaytaradi."""
+    with open(path, 'w', encoding='utf-8') as f:
+        if not ndjson:
+            f.write('[')
+        for index, repo in enumerate(iter_repositories(count, seed)):
+            if ndjson:
+                f.write(json.dumps(repo) + '\n')
+            else:
+                f.write((',\n' if index else '\n') + json.dumps(repo))
+        if not ndjson:
+            f.write('\n]\n')
+        return f.tell()
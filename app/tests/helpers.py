@@ -0,0 +1,187 @@
+import json
+import os
+import re
+import tempfile
+from datetime import date, datetime
+from types import SimpleNamespace
+
+try:
+    from chdb import session as chdb_session
+except ImportError:
+    chdb_session = None
+
+from app.services.clickhouse_pool import ClickHousePool
+from app.services.clickhouse_schema import BASE_TABLES
+from app.services.clickhouse_standin import InProcessClickHouseClient, StandInStats
+
+LOCMEM = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+LOCMEM_CACHE = {'default': LOCMEM, 'query_cache': LOCMEM}
+
+
+class FailingClient(InProcessClickHouseClient):
+    """
+    ``fail_table`` ga INSERT xatolik beradi (``fail_inserts`` berilsa faqat shu
+    tartib raqamli INSERTlar); yuborilgan dedup tokenlarni yozib boradi.
+    """
+
+    def __init__(self, stats, fail_table=None, fail_inserts=None, tokens=None):
+        super().__init__(stats)
+        self.fail_table = fail_table
+        self.fail_inserts = fail_inserts
+        self.tokens = tokens if tokens is not None else []
+        self.inserts = 0
+
+    def execute(self, query, params=None, **kwargs):
+        if params is not None and query.lstrip().startswith('INSERT'):
+            token = (kwargs.get('settings') or {}).get('insert_deduplication_token')
+            if token:
+                self.tokens.append(token)
+            if self.fail_table and f'.{self.fail_table} ' in query:
+                self.inserts += 1
+                if self.fail_inserts is None or self.inserts in self.fail_inserts:
+                    raise ConnectionError(f'{self.fail_table}: ulanish uzildi')
+        return super().execute(query, params, **kwargs)
+
+
+def standin_pool(stats, fail_table=None, fail_inserts=None, tokens=None):
+    # Bitta mijoz: INSERT tartib raqamlari ulanishlar orasida bo'linmaydi
+    client = FailingClient(stats, fail_table, fail_inserts, tokens)
+    return ClickHousePool(max_size=1, client_factory=lambda: client)
+
+
+class TempDirMixin:
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+
+class VersionedClient(FailingClient):
+    """
+    ReplacingMergeTree jadvallari (rollup yil bo'yicha partitionlangan) bor deb javob beradi;
+    ``pending`` - rollup_pending_years qatorlari.
+    """
+
+    def __init__(self, pending=(), **kwargs):
+        super().__init__(StandInStats(), **kwargs)
+        self.pending = list(pending)
+        self.queries = []
+
+    def execute(self, query, params=None, **kwargs):
+        query = ' '.join(query.split())
+        self.queries.append(query)
+        if 'FROM system.tables' in query and 'engine' in query:
+            return [(table, 'ReplacingMergeTree') for table in BASE_TABLES]
+        if query.startswith('SELECT partition_key FROM system.tables'):
+            return [('created_year',)]
+        if 'FROM github_analytics.rollup_pending_years' in query:
+            return self.pending
+        if query.startswith('INSERT INTO github_analytics.rollup_pending_years'):
+            self.pending.extend((year, str(len(self.queries))) for (year,) in params)
+        elif query.startswith('ALTER TABLE github_analytics.rollup_pending_years DELETE'):
+            self.pending = []
+        return super().execute(query, params, **kwargs)
+
+
+_INSERT_RE = re.compile(r'^\s*INSERT\s+INTO\b', re.IGNORECASE)
+_SELECT_RE = re.compile(r'^\s*(SELECT|WITH|EXISTS|SHOW|DESCRIBE)\b', re.IGNORECASE)
+
+
+def sql_literal(value) -> str:
+    if value is None:
+        return 'NULL'
+    if hasattr(value, 'tolist'):
+        value = value.tolist()
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime):
+        return str(int(value.timestamp()))
+    if isinstance(value, date):
+        return f"'{value.isoformat()}'"
+    if isinstance(value, tuple):
+        return '(' + ', '.join(map(sql_literal, value)) + ')'
+    if isinstance(value, list):
+        return '[' + ', '.join(map(sql_literal, value)) + ']'
+    return "'" + str(value).replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def _from_json(value, column_type: str):
+    if value is None:
+        return None
+    if column_type.startswith('Array('):
+        return [_from_json(item, column_type[6:-1]) for item in value]
+    if column_type == 'Date':
+        return date.fromisoformat(value)
+    if column_type.startswith('DateTime'):
+        return datetime.fromisoformat(value)
+    return value
+
+
+class EmbeddedClickHouseClient:
+    """
+    ``clickhouse_driver.Client`` o'rnida chdb (jarayon ichidagi ClickHouse)
+    sessiyasi: SQL haqiqiy server semantikasi bilan bajariladi. Bir jarayonda
+    bir vaqtda faqat bitta chdb sessiyasi ochiq bo'lishi mumkin.
+    """
+
+    def __init__(self, path: str):
+        self.session = chdb_session.Session(path)
+        self.session.query('SET output_format_json_quote_64bit_integers = 0')
+        self.connection = SimpleNamespace(connected=True, ping=lambda: True)
+        self.last_query = SimpleNamespace(progress=SimpleNamespace(rows=0, bytes=0))
+
+    def execute(self, query, params=None, columnar=False, with_column_types=False, settings=None, **kwargs):
+        settings = {name: value for name, value in (settings or {}).items() if name != 'use_numpy'}
+        suffix = ' SETTINGS ' + ', '.join(f'{name} = {sql_literal(value)}' for name, value in settings.items()) \
+            if settings else ''
+        self.last_query.progress.rows = self.last_query.progress.bytes = 0
+
+        if _INSERT_RE.match(query) and params is not None:
+            rows = list(zip(*params)) if columnar else list(params)
+            if rows:
+                head = query.strip()[:-len('VALUES')]
+                values = ', '.join('(' + ', '.join(map(sql_literal, row)) + ')' for row in rows)
+                self.session.query(f'{head}{suffix} VALUES {values}')
+            return len(rows)
+
+        for name, value in (params or {}).items():
+            query = query.replace(f'%({name})s', sql_literal(value))
+        query = query.strip().rstrip(';') + suffix
+        if not _SELECT_RE.match(query):
+            self.session.query(query)
+            return []
+
+        output = self.session.query(query, 'JSONCompact').bytes()
+        if not output.strip():
+            return [] if not with_column_types else ([], [])
+        result = json.loads(output)
+        types = [column['type'] for column in result['meta']]
+        rows = [tuple(_from_json(value, t) for value, t in zip(row, types)) for row in result['data']]
+        statistics = result.get('statistics', {})
+        self.last_query.progress.rows = statistics.get('rows_read', 0)
+        self.last_query.progress.bytes = statistics.get('bytes_read', 0)
+        if columnar:
+            rows = [list(column) for column in zip(*rows)]
+        if with_column_types:
+            return rows, [(column['name'], column['type']) for column in result['meta']]
+        return rows
+
+    def execute_iter(self, query, params=None, **kwargs):
+        return iter(self.execute(query, params, **kwargs))
+
+    def disconnect(self):
+        pass
+
+    def close(self):
+        self.session.close()
+
+
+def embedded_pool(path: str):
+    """Bitta chdb mijozli havza va shu mijoz (testdan keyin ``client.close()``)."""
+    client = EmbeddedClickHouseClient(path)
+    return ClickHousePool(max_size=1, client_factory=lambda: client), client
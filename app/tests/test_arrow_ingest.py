@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+from django.test import SimpleTestCase
+
+from app.services import arrow_ingest
+from app.services.clickhouse_service import (
+    LANGUAGE_COLUMNS,
+    REPOSITORY_COLUMNS,
+    TOPIC_COLUMNS,
+    transform_repositories_columnar,
+)
+from app.services.synthetic import generate_repositories
+
+pa = arrow_ingest.pa
+
+
+@unittest.skipIf(pa is None, "pyarrow o'rnatilmagan")
+class ArrowBlockTests(SimpleTestCase):
+    def setUp(self):
+        self.repos = generate_repositories(200, seed=11)
+        self.batch = pa.Table.from_pylist(self.repos).combine_chunks().to_batches()[0]
+
+    def assertBlocksEqual(self, actual, expected):
+        for spec, left, right in (
+            (REPOSITORY_COLUMNS, actual.repositories, expected.repositories),
+            (LANGUAGE_COLUMNS, actual.languages, expected.languages),
+            (TOPIC_COLUMNS, actual.topics, expected.topics),
+        ):
+            for (name, typecode), a, b in zip(spec, left, right):
+                self.assertEqual(type(a), type(b), name)
+                self.assertEqual(list(a), list(b), name)
+        self.assertEqual(actual.error_count, expected.error_count)
+
+    def test_matches_json_transform(self):
+        self.assertBlocksEqual(arrow_ingest.batch_to_block(self.batch), transform_repositories_columnar(self.repos))
+
+    def test_missing_required_field_is_an_error(self):
+        repos = [dict(repo) for repo in self.repos[:5]]
+        repos[2]['pushedAt'] = None
+        block = arrow_ingest.batch_to_block(pa.Table.from_pylist(repos).to_batches()[0])
+        expected = transform_repositories_columnar(repos[:2] + repos[3:])
+        self.assertEqual(block.error_count, 1)
+        self.assertEqual(list(block.repositories[2]), list(expected.repositories[2]))
+
+    def test_empty_lists_and_missing_columns(self):
+        repos = [dict(repo, languages=[], topics=[]) for repo in self.repos[:3]]
+        table = pa.Table.from_pylist(repos).drop_columns(['parent', 'description'])
+        block = arrow_ingest.batch_to_block(table.to_batches()[0])
+        self.assertEqual({len(column) for column in block.languages + block.topics}, {0})
+        self.assertEqual(block.repositories[3], [''] * 3)
+
+    def test_filter_years(self):
+        years = {2015, 2020}
+        selected = arrow_ingest.filter_years(self.batch, sorted(years))
+        expected = [repo['nameWithOwner'] for repo in self.repos if int(repo['createdAt'][:4]) in years]
+        self.assertEqual(selected.column('nameWithOwner').to_pylist(), expected)
+
+    def test_ipc_batches_are_resized(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'repos.arrow')
+            with pa.ipc.new_file(path, self.batch.schema) as writer:
+                for offset in range(0, self.batch.num_rows, 30):
+                    writer.write_batch(self.batch.slice(offset, 30))
+            sizes = [batch.num_rows for batch in arrow_ingest.iter_record_batches(path, 64)]
+        self.assertEqual(sizes, [64, 64, 64, 8])
@@ -0,0 +1,68 @@
+from django.db import connection
+from django.test import TransactionTestCase
+
+from app.models import Repo, RepoLanguage
+from app.services.bulk_load import SQLITE_PRAGMAS, BulkLoadSession
+
+
+def indexes(model):
+    with connection.cursor() as cursor:
+        return connection.introspection.get_constraints(cursor, model._meta.db_table)
+
+
+def secondary_names(constraints):
+    return {
+        name for name, info in constraints.items()
+        if info['index'] and not info['unique'] and not info['primary_key']
+    }
+
+
+def secondary(model):
+    return secondary_names(indexes(model))
+
+
+def pragmas():
+    values = {}
+    with connection.cursor() as cursor:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {pragma}')
+            values[pragma] = str(cursor.fetchone()[0])
+    return values
+
+
+# PRAGMA synchronous/journal_mode tranzaksiya ichida o'zgarmaydi: TestCase emas
+class BulkLoadSessionTests(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite PRAGMA lari tekshiriladi')
+        self.indexes = {model: indexes(model) for model in (Repo, RepoLanguage)}
+        self.pragmas = pragmas()
+
+    def assertRestored(self):
+        self.assertEqual({model: indexes(model) for model in self.indexes}, self.indexes)
+        self.assertEqual(pragmas(), self.pragmas)
+
+    def test_secondary_indexes_dropped_and_recreated(self):
+        self.assertTrue(secondary(Repo) and secondary(RepoLanguage))
+        with BulkLoadSession([Repo, RepoLanguage]) as session:
+            self.assertEqual(secondary(Repo) | secondary(RepoLanguage), set())
+            self.assertEqual({name for name, _ in session.dropped},
+                             {name for model in self.indexes for name in secondary_names(self.indexes[model])})
+            # unique va primary key indekslari qoladi (upsert konfliktlari ularga tayanadi)
+            self.assertTrue(any(info['unique'] for info in indexes(RepoLanguage).values()))
+            self.assertEqual(pragmas()['synchronous'], '0')
+            self.assertEqual(pragmas()['cache_size'], SQLITE_PRAGMAS['cache_size'])
+        self.assertRestored()
+        self.assertEqual(set(session.timings), {'import_s', 'index_rebuild_s', 'analyze_s'})
+
+    def test_restored_after_failure(self):
+        with self.assertRaises(RuntimeError):
+            with BulkLoadSession([Repo, RepoLanguage]):
+                raise RuntimeError('import failed')
+        self.assertRestored()
+
+    def test_keep_indexes(self):
+        with BulkLoadSession([Repo], drop_indexes=False) as session:
+            self.assertEqual(secondary(Repo), secondary_names(self.indexes[Repo]))
+        self.assertEqual(session.dropped, [])
+        self.assertRestored()
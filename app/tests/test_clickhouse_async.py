@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from app.services.clickhouse_async import AsyncClickHouseService, AsyncQueryRunner, set_async_runner
+from app.services.clickhouse_pool import ClickHousePool, PoolTimeout
+from app.tests.helpers import LOCMEM_CACHE
+
+
+def make_runner(max_size, acquire_timeout=10):
+    # Mijozlar yaratilmaydi: RecordingService havzaga murojaat qilmaydi
+    return AsyncQueryRunner(ClickHousePool(max_size=max_size, client_factory=object), acquire_timeout)
+
+
+class RecordingService:
+    def __init__(self, delay=0.0, release=None):
+        self.threads = []
+        self.delay = delay
+        self.release = release
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def _query(self):
+        with self._lock:
+            self.threads.append(threading.get_ident())
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if self.release is not None:
+                self.release.wait(5)
+            time.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def get_language_statistics(self):
+        self._query()
+        return [{'language': 'Python'}]
+
+    def get_top_languages_by_year_and_size(self, year, top_n=5):
+        self._query()
+        return [{'year': year, 'top_n': top_n}]
+
+
+class AsyncClickHouseServiceTests(SimpleTestCase):
+    def setUp(self):
+        self.runner = make_runner(3)
+        self.addCleanup(self.runner.close)
+
+    def test_runs_sync_service_off_the_event_loop(self):
+        service = RecordingService()
+
+        async def run():
+            client = AsyncClickHouseService(service, self.runner)
+            return (
+                threading.get_ident(),
+                await client.get_language_statistics(),
+                await client.get_top_languages_by_year_and_size(2020, top_n=3),
+            )
+
+        loop_thread, stats, top = asyncio.run(run())
+        self.assertEqual(stats, [{'language': 'Python'}])
+        self.assertEqual(top, [{'year': 2020, 'top_n': 3}])
+        self.assertNotIn(loop_thread, service.threads)
+
+    def test_more_requests_than_max_size_wait_without_failing(self):
+        service = RecordingService(delay=0.02)
+
+        async def run():
+            client = AsyncClickHouseService(service, self.runner)
+            return await asyncio.gather(*(
+                client.get_top_languages_by_year_and_size(2000 + i) for i in range(20)
+            ))
+
+        results = asyncio.run(run())
+        self.assertEqual([r[0]['year'] for r in results], list(range(2000, 2020)))
+        self.assertLessEqual(service.max_active, 3)
+        self.assertLessEqual(len(set(service.threads)), 3)
+
+    def test_queue_timeout_raises_pool_timeout(self):
+        release = threading.Event()
+        service = RecordingService(release=release)
+        runner = make_runner(1, acquire_timeout=0.05)
+        self.addCleanup(runner.close)
+
+        async def run():
+            client = AsyncClickHouseService(service, runner)
+            asyncio.get_running_loop().call_later(0.3, release.set)
+            return await asyncio.gather(
+                *(client.get_language_statistics() for _ in range(3)), return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        self.assertEqual(results[0], [{'language': 'Python'}])
+        self.assertTrue(all(isinstance(r, PoolTimeout) for r in results[1:]))
+        self.assertEqual(service.max_active, 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AsyncViewPoolTimeoutTests(SimpleTestCase):
+    def setUp(self):
+        caches['query_cache'].clear()
+        self.runner = make_runner(1, acquire_timeout=0.05)
+        self.addCleanup(self.runner.close)
+        self.addCleanup(set_async_runner, set_async_runner(self.runner))
+
+    async def test_busy_pool_returns_503_with_retry_after(self):
+        release = threading.Event()
+        busy = asyncio.ensure_future(self.runner.run(release.wait, 5))
+        await asyncio.sleep(0)
+        try:
+            response = await self.async_client.get(reverse('async-statistics'))
+        finally:
+            release.set()
+            await busy
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
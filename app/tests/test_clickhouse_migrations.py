@@ -0,0 +1,51 @@
+import importlib
+
+from django.test import SimpleTestCase
+
+from app.services.clickhouse_migrations import load_migrations
+from app.services.clickhouse_pool import ClickHousePool
+from app.services.clickhouse_service import ClickHouseService
+from app.services.clickhouse_standin import InProcessClickHouseClient
+
+initial = importlib.import_module('app.clickhouse_migrations.0001_initial')
+
+
+class RecordingClient(InProcessClickHouseClient):
+    def __init__(self, rollup_exists):
+        super().__init__()
+        self.rollup_exists = rollup_exists
+        self.queries = []
+
+    def execute(self, query, params=None, **kwargs):
+        self.queries.append(query)
+        if query.startswith('EXISTS TABLE'):
+            return [[int(self.rollup_exists)]]
+        if query.startswith('SELECT count()'):
+            return [[3]]
+        return super().execute(query, params, **kwargs)
+
+
+class ClickHouseMigrationsTests(SimpleTestCase):
+    def run_initial(self, rollup_exists):
+        client = RecordingClient(rollup_exists)
+        initial.create_schema(ClickHouseService(pool=ClickHousePool(max_size=1, client_factory=lambda: client)))
+        return client.queries[1:]
+
+    def test_migrations_are_ordered(self):
+        versions = [migration.version for migration in load_migrations()]
+        self.assertEqual(versions, sorted(versions))
+        self.assertEqual(versions[0], 1)
+
+    def test_initial_schema_is_frozen(self):
+        # Joriy sxema (massiv/versiya ustunlari, partitionlar) 0001 ga kirmaydi
+        queries = self.run_initial(rollup_exists=True)
+        self.assertEqual(queries, initial.TABLES + initial.ROLLUP + initial.DEDUPLICATION)
+        self.assertFalse(any('PARTITION BY' in query or 'version' in query for query in queries))
+
+    def test_initial_backfill_swaps_in_staging(self):
+        queries = [' '.join(query.split()) for query in self.run_initial(rollup_exists=False)]
+        backfill = queries[len(initial.TABLES + initial.ROLLUP + initial.DEDUPLICATION):]
+        self.assertFalse(any(query.startswith('TRUNCATE') for query in queries))
+        self.assertTrue(backfill[2].startswith('INSERT INTO github_analytics.language_year_rollup__backfill'))
+        self.assertIn("REPLACE PARTITION ID 'all' FROM github_analytics.language_year_rollup__backfill", backfill[4])
+        self.assertEqual(backfill[-1], 'DROP TABLE IF EXISTS github_analytics.language_year_rollup__backfill')
@@ -0,0 +1,121 @@
+import threading
+import time
+from unittest import mock
+
+from clickhouse_driver.errors import ServerException
+from django.test import SimpleTestCase
+
+from app.services import clickhouse_pool
+from app.services.clickhouse_pool import ClickHousePool, PoolTimeout, get_pool, set_pool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.connected = True
+        self.healthy = True
+        self.pings = 0
+
+    def ping(self):
+        self.pings += 1
+        return self.healthy
+
+
+class FakeClient:
+    def __init__(self):
+        self.connection = FakeConnection()
+        self.disconnects = 0
+
+    def disconnect(self):
+        self.disconnects += 1
+        self.connection.connected = False
+
+
+def fake_pool(**kwargs):
+    clients = []
+
+    def factory():
+        clients.append(FakeClient())
+        return clients[-1]
+
+    return ClickHousePool(client_factory=factory, **kwargs), clients
+
+
+class ClickHousePoolTests(SimpleTestCase):
+    def test_acquire_times_out_when_pool_is_exhausted(self):
+        pool, clients = fake_pool(max_size=1)
+        client = pool.acquire()
+        started = time.monotonic()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(timeout=0.05)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+        # Bo'shagan ulanishni kutayotgan thread oladi
+        threading.Timer(0.05, pool.release, args=(client,)).start()
+        self.assertIs(pool.acquire(timeout=5), client)
+        self.assertEqual(len(clients), 1)
+
+    def test_idle_connections_are_reaped(self):
+        pool, clients = fake_pool(max_size=2, idle_timeout=0.05)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        self.assertEqual((pool.size, pool.idle_count), (2, 2))
+
+        time.sleep(0.1)
+        pool.reap_idle()
+        self.assertEqual((pool.size, pool.idle_count), (0, 0))
+        self.assertEqual([client.disconnects for client in clients], [1, 1])
+
+    def test_stale_connection_is_pinged_before_reuse(self):
+        pool, clients = fake_pool(max_size=1, health_check_interval=0)
+        client = pool.acquire()
+        pool.release(client)
+        self.assertIs(pool.acquire(), client)
+        self.assertEqual((client.connection.pings, client.disconnects), (1, 0))
+        pool.release(client)
+
+        # Ping o'tmasa ulanish yopiladi, keyingi execute() qayta ulanadi
+        client.connection.healthy = False
+        self.assertIs(pool.acquire(), client)
+        self.assertEqual((client.connection.pings, client.disconnects), (2, 1))
+
+    def test_recently_used_connection_is_not_pinged(self):
+        pool, clients = fake_pool(max_size=1, health_check_interval=60)
+        client = pool.acquire()
+        pool.release(client)
+        pool.acquire()
+        self.assertEqual(client.connection.pings, 0)
+
+    def test_connection_is_discarded_on_non_server_errors(self):
+        for error in (ConnectionError('uzildi'), KeyboardInterrupt()):
+            with self.subTest(error=type(error).__name__):
+                pool, clients = fake_pool(max_size=1)
+                with self.assertRaises(type(error)):
+                    with pool.connection():
+                        raise error
+                self.assertEqual((pool.size, pool.idle_count), (0, 0))
+                self.assertEqual(clients[0].disconnects, 1)
+
+    def test_server_error_keeps_connection(self):
+        pool, clients = fake_pool(max_size=1)
+        with self.assertRaises(ServerException):
+            with pool.connection():
+                raise ServerException('Syntax error', code=62)
+        self.assertEqual((pool.size, pool.idle_count), (1, 1))
+        self.assertEqual(clients[0].disconnects, 0)
+
+
+class GetPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(set_pool, set_pool(None))
+
+    def test_forked_process_builds_its_own_pool(self):
+        pool, _ = fake_pool()
+        set_pool(pool)
+        self.assertIs(get_pool(), pool)
+
+        with mock.patch.object(clickhouse_pool.os, 'getpid', return_value=pool.pid + 1):
+            child = get_pool()
+            self.assertIsNot(child, pool)
+            self.assertEqual(child.pid, pool.pid + 1)
+            self.assertIs(get_pool(), child)
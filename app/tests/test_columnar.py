@@ -0,0 +1,58 @@
+from datetime import date
+
+from django.test import SimpleTestCase
+
+from app.services import clickhouse_service
+from app.services.clickhouse_service import (
+    LANGUAGE_COLUMNS,
+    REPOSITORY_COLUMNS,
+    TOPIC_COLUMNS,
+    prepare_columns,
+    transform_repositories,
+    transform_repositories_columnar,
+)
+from app.services.synthetic import generate_repositories
+
+
+class ColumnarTransformTests(SimpleTestCase):
+    def setUp(self):
+        self.repos = generate_repositories(200, seed=7)
+        self.rows = transform_repositories(self.repos)
+        self.block = transform_repositories_columnar(self.repos)
+
+    def expected_columns(self, rows, spec):
+        columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in spec]
+        for column, (name, _) in zip(columns, spec):
+            if name in clickhouse_service.DATETIME_COLUMNS:
+                column[:] = [int(value.timestamp()) for value in column]
+        return columns
+
+    def test_matches_row_transform(self):
+        for rows, columns, spec in (
+            (self.rows.repositories, self.block.repositories, REPOSITORY_COLUMNS),
+            (self.rows.languages, self.block.languages, LANGUAGE_COLUMNS),
+            (self.rows.topics, self.block.topics, TOPIC_COLUMNS),
+        ):
+            prepared = prepare_columns(columns, spec, use_numpy=False)
+            self.assertEqual(prepared, self.expected_columns(rows, spec))
+
+    def test_numpy_columns(self):
+        if clickhouse_service.np is None:
+            self.skipTest('numpy o\'rnatilmagan')
+        plain = prepare_columns(self.block.repositories, REPOSITORY_COLUMNS, use_numpy=False)
+        arrays = prepare_columns(self.block.repositories, REPOSITORY_COLUMNS, use_numpy=True)
+        for (name, _), expected, column in zip(REPOSITORY_COLUMNS, plain, arrays):
+            values = column.tolist()
+            if name in clickhouse_service.DATE_COLUMNS:
+                self.assertIsInstance(values[0], date)
+            self.assertEqual(values, expected, name)
+
+    def test_failed_repository_is_rolled_back(self):
+        broken = dict(self.repos[1], topics=[{'stars': 1}])  # topic nomi yo'q: oxirgi bosqichda xato
+        block = transform_repositories_columnar([self.repos[0], broken, self.repos[2]])
+        self.assertEqual(block.error_count, 1)
+        self.assertEqual({len(column) for column in block.repositories}, {2})
+        for table in (block.languages, block.topics):
+            self.assertEqual(len({len(column) for column in table}), 1)
+        self.assertNotIn(broken['nameWithOwner'], block.repositories[2])
+        self.assertNotIn(broken['nameWithOwner'], block.languages[0])
@@ -0,0 +1,91 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from app.services.clickhouse_pool import ClickHousePool, set_pool
+from app.services.clickhouse_service import ClickHouseService, transform_repositories
+from app.services.clickhouse_standin import StandInStats
+from app.services.synthetic import generate_repositories, write_repositories
+from app.tests.helpers import LOCMEM_CACHE, FailingClient, TempDirMixin, VersionedClient
+
+
+class DeltaIngestTests(SimpleTestCase):
+    def service(self, **kwargs):
+        client = VersionedClient(**kwargs)
+        return ClickHouseService(pool=ClickHousePool(max_size=1, client_factory=lambda: client), layout='tables'), client
+
+    def positions(self, client, prefix):
+        return [i for i, query in enumerate(client.queries) if query.startswith(prefix)]
+
+    def test_fingerprints_written_only_after_all_tables(self):
+        service, client = self.service(fail_table='repository_topics')
+        with self.assertRaises(ConnectionError):
+            service.insert_changed(generate_repositories(20))
+        self.assertFalse(self.positions(client, 'INSERT INTO github_analytics.repository_fingerprints'))
+
+        service, client = self.service()
+        result = service.insert_changed(generate_repositories(20))
+        self.assertEqual(result.written, 20)
+        [fingerprints] = self.positions(client, 'INSERT INTO github_analytics.repository_fingerprints')
+        self.assertGreater(fingerprints, max(self.positions(client, 'INSERT INTO github_analytics.repository_topics')))
+
+    def test_years_are_marked_before_any_write(self):
+        service, client = self.service()
+        block = transform_repositories(generate_repositories(20))
+        years = service.upsert_block(block, refresh_rollup=False)
+        [mark] = self.positions(client, 'INSERT INTO github_analytics.rollup_pending_years')
+        self.assertEqual(min(self.positions(client, 'INSERT INTO')), mark)
+        self.assertFalse(self.positions(client, 'ALTER TABLE github_analytics.language_year_rollup'))
+
+        # Belgilangan yillar qayta yozilmaydi
+        service.upsert_block(block, refresh_rollup=False)
+        self.assertEqual(len(self.positions(client, 'INSERT INTO github_analytics.rollup_pending_years')), 1)
+        self.assertEqual(service._marked_years, years)
+
+    def test_refresh_pending_includes_interrupted_years(self):
+        service, client = self.service(pending=[(2015, '1700000000002'), (2021, '1700000000001')])
+        self.assertEqual(service.refresh_pending_rollup({2020}), [2015, 2020, 2021])
+        inserts = [q for q in client.queries if q.startswith('INSERT INTO github_analytics.language_year_rollup__refresh_')]
+        self.assertTrue(inserts and all('created_year IN (2015, 2020, 2021)' in q for q in inserts))
+        self.assertTrue(all(' FINAL ' in q for q in inserts))
+        self.assertEqual(
+            client.queries[-1],
+            'ALTER TABLE github_analytics.rollup_pending_years DELETE WHERE marked_at <= 1700000000002',
+        )
+
+    def test_unversioned_tables_are_read_without_final(self):
+        client = FailingClient(StandInStats())
+        service = ClickHouseService(pool=ClickHousePool(max_size=1, client_factory=lambda: client))
+        queries = []
+        execute = client.execute
+        client.execute = lambda query, *args, **kwargs: queries.append(query) or execute(query, *args, **kwargs)
+        service.get_repository_count()
+        service.refresh_language_rollup([2020])
+        self.assertFalse(any('FINAL' in query or 'is_deleted' in query for query in queries))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class VersionedIngestCommandTests(TempDirMixin, SimpleTestCase):
+    def test_rollup_refreshed_on_start_and_after_plain_reingest(self):
+        source = self.path('repos.json')
+        write_repositories(source, 30)
+        client = VersionedClient(pending=[(2009, '1')])
+        set_pool(ClickHousePool(max_size=1, client_factory=lambda: client))
+        self.addCleanup(set_pool, None)
+        out = StringIO()
+        call_command('ingest_to_clickhouse', source, '--batch-size', '10', stdout=out)
+
+        self.assertIn('Uzilgan ingest yillari rollupi yangilandi: 2009', out.getvalue())
+        marks = [i for i, q in enumerate(client.queries) if q.startswith('INSERT INTO github_analytics.rollup_pending_years')]
+        writes = [i for i, q in enumerate(client.queries) if q.startswith('INSERT INTO github_analytics.repositories ')]
+        self.assertLess(marks[0], writes[0])
+        refreshes = [q for q in client.queries if q.startswith('INSERT INTO github_analytics.language_year_rollup__refresh_')]
+        # boshida uzilgan yil, oxirida shu ingest yillari (belgilar jadvalidan) qayta hisoblanadi
+        self.assertEqual(len(refreshes), 4)
+        self.assertIn('created_year IN (2009)', refreshes[0])
+        with open(source, encoding='utf-8') as f:
+            years = sorted({int(repo['createdAt'][:4]) for repo in json.load(f)})
+        self.assertIn(f"created_year IN ({', '.join(map(str, years))})", refreshes[-1])
+        self.assertEqual(client.pending, [])
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from django.test import TestCase
+
+from app.models import Language, Owner, Repo
+from app.services import export
+from app.services.export import ExportFilters, csv_chunks, ndjson_chunks, orm_rows
+
+
+class OrmExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = Owner.objects.create(login='octo')
+        python = Language.objects.create(name='Python')
+        go = Language.objects.create(name='Go')
+        created = datetime(2020, 5, 1, tzinfo=timezone.utc)
+        # stars takrorlanadi: sahifa chegarasi bir xil stars ichiga tushadi
+        Repo.objects.bulk_create([
+            Repo(owner=owner, name=f'r{i}', name_with_owner=f'octo/r{i}', stars=i % 3,
+                 primary_language=python if i % 2 else go, created_year=2019 + i % 2,
+                 created_at=created, pushed_at=created)
+            for i in range(23)
+        ])
+
+    def expected(self, queryset):
+        return list(queryset.order_by('stars', 'id').values_list('name_with_owner', flat=True))
+
+    def test_keyset_pages_cover_every_row_once(self):
+        with self.assertNumQueries(5):
+            rows = list(orm_rows(ExportFilters(), page_size=5))
+        self.assertEqual([row[0] for row in rows], self.expected(Repo.objects.all()))
+
+    def test_exact_multiple_of_page_size(self):
+        expected = self.expected(Repo.objects.filter(primary_language__name='Python', stars__gte=1))
+        # to'liq sahifadan keyin bo'sh sahifa so'raladi va to'xtaydi
+        with self.assertNumQueries(2):
+            rows = list(orm_rows(ExportFilters(language='Python', min_stars=1), page_size=len(expected)))
+        self.assertEqual([row[0] for row in rows], expected)
+
+    def test_filters_and_normalized_values(self):
+        rows = list(orm_rows(ExportFilters(year=2020, max_stars=1), page_size=100))
+        self.assertEqual([row[0] for row in rows], self.expected(Repo.objects.filter(created_year=2020, stars__lte=1)))
+        row = dict(zip(export.COLUMN_NAMES, rows[0]))
+        self.assertEqual(row['owner'], 'octo')
+        self.assertIs(row['is_fork'], False)
+        self.assertEqual(row['created_at'].tzinfo, timezone.utc)
+
+
+class ExportFormatTests(TestCase):
+    rows = [
+        ('a/b', 'a', 'b', None, 'Go', 'MIT', 5, 1, 1, 10, False, True, 2020,
+         datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc), datetime(2021, 1, 1, tzinfo=timezone.utc)),
+    ]
+
+    def test_csv(self):
+        text = b''.join(csv_chunks(iter(self.rows))).decode('utf-8')
+        header, row = list(csv.reader(io.StringIO(text)))
+        self.assertEqual(header, export.COLUMN_NAMES)
+        self.assertEqual(row[3], '')
+        self.assertEqual(row[13], '2020-01-02T03:04:05+00:00')
+
+    def test_ndjson(self):
+        [line] = b''.join(ndjson_chunks(iter(self.rows))).decode('utf-8').splitlines()
+        record = json.loads(line)
+        self.assertEqual(record['name_with_owner'], 'a/b')
+        self.assertIsNone(record['description'])
+        self.assertIs(record['is_archived'], True)
+
+    def test_parquet_row_groups(self):
+        if export.pa is None:
+            self.skipTest("pyarrow o'rnatilmagan")
+        import pyarrow.parquet as pq
+        data = b''.join(export.parquet_chunks(iter(self.rows * 5), row_group_size=2))
+        table = pq.ParquetFile(io.BytesIO(data))
+        self.assertEqual(table.metadata.num_row_groups, 3)
+        self.assertEqual(table.read().column('stars').to_pylist(), [5] * 5)
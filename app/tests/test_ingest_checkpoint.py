@@ -0,0 +1,95 @@
+import json
+import os
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from app.services.clickhouse_pool import set_pool
+from app.services.clickhouse_service import ClickHouseService, transform_repositories
+from app.services.clickhouse_standin import StandInStats
+from app.services.ingest_checkpoint import CheckpointMismatch, IngestCheckpoint
+from app.services.synthetic import generate_repositories, write_repositories
+from app.tests.helpers import LOCMEM_CACHE, TempDirMixin, standin_pool
+
+
+class IngestCheckpointTests(TempDirMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = self.path('repos.json')
+        write_repositories(self.source, 10)
+        self.checkpoint_path = self.path('repos.json.checkpoint.json')
+
+    def test_resume_keeps_run_id_and_completed_batches(self):
+        checkpoint = IngestCheckpoint(self.checkpoint_path, self.source, 5)
+        self.assertFalse(checkpoint.resumed)
+        checkpoint.mark_done(1)
+        checkpoint.mark_done(3)
+
+        resumed = IngestCheckpoint(self.checkpoint_path, self.source, 5)
+        self.assertTrue(resumed.resumed)
+        self.assertEqual(resumed.completed, {1, 3})
+        self.assertTrue(resumed.is_done(3))
+        self.assertFalse(resumed.is_done(2))
+        self.assertEqual(resumed.dedup_token(2), checkpoint.dedup_token(2))
+        self.assertNotEqual(resumed.dedup_token(2), resumed.dedup_token(4))
+
+        resumed.finish()
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+        self.assertNotEqual(IngestCheckpoint(self.checkpoint_path, self.source, 5).run_id, checkpoint.run_id)
+
+    def test_mismatched_checkpoint_is_rejected(self):
+        IngestCheckpoint(self.checkpoint_path, self.source, 5).mark_done(1)
+        with self.assertRaises(CheckpointMismatch):
+            IngestCheckpoint(self.checkpoint_path, self.source, 50)
+        with open(self.source, 'a', encoding='utf-8') as f:
+            f.write('\n')
+        with self.assertRaises(CheckpointMismatch):
+            IngestCheckpoint(self.checkpoint_path, self.source, 5)
+
+
+class InsertBlockFailureTests(SimpleTestCase):
+    def test_child_table_failure_is_raised(self):
+        block = transform_repositories(generate_repositories(20))
+        self.assertTrue(block.languages and block.topics)
+        for table in ('repository_languages', 'repository_topics'):
+            tokens = []
+            service = ClickHouseService(pool=standin_pool(StandInStats(), table, tokens=tokens), layout='tables')
+            with self.assertRaises(ConnectionError):
+                service.insert_block(block, dedup_token='batch-1')
+            # har jadval o'z tokeni bilan: qayta yuborishda yozilganlari tashlab yuboriladi
+            self.assertEqual(len(set(tokens)), len(tokens))
+            self.assertTrue(all(token.startswith('batch-1:') for token in tokens))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class IngestResumeTests(TempDirMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = self.path('repos.json')
+        write_repositories(self.source, 30)
+        self.addCleanup(set_pool, None)
+
+    def ingest(self, pool, *args):
+        set_pool(pool)
+        call_command('ingest_to_clickhouse', self.source, '--batch-size', '10', '--resume', *args, stdout=StringIO())
+
+    def test_batch_with_failed_child_insert_is_not_marked_done(self):
+        self.ingest(standin_pool(StandInStats(), fail_table='repository_topics', fail_inserts={2}))
+        with open(f'{self.source}.checkpoint.json', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['completed'], [1, 3])
+
+        tokens = []
+        stats = StandInStats()
+        self.ingest(standin_pool(stats, tokens=tokens))
+        # faqat 2-batch qayta yuboriladi
+        self.assertEqual(stats.rows['github_analytics.repositories'], 10)
+        self.assertFalse(os.path.exists(f'{self.source}.checkpoint.json'))
+        self.assertEqual(len({token.split(':')[0] for token in tokens}), 1)
+
+    def test_resume_skips_completed_batches(self):
+        checkpoint = IngestCheckpoint(f'{self.source}.checkpoint.json', self.source, 10)
+        checkpoint.mark_done(2)
+        stats = StandInStats()
+        self.ingest(standin_pool(stats))
+        self.assertEqual(stats.rows['github_analytics.repositories'], 20)
@@ -0,0 +1,141 @@
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app.services.clickhouse_service import (
+    LANGUAGE_COLUMNS,
+    REPOSITORY_COLUMNS,
+    TOPIC_COLUMNS,
+    ClickHouseService,
+    block_column,
+    transform_repositories_columnar,
+)
+from app.services.clickhouse_pool import ClickHousePool
+from app.services.clickhouse_standin import StandInStats
+from app.services.insert_buffer import InsertBuffer, latest_updates
+from app.services.synthetic import generate_repositories
+from app.tests.helpers import LOCMEM_CACHE, VersionedClient, standin_pool
+
+
+def names(block):
+    return (
+        block_column(block.repositories, REPOSITORY_COLUMNS, 'name_with_owner', True),
+        set(block_column(block.languages, LANGUAGE_COLUMNS, 'repo_name_with_owner', True)),
+        set(block_column(block.topics, TOPIC_COLUMNS, 'repo_name_with_owner', True)),
+    )
+
+
+class LatestUpdatesTests(SimpleTestCase):
+    def setUp(self):
+        self.repos = generate_repositories(6, seed=3)
+
+    def test_later_update_wins(self):
+        first, second, third = self.repos[:2], self.repos[2:4], [dict(self.repos[0], stars=99), self.repos[4]]
+        blocks = [transform_repositories_columnar(repos) for repos in (first, second, third)]
+        latest = latest_updates(blocks)
+
+        self.assertIs(latest[1], blocks[1])
+        self.assertIs(latest[2], blocks[2])
+        repeated = self.repos[0]['nameWithOwner']
+        kept = self.repos[1]['nameWithOwner']
+        repositories, languages, topics = names(latest[0])
+        self.assertEqual(repositories, [kept])
+        self.assertLessEqual(languages | topics, {kept})
+        self.assertEqual(len({len(column) for column in latest[0].languages}), 1)
+        self.assertIn(repeated, names(latest[2])[0])
+
+    def test_fully_replaced_block_is_empty(self):
+        blocks = [transform_repositories_columnar(self.repos[:2]), transform_repositories_columnar(self.repos[:3])]
+        latest = latest_updates(blocks)
+        self.assertEqual(names(latest[0]), ([], set(), set()))
+        self.assertEqual(latest[0].error_count, blocks[0].error_count)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class InsertBufferRetryTests(SimpleTestCase):
+    def test_failed_child_insert_is_retried_with_same_token(self):
+        stats, tokens = StandInStats(), []
+        pool = standin_pool(stats, 'repository_topics', fail_inserts={1}, tokens=tokens)
+        buffer = InsertBuffer(ClickHouseService(pool=pool, layout='tables'), max_wait=60, retry_backoff=0.01)
+        self.addCleanup(buffer.close, 5)
+        accepted, _ = buffer.add(generate_repositories(20))
+
+        self.assertTrue(buffer.flush(timeout=5))
+        self.assertEqual(stats.rows['github_analytics.repositories'], 2 * accepted)
+        self.assertGreater(stats.rows['github_analytics.repository_topics'], 0)
+        # repositories/languages ikkinchi urinishda o'sha token bilan: server ularni tashlab yuboradi
+        by_table = {}
+        for token in tokens:
+            by_table.setdefault(token.rsplit(':', 1)[1], []).append(token)
+        self.assertEqual(set(by_table), {'repositories', 'repository_languages', 'repository_topics'})
+        for table_tokens in by_table.values():
+            self.assertEqual(len(table_tokens), 2)
+            self.assertEqual(len(set(table_tokens)), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class InsertBufferRollupTests(SimpleTestCase):
+    def buffer(self, rollup_interval):
+        client = VersionedClient()
+        service = ClickHouseService(pool=ClickHousePool(max_size=1, client_factory=lambda: client), layout='tables')
+        buffer = InsertBuffer(service, max_wait=60, rollup_interval=rollup_interval)
+        self.addCleanup(buffer.close, 5)
+        return buffer, client
+
+    def refreshes(self, client):
+        return sum(q.startswith('SELECT created_year, max(marked_at)') for q in client.queries)
+
+    def test_flush_does_not_refresh_rollup_until_close(self):
+        buffer, client = self.buffer(rollup_interval=60)
+        for seed in (1, 2):
+            buffer.add(generate_repositories(5, seed=seed))
+            self.assertTrue(buffer.flush(timeout=5))
+        self.assertEqual(self.refreshes(client), 0)
+        self.assertTrue(client.pending)
+
+        buffer.close(5)
+        self.assertEqual(self.refreshes(client), 1)
+        self.assertEqual(client.pending, [])
+
+    def test_rollup_refreshed_once_after_interval(self):
+        buffer, client = self.buffer(rollup_interval=0.05)
+        buffer.add(generate_repositories(5))
+        self.assertTrue(buffer.flush(timeout=5))
+        deadline = time.monotonic() + 5
+        while not self.refreshes(client) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        self.assertEqual(self.refreshes(client), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RepositoryUpdatesViewTests(SimpleTestCase):
+    def setUp(self):
+        self.buffer = InsertBuffer(ClickHouseService(pool=standin_pool(StandInStats()), layout='tables'), max_wait=60)
+        self.addCleanup(self.buffer.close, 5)
+        patcher = mock.patch('app.views.get_insert_buffer', return_value=self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.url = reverse('ch-repository-updates')
+        self.repos = generate_repositories(3)
+
+    def test_anonymous_post_is_rejected(self):
+        response = self.client.post(self.url, self.repos, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.buffer.pending_rows, 0)
+
+    def test_non_staff_user_is_rejected(self):
+        self.client.force_authenticate(SimpleNamespace(is_authenticated=True, is_staff=False))
+        response = self.client.post(self.url, self.repos, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_staff_post_is_buffered(self):
+        self.client.force_authenticate(SimpleNamespace(is_authenticated=True, is_staff=True))
+        response = self.client.post(self.url, self.repos, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['accepted'], 3)
@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from app.services.json_stream import iter_batches, iter_repositories
+
+
+class IterRepositoriesTests(SimpleTestCase):
+    def write(self, text):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_array_and_ndjson(self):
+        repos = [{'nameWithOwner': f'o/r{i}', 'stars': i, 'desc': 'x' * i} for i in range(50)]
+        array = self.write(json.dumps(repos))
+        ndjson = self.write('\n'.join(json.dumps(r) for r in repos) + '\n')
+        # Kichik qism hajmi obyektlarni va sonlarni qism chegarasida kesadi
+        for path in (array, ndjson):
+            for chunk_size in (1, 7, 64, 1 << 20):
+                self.assertEqual(list(iter_repositories(path, chunk_size=chunk_size)), repos)
+
+    def test_empty_inputs(self):
+        self.assertEqual(list(iter_repositories(self.write(''))), [])
+        self.assertEqual(list(iter_repositories(self.write(' [ ] '))), [])
+
+    def test_unclosed_array(self):
+        path = self.write('[{"a": 1},\n{"a": 2}')
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_repositories(path, chunk_size=4))
+
+    def test_error_position_is_file_relative(self):
+        path = self.write('{"a": 1}\n{"a": 2}\n{"a": }\n')
+        with self.assertRaises(json.JSONDecodeError) as ctx:
+            list(iter_repositories(path, chunk_size=5))
+        self.assertEqual((ctx.exception.lineno, ctx.exception.colno, ctx.exception.pos), (3, 7, 24))
+        self.assertIn('line 3 column 7 (char 24)', str(ctx.exception))
+
+    def test_oversized_object_is_capped(self):
+        path = self.write('{"a": 1}\n{"b": "' + 'x' * 5000)
+        with self.assertRaises(json.JSONDecodeError) as ctx:
+            list(iter_repositories(path, chunk_size=16, max_object_size=1024))
+        self.assertEqual((ctx.exception.lineno, ctx.exception.colno, ctx.exception.pos), (2, 1, 9))
+
+
+class IterBatchesTests(SimpleTestCase):
+    def test_batches(self):
+        self.assertEqual(list(iter_batches(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(iter_batches([], 3)), [])
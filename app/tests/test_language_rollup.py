@@ -0,0 +1,72 @@
+import re
+
+from django.test import SimpleTestCase
+
+from app.services.clickhouse_pool import ClickHousePool
+from app.services.clickhouse_service import ClickHouseService
+from app.services.clickhouse_standin import InProcessClickHouseClient
+
+_PARTS_RE = re.compile(r"table = '([\w]+)'")
+
+
+class RecordingClient(InProcessClickHouseClient):
+    """
+    So'rovlarni yozib boradi; ``system.parts`` ga berilgan partitionlar,
+    rollup ``partition_key`` so'roviga ``partition_key`` bilan javob beradi.
+    """
+
+    def __init__(self, partitions, partition_key='created_year'):
+        super().__init__()
+        self.partitions = partitions
+        self.partition_key = partition_key
+        self.queries = []
+
+    def execute(self, query, params=None, **kwargs):
+        self.queries.append(' '.join(query.split()))
+        if 'FROM system.parts' in query:
+            table = _PARTS_RE.search(query).group(1)
+            staging = '__refresh_' in table
+            return [(partition,) for partition in self.partitions['staging' if staging else 'rollup']]
+        if 'SELECT partition_key FROM system.tables' in ' '.join(query.split()):
+            return [(self.partition_key,)]
+        return super().execute(query, params, **kwargs)
+
+
+class LanguageRollupRecomputeTests(SimpleTestCase):
+    def service(self, partitions, partition_key='created_year'):
+        client = RecordingClient(partitions, partition_key)
+        return ClickHouseService(pool=ClickHousePool(max_size=1, client_factory=lambda: client)), client
+
+    def alters(self, client):
+        return [q.split(' FROM ')[0] for q in client.queries if q.startswith('ALTER TABLE')]
+
+    def test_rebuild_swaps_partitions_instead_of_truncating(self):
+        service, client = self.service({'staging': ['2019', '2020'], 'rollup': ['2018', '2019']})
+        service.rebuild_language_rollup()
+        self.assertFalse(any(q.startswith('TRUNCATE') for q in client.queries))
+        inserts = [q for q in client.queries if q.startswith('INSERT INTO')]
+        self.assertTrue(inserts and all('language_year_rollup__refresh_' in q.split()[2] for q in inserts))
+        self.assertEqual(self.alters(client), [
+            "ALTER TABLE github_analytics.language_year_rollup DROP PARTITION ID '2018'",
+            "ALTER TABLE github_analytics.language_year_rollup REPLACE PARTITION ID '2019'",
+            "ALTER TABLE github_analytics.language_year_rollup REPLACE PARTITION ID '2020'",
+        ])
+        self.assertTrue(client.queries[-1].startswith('DROP TABLE IF EXISTS github_analytics.language_year_rollup__refresh_'))
+
+    def test_refresh_touches_only_given_years(self):
+        service, client = self.service({'staging': ['2020'], 'rollup': ['2018', '2019', '2020']})
+        service.refresh_language_rollup([2020, 2021])
+        self.assertEqual(self.alters(client), [
+            "ALTER TABLE github_analytics.language_year_rollup REPLACE PARTITION ID '2020'",
+            "ALTER TABLE github_analytics.language_year_rollup DROP PARTITION ID '2021'",
+        ])
+        self.assertTrue(all('created_year IN (2020, 2021)' in q for q in client.queries if q.startswith('INSERT')))
+
+    def test_refresh_rebuilds_whole_rollup_when_not_partitioned_by_year(self):
+        # 0003 gacha rollupning yagona partitioni 'all': yil ID lari bilan REPLACE bo'sh qolardi
+        service, client = self.service({'staging': ['all'], 'rollup': ['all']}, partition_key='')
+        service.refresh_language_rollup([2020])
+        self.assertEqual(self.alters(client), [
+            "ALTER TABLE github_analytics.language_year_rollup REPLACE PARTITION ID 'all'",
+        ])
+        self.assertFalse(any('created_year IN' in q for q in client.queries if q.startswith('INSERT')))
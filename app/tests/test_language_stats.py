@@ -0,0 +1,66 @@
+import copy
+
+from django.test import TestCase
+
+from app.models import Language, LanguageYearStat
+from app.services.language_stats import (
+    apply_language_year_changes,
+    language_year_totals,
+    rebuild_language_year_stats,
+)
+from app.services.repo_importer import BulkRepoImporter
+from app.services.synthetic import generate_repositories
+
+
+def stored_totals():
+    return {
+        (stat.year, stat.language_id): (stat.total_size, stat.repo_count)
+        for stat in LanguageYearStat.objects.all()
+    }
+
+
+class ApplyLanguageYearChangesTests(TestCase):
+    def setUp(self):
+        self.python = Language.objects.create(name='Python').id
+        self.go = Language.objects.create(name='Go').id
+        LanguageYearStat.objects.create(year=2020, language_id=self.python, total_size=500, repo_count=5)
+        LanguageYearStat.objects.create(year=2020, language_id=self.go, total_size=50, repo_count=1)
+
+    def test_difference_is_applied(self):
+        before = {(2020, self.python): (100, 2), (2020, self.go): (50, 1), (2019, self.go): (7, 1)}
+        after = {(2020, self.python): (130, 2), (2021, self.go): (10, 1), (2019, self.go): (7, 1)}
+        self.assertEqual(apply_language_year_changes(before, after), 3)
+        self.assertEqual(stored_totals(), {
+            (2020, self.python): (530, 5),
+            (2021, self.go): (10, 1),
+        })
+
+    def test_no_change_touches_nothing(self):
+        totals = {(2020, self.python): (100, 2)}
+        stored = stored_totals()
+        self.assertEqual(apply_language_year_changes(totals, dict(totals)), 0)
+        self.assertEqual(stored_totals(), stored)
+
+
+class ImporterLanguageStatsTests(TestCase):
+    def setUp(self):
+        self.repos = [repo for repo in generate_repositories(60, seed=5) if repo['languages']]
+
+    def test_delta_reimport_keeps_stats_exact(self):
+        BulkRepoImporter(chunk_size=7).import_items(self.repos)
+        self.assertEqual(stored_totals(), language_year_totals())
+
+        changed = copy.deepcopy(self.repos)
+        changed[0]['languages'] = changed[0]['languages'][1:]
+        changed[1]['languages'][0]['size'] += 1000
+        changed[2]['languages'].append({'name': 'Zig', 'size': 5})
+        changed[3]['pushedAt'] = '2030-01-01T00:00:00Z'
+        stats = BulkRepoImporter(chunk_size=7, delta=True).import_items(changed)
+        self.assertEqual(stats['unchanged'], len(changed) - 4)
+        self.assertEqual(stored_totals(), language_year_totals())
+
+    def test_rebuild_matches_aggregate(self):
+        BulkRepoImporter(maintain_stats=False).import_items(self.repos)
+        self.assertFalse(LanguageYearStat.objects.exists())
+        self.assertEqual(rebuild_language_year_stats(), len(language_year_totals()))
+        self.assertEqual(stored_totals(), language_year_totals())
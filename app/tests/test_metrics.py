@@ -0,0 +1,92 @@
+import re
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from app.services.clickhouse_pool import ClickHousePool, set_pool
+from app.services.clickhouse_standin import InProcessClickHouseClient
+from app.tests.helpers import LOCMEM_CACHE
+
+# Prometheus text format 0.0.4: izoh qatorlari yoki `nom{label="qiymat",...} son`
+LABEL = r'[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*"'
+SAMPLE_RE = re.compile(
+    rf'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{{(?P<labels>{LABEL}(?:,{LABEL})*)\}})? '
+    r'(?P<value>[+-]?(?:\d+(?:\.\d*)?(?:e[+-]?\d+)?|Inf)|NaN)$'
+)
+HELP_RE = re.compile(r'^# HELP (?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*) .+$')
+TYPE_RE = re.compile(r'^# TYPE (?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*) (counter|gauge|histogram|summary|untyped)$')
+HISTOGRAM_SUFFIXES = ('_bucket', '_sum', '_count')
+
+
+def parse_metrics(text):
+    """Matnni tekshirib ``{(nom, label juftliklari): qiymat}`` qaytaradi; format buzilsa AssertionError."""
+    samples = {}
+    types = {}
+    current = None
+    for line in text.splitlines():
+        match = TYPE_RE.match(line)
+        if match:
+            current = match.group('name')
+            assert current not in types, f'takroriy TYPE: {line}'
+            types[current] = match.group(2)
+            continue
+        if HELP_RE.match(line):
+            continue
+        match = SAMPLE_RE.match(line)
+        assert match, f"noto'g'ri qator: {line!r}"
+        name = match.group('name')
+        family = name
+        if types.get(current) == 'histogram' and name.endswith(HISTOGRAM_SUFFIXES):
+            family = name.rsplit('_', 1)[0]
+        assert family == current, f'{name} o\'z TYPE qatoridan keyin emas'
+        labels = tuple(re.findall(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"', match.group('labels') or ''))
+        samples[name, labels] = float(match.group('value').replace('Inf', 'inf'))
+    return samples
+
+
+def series(samples, metric, **labels):
+    expected = set(labels.items())
+    return {key[1]: value for key, value in samples.items() if key[0] == metric and expected <= set(key[1])}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class MetricsEndpointTests(SimpleTestCase):
+    def setUp(self):
+        caches['query_cache'].clear()
+        client = InProcessClickHouseClient()
+        self.addCleanup(set_pool, set_pool(ClickHousePool(max_size=1, client_factory=lambda: client)))
+
+    def metrics(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return parse_metrics(response.content.decode())
+
+    def test_request_is_counted_with_latency_histogram(self):
+        labels = {'endpoint': 'ch-top-languages', 'method': 'GET', 'status': '200'}
+        before = series(self.metrics(), 'app_http_request_duration_seconds_count', **labels)
+
+        response = self.client.get(reverse('ch-top-languages'), {'year': 2020, 'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        samples = self.metrics()
+
+        [count] = series(samples, 'app_http_request_duration_seconds_count', **labels).values()
+        self.assertEqual(count, sum(before.values()) + 1)
+        self.assertEqual(len(series(samples, 'app_http_request_duration_seconds_sum', **labels)), 1)
+        buckets = series(samples, 'app_http_request_duration_seconds_bucket', **labels)
+        by_bound = sorted(((dict(key)['le'], value) for key, value in buckets.items()),
+                          key=lambda item: float(item[0].replace('+Inf', 'inf')))
+        self.assertEqual(by_bound[-1], ('+Inf', count))
+        self.assertEqual([value for _, value in by_bound], sorted(value for _, value in by_bound))
+
+        query = {'backend': 'clickhouse', 'query': 'top_languages_by_size'}
+        self.assertTrue(series(samples, 'app_query_duration_seconds_count', **query))
+        self.assertTrue(series(samples, 'app_query_cache_requests_total',
+                               scope='clickhouse', name='ch_top_langs_by_year', result='miss'))
+
+    def test_unresolved_path_uses_fixed_label(self):
+        self.client.get('/app/no-such-endpoint')
+        samples = self.metrics()
+        self.assertTrue(series(samples, 'app_http_request_duration_seconds_count', endpoint='unmatched', status='404'))
+        self.assertFalse(any('no-such-endpoint' in value for _, labels in samples for _, value in labels))
@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase
+
+from app.services.parallel_ingest import ParallelIngester, WorkerCrashed
+
+# Ishchilar fork bilan ochiladi: ota jarayondagi patch va Event ularga o'tadi
+FORK = multiprocessing.get_start_method() == 'fork'
+
+
+class ScriptedService:
+    """
+    Ishchidagi ``ClickHouseService`` o'rnida: batch - buyruqlar ro'yxati
+    (soniya - kutish, 'fail' - xatolik, 'exit' - jarayon o'ladi, 'wait' - ``release`` ni kutish).
+    """
+
+    # Har testda yangisi: terminate qilingan kutuvchi Event holatini buzadi
+    release = None
+
+    def __init__(self):
+        self.pool = SimpleNamespace(close=lambda: None)
+
+    def insert_repository_date(self, batch, **kwargs):
+        for command in batch:
+            if command == 'fail':
+                raise ValueError('buzuq batch')
+            if command == 'exit':
+                os._exit(3)
+            if command == 'wait':
+                self.release.wait(10)
+            else:
+                time.sleep(command)
+        return 0
+
+
+@skipUnless(FORK, 'ishchilar fork bilan ishga tushirilganda')
+class ParallelIngesterTests(SimpleTestCase):
+    def setUp(self):
+        ScriptedService.release = multiprocessing.Event()
+        patcher = mock.patch('app.services.parallel_ingest.ClickHouseService', ScriptedService)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_results_are_yielded_in_submission_order(self):
+        # Oldingi batchlar sekinroq: ishchilarda teskari tartibda tugaydi
+        batches = [(num, [0.05 * (6 - num)], None) for num in range(1, 6)]
+        batches[2] = (3, ['fail'], None)
+        with ParallelIngester(3) as ingester:
+            results = list(ingester.ingest(batches))
+        self.assertEqual([result.batch_num for result in results], [1, 2, 3, 4, 5])
+        self.assertEqual([result.error for result in results], [None, None, 'buzuq batch', None, None])
+        self.assertGreater(len({result.worker for result in results}), 1)
+
+    def test_full_queue_stops_reading_batches(self):
+        read = []
+
+        def batches():
+            for num in range(1, 11):
+                read.append(num)
+                yield num, ['wait'], None
+
+        results = []
+        with ParallelIngester(1, queue_depth=1) as ingester:
+            consumer = threading.Thread(target=lambda: results.extend(ingester.ingest(batches())))
+            consumer.start()
+            time.sleep(1)
+            # ishchidagi batch + navbatdagi + navbatga qo'yilayotgan
+            self.assertLessEqual(len(read), 3)
+            ScriptedService.release.set()
+            consumer.join(10)
+        self.assertFalse(consumer.is_alive())
+        self.assertEqual([result.batch_num for result in results], list(range(1, 11)))
+
+    def test_worker_dying_mid_batch_is_reported(self):
+        started = time.monotonic()
+        with self.assertRaises(WorkerCrashed) as raised:
+            with ParallelIngester(2) as ingester:
+                list(ingester.ingest([(1, [0.01], None), (2, ['exit'], None), (3, [0.01], None)]))
+        self.assertIn('exit code 3', str(raised.exception))
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertFalse(any(process.is_alive() for process in ingester.processes))
+
+    def test_abort_terminates_busy_workers(self):
+        ingester = ParallelIngester(2, queue_depth=1)
+        for num in range(4):
+            ingester.tasks.put((num, ['wait'], None))
+        started = time.monotonic()
+        ingester.close(abort=True)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertFalse(any(process.is_alive() for process in ingester.processes))
+        self.assertTrue(all(process.exitcode is not None for process in ingester.processes))
@@ -0,0 +1,36 @@
+from django.test import SimpleTestCase
+
+from app.services.clickhouse_service import transform_repositories, transform_repositories_columnar
+from app.services.parallel_transform import ParallelTransformer, split_batch
+from app.services.synthetic import generate_repositories
+
+
+class ParallelTransformerTests(SimpleTestCase):
+    def test_split_batch_keeps_order(self):
+        parts = split_batch(list(range(10)), 3)
+        self.assertEqual(len(parts), 3)
+        self.assertEqual(sum(parts, []), list(range(10)))
+
+    def assert_matches_serial(self, batch, max_errors, workers=4):
+        for columnar, serial in ((False, transform_repositories), (True, transform_repositories_columnar)):
+            with ParallelTransformer(workers, columnar=columnar, max_errors=max_errors) as transformer:
+                [(_, _, block)] = list(transformer.transform_batches([(1, batch)]))
+            self.assertEqual(block, serial(batch, max_errors=max_errors))
+
+    def test_max_errors_is_shared_by_workers(self):
+        # nameWithOwner siz lug'atlar transformda xato beradi
+        batch = [{'bad': i} for i in range(80)]
+        with ParallelTransformer(4, max_errors=20) as transformer:
+            [(_, _, block)] = list(transformer.transform_batches([(1, batch)]))
+        # ketma-ket transform kabi 21-xatoda to'xtaydi
+        self.assertEqual(block.error_count, 21)
+        self.assert_matches_serial(batch, 20)
+
+    def test_output_matches_serial_transform(self):
+        repos = generate_repositories(60, seed=7)
+        # Xatolar bo'laklar bo'ylab sochilgan: chegara turli bo'laklar ichida oshadi
+        batch = [{'bad': i} if i % 6 == 0 else repo for i, repo in enumerate(repos)]
+        for max_errors in (0, 3, 7, 100):
+            with self.subTest(max_errors=max_errors):
+                self.assert_matches_serial(batch, max_errors)
+        self.assert_matches_serial(repos, 0)
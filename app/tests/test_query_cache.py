@@ -0,0 +1,97 @@
+import asyncio
+import tempfile
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from app.services import query_cache
+from app.tests.helpers import LOCMEM
+
+
+@override_settings(CACHES={'default': LOCMEM, 'query_cache': dict(LOCMEM, LOCATION='query-cache-tests')})
+class CachedQueryTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['query_cache'].clear()
+
+    def test_bump_invalidates_only_its_scope(self):
+        calls = []
+
+        def compute(value):
+            calls.append(value)
+            return value
+
+        self.assertEqual(query_cache.cached_query(query_cache.CLICKHOUSE, 'k', lambda: compute('a')), 'a')
+        self.assertEqual(query_cache.cached_query(query_cache.ORM, 'k', lambda: compute('b')), 'b')
+        self.assertEqual(query_cache.cached_query(query_cache.CLICKHOUSE, 'k', lambda: compute('x')), 'a')
+
+        query_cache.bump_data_version(query_cache.CLICKHOUSE)
+        self.assertEqual(query_cache.cached_query(query_cache.CLICKHOUSE, 'k', lambda: compute('c')), 'c')
+        self.assertEqual(query_cache.cached_query(query_cache.ORM, 'k', lambda: compute('x')), 'b')
+        self.assertEqual(calls, ['a', 'b', 'c'])
+        self.assertFalse(caches['default'].get(query_cache._version_key(query_cache.CLICKHOUSE)))
+
+    def test_lost_version_key_does_not_revive_old_entries(self):
+        query_cache.bump_data_version(query_cache.ORM)
+        query_cache.cached_query(query_cache.ORM, 'k', lambda: 'old')
+        # versiya kaliti keshdan chiqib ketdi (eviction/cull)
+        caches['query_cache'].delete(query_cache._version_key(query_cache.ORM))
+        self.assertEqual(query_cache.cached_query(query_cache.ORM, 'k', lambda: 'new'), 'new')
+
+    def test_single_flight_within_process(self):
+        calls = []
+        started = threading.Barrier(8)
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 42
+
+        def worker(results):
+            started.wait()
+            results.append(query_cache.cached_query(query_cache.CLICKHOUSE, 'slow', compute))
+
+        results = []
+        threads = [threading.Thread(target=worker, args=(results,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [42] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_local_locks_do_not_grow_with_keys(self):
+        for i in range(500):
+            query_cache.cached_query(query_cache.CLICKHOUSE, f'key-{i}', lambda: i)
+            query_cache.bump_data_version(query_cache.CLICKHOUSE)
+        self.assertEqual(len(query_cache._local_locks), query_cache.LOCAL_LOCK_STRIPES)
+        self.assertFalse(any(lock.locked() for lock in query_cache._local_locks))
+
+    def test_async_variant_shares_entries(self):
+        async def compute():
+            return 'async'
+
+        value = asyncio.run(query_cache.acached_query(query_cache.CLICKHOUSE, 'shared', compute))
+        self.assertEqual(value, 'async')
+        self.assertEqual(query_cache.cached_query(query_cache.CLICKHOUSE, 'shared', lambda: 'sync'), 'async')
+
+
+class FileBasedVersionTests(SimpleTestCase):
+    def test_bumped_version_does_not_expire_with_default_timeout(self):
+        # incr() FileBasedCache da kalitni standart TIMEOUT bilan qayta yozardi:
+        # versiya 1 soniyadan keyin yo'qolib, eski ':v1' yozuvlari yana o'qilardi
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            'default': LOCMEM,
+            'query_cache': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+                'TIMEOUT': 1,
+            },
+        }):
+            first = query_cache.get_data_version(query_cache.CLICKHOUSE)
+            bumped = query_cache.bump_data_version(query_cache.CLICKHOUSE)
+            self.assertGreater(bumped, first)
+            time.sleep(1.2)
+            self.assertEqual(query_cache.get_data_version(query_cache.CLICKHOUSE), bumped)
@@ -0,0 +1,85 @@
+import tempfile
+import unittest
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from app.services.clickhouse_schema import rebuild_table, table_layout
+from app.services.clickhouse_service import LANGUAGE_ROLLUP_TABLE, ClickHouseService
+from app.services.synthetic import generate_repositories
+from app.tests.helpers import chdb_session, embedded_pool
+
+COMMAND = 'app.management.commands.rebuild_clickhouse_schema'
+STORAGE = {'rows': 10, 'compressed_bytes': 100, 'uncompressed_bytes': 200, 'columns': {}}
+ROLLUP_QUERY = f'''
+    SELECT created_year, language, sum(total_size), uniqMerge(repo_count),
+           sum(total_stars), max(max_stars), sum(row_count)
+    FROM {LANGUAGE_ROLLUP_TABLE}
+    GROUP BY created_year, language
+    ORDER BY created_year, language
+'''
+
+
+@mock.patch(f'{COMMAND}._time_queries', return_value={})
+@mock.patch(f'{COMMAND}.BENCHMARK_QUERIES', {})
+@mock.patch(f'{COMMAND}.table_storage', return_value=STORAGE)
+@mock.patch(f'{COMMAND}.ClickHouseService')
+class RebuildClickHouseSchemaTests(SimpleTestCase):
+    def run_command(self, rebuild):
+        with mock.patch(f'{COMMAND}.rebuild_table', side_effect=rebuild), \
+                mock.patch(f'{COMMAND}.bump_data_version') as bump:
+            call_command('rebuild_clickhouse_schema', '--tables', 'repositories,repository_topics', stdout=StringIO())
+        return bump
+
+    def test_swap_bumps_cache_version(self, *mocks):
+        bump = self.run_command(lambda service, table, profile, keep_old: 10)
+        bump.assert_called_once_with('clickhouse')
+
+    def test_no_bump_when_nothing_changed(self, *mocks):
+        bump = self.run_command(lambda service, table, profile, keep_old: None)
+        bump.assert_not_called()
+
+    def test_bump_after_partial_failure(self, *mocks):
+        def rebuild(service, table, profile, keep_old):
+            if table == 'repository_topics':
+                raise RuntimeError('EXCHANGE bajarilmadi')
+            return 10
+
+        with mock.patch(f'{COMMAND}.rebuild_table', side_effect=rebuild), \
+                mock.patch(f'{COMMAND}.bump_data_version') as bump, self.assertRaises(RuntimeError):
+            call_command('rebuild_clickhouse_schema', '--tables', 'repositories,repository_topics', stdout=StringIO())
+        # repositories allaqachon almashtirilgan
+        bump.assert_called_once_with('clickhouse')
+
+
+@unittest.skipIf(chdb_session is None, "chdb o'rnatilmagan")
+class RebuildTableMaterializedViewTests(SimpleTestCase):
+    """EXCHANGE dan keyin materialized viewlar yangi jadvaldan o'qib, yangi rollupga yozishi kerak."""
+
+    def test_rollup_follows_rebuilt_tables(self):
+        repos = generate_repositories(200)
+        # repositories -> arrays view manbasi, repository_languages -> tables view manbasi,
+        # language_year_rollup -> ikkala viewning TO jadvali
+        for layout, table in (('arrays', 'repositories'), ('tables', 'repository_languages'),
+                              ('tables', 'language_year_rollup')):
+            with self.subTest(table=table), tempfile.TemporaryDirectory() as path:
+                pool, client = embedded_pool(path)
+                try:
+                    service = ClickHouseService(pool=pool, layout=layout)
+                    service.create_database_and_table()
+                    service.insert_repository_date(repos[:100])
+                    before = table_layout(service, f'github_analytics.{table}')
+
+                    self.assertTrue(rebuild_table(service, table, profile='compact'))
+                    self.assertNotEqual(table_layout(service, f'github_analytics.{table}'), before)
+
+                    service.insert_repository_date(repos[100:])
+                    rollup = service._execute(ROLLUP_QUERY)
+                    self.assertEqual(sum(row[-1] for row in rollup),
+                                     sum(len(repo['languages']) for repo in repos))
+                    service.rebuild_language_rollup()
+                    self.assertEqual(service._execute(ROLLUP_QUERY), rollup)
+                finally:
+                    client.close()
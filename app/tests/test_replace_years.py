@@ -0,0 +1,44 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from app.services.clickhouse_pool import set_pool
+from app.services.clickhouse_service import STAGING_SUFFIX, ClickHouseService
+from app.services.clickhouse_standin import StandInStats
+from app.services.synthetic import write_repositories
+from app.tests.helpers import LOCMEM_CACHE, standin_pool
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+@mock.patch.object(ClickHouseService, 'is_partitioned_by_year', return_value=True)
+class ReplaceYearsTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.source = os.path.join(tmp.name, 'repos.json')
+        write_repositories(self.source, 200)
+        self.addCleanup(set_pool, None)
+
+    def ingest(self, pool):
+        set_pool(pool)
+        out = StringIO()
+        with mock.patch.object(ClickHouseService, 'replace_years_from_staging', return_value={}) as replace:
+            call_command('ingest_to_clickhouse', self.source, '--batch-size', '50',
+                         '--replace-years', '2010,2011,2012,2013,2014,2015', stdout=out)
+        return replace, out.getvalue()
+
+    def test_years_are_replaced_after_a_clean_load(self, partitioned):
+        stats = StandInStats()
+        replace, _ = self.ingest(standin_pool(stats))
+        replace.assert_called_once_with([2010, 2011, 2012, 2013, 2014, 2015])
+        self.assertGreater(stats.rows[f'github_analytics.repositories{STAGING_SUFFIX}'], 0)
+
+    def test_child_table_failure_blocks_the_replace(self, partitioned):
+        replace, output = self.ingest(standin_pool(StandInStats(), fail_table=f'repository_topics{STAGING_SUFFIX}',
+                                                   fail_inserts={2}))
+        replace.assert_not_called()
+        self.assertIn('partitionlar almashtirilmadi', output)
@@ -0,0 +1,138 @@
+from django.test import TestCase
+
+from app.models import Language, Owner, Repo, RepoLanguage, RepoTopic, Topic
+from app.services.repo_importer import BulkRepoImporter
+from app.services.synthetic import generate_repositories
+
+
+def record(owner, name, languages=(), topics=(), **fields):
+    """Minimal raw record in the import_repos JSON format."""
+    languages = [{'name': language, 'size': size} for language, size in languages]
+    return {
+        'owner': owner,
+        'name': name,
+        'nameWithOwner': f'{owner}/{name}',
+        'createdAt': '2020-05-01T00:00:00Z',
+        'primaryLanguage': languages[0]['name'] if languages else None,
+        'languages': languages,
+        'topics': [{'name': topic} for topic in topics],
+        **fields,
+    }
+
+
+def stored_languages():
+    return {
+        (repo_language.repo.name_with_owner, repo_language.language.name): repo_language.size
+        for repo_language in RepoLanguage.objects.select_related('repo', 'language')
+    }
+
+
+def stored_topics():
+    return set(RepoTopic.objects.values_list('repo__name_with_owner', 'topic__name'))
+
+
+class BulkRepoImporterTests(TestCase):
+    def test_owners_languages_and_topics_resolve_across_chunks(self):
+        repos = generate_repositories(50, seed=3)
+        Language.objects.create(name='Python')
+        importer = BulkRepoImporter(chunk_size=7, maintain_stats=False)
+        stats = importer.import_items(repos)
+
+        self.assertEqual(stats['processed'], 50)
+        self.assertEqual(stats['repos_upserted'], 50)
+        # names shared between chunks map to one row each, the pre-existing one is reused
+        self.assertEqual(set(Owner.objects.values_list('login', flat=True)), {repo['owner'] for repo in repos})
+        self.assertEqual(Owner.objects.count(), len({repo['owner'] for repo in repos}))
+        self.assertEqual(
+            set(Language.objects.values_list('name', flat=True)),
+            {language['name'] for repo in repos for language in repo['languages']} | {'Python'},
+        )
+        self.assertEqual(
+            set(Topic.objects.values_list('name', flat=True)),
+            {topic['name'] for repo in repos for topic in repo['topics']},
+        )
+        used = {language['name'] for repo in repos for language in repo['languages']}
+        self.assertEqual(importer.language_ids, dict(Language.objects.filter(name__in=used).values_list('name', 'id')))
+
+        self.assertEqual(
+            set(Repo.objects.values_list('name_with_owner', 'owner__login', 'primary_language__name')),
+            {(repo['nameWithOwner'], repo['owner'], repo['primaryLanguage']) for repo in repos},
+        )
+        self.assertEqual(stored_languages(), {
+            (repo['nameWithOwner'], language['name']): language['size']
+            for repo in repos for language in repo['languages']
+        })
+        self.assertEqual(stored_topics(), {
+            (repo['nameWithOwner'], topic['name']) for repo in repos for topic in repo['topics']
+        })
+
+    def test_last_duplicate_in_a_chunk_wins(self):
+        first = record('octo', 'dup', [('Go', 10)], ['cli'], stars=1, description='first')
+        last = record('octo', 'dup', [('Rust', 20)], ['web'], stars=2, description='last')
+        stats = BulkRepoImporter(maintain_stats=False).import_items([first, record('octo', 'other'), last])
+
+        self.assertEqual(stats['processed'], 3)
+        self.assertEqual(stats['repos_upserted'], 2)
+        repo = Repo.objects.get(name_with_owner='octo/dup')
+        self.assertEqual((repo.stars, repo.description, repo.primary_language.name), (2, 'last', 'Rust'))
+        self.assertEqual(stored_languages(), {('octo/dup', 'Rust'): 20})
+        self.assertEqual(stored_topics(), {('octo/dup', 'web')})
+        # the first version's names are not created either
+        self.assertFalse(Language.objects.filter(name='Go').exists())
+        self.assertFalse(Topic.objects.filter(name='cli').exists())
+
+    def test_existing_repos_are_updated_in_place(self):
+        BulkRepoImporter(maintain_stats=False).import_items([
+            record('octo', 'kept', [('Go', 10)], ['cli'], stars=1, description='old'),
+        ])
+        repo_id = Repo.objects.get().id
+
+        BulkRepoImporter(maintain_stats=False).import_items([
+            record('octo', 'kept', [('Go', 99), ('Rust', 5)], ['web'], stars=7, description='new', isArchived=True),
+            record('octo', 'added', [('Go', 1)]),
+        ])
+        self.assertEqual(Repo.objects.count(), 2)
+        self.assertEqual(Owner.objects.count(), 1)
+        repo = Repo.objects.get(name_with_owner='octo/kept')
+        self.assertEqual(repo.id, repo_id)
+        self.assertEqual((repo.stars, repo.description, repo.is_archived), (7, 'new', True))
+        # without delta, language/topic rows are merged: existing pairs are kept as they were
+        self.assertEqual(stored_languages(), {
+            ('octo/kept', 'Go'): 10, ('octo/kept', 'Rust'): 5, ('octo/added', 'Go'): 1,
+        })
+        self.assertEqual(stored_topics(), {('octo/kept', 'cli'), ('octo/kept', 'web')})
+
+        # with delta a changed repo's sets are replaced
+        stats = BulkRepoImporter(delta=True, maintain_stats=False).import_items([
+            record('octo', 'kept', [('Go', 99), ('Rust', 5)], ['web'], stars=8, description='new', isArchived=True),
+            record('octo', 'added', [('Go', 1)]),
+        ])
+        self.assertEqual((stats['repos_upserted'], stats['unchanged']), (1, 1))
+        repo = Repo.objects.get(name_with_owner='octo/kept')
+        self.assertEqual((repo.id, repo.stars), (repo_id, 8))
+        self.assertEqual(stored_languages(), {
+            ('octo/kept', 'Go'): 99, ('octo/kept', 'Rust'): 5, ('octo/added', 'Go'): 1,
+        })
+        self.assertEqual(stored_topics(), {('octo/kept', 'web')})
+
+    def test_query_count_per_chunk_does_not_depend_on_its_size(self):
+        def chunk(prefix, size):
+            return [
+                record(f'{prefix}-owner{i % 3}', f'repo{i}', [(f'{prefix}-lang{i % 4}', i), (f'{prefix}-lang{i % 5}', 1)],
+                       [f'{prefix}-topic{i % 2}'])
+                for i in range(size)
+            ]
+
+        importer = BulkRepoImporter(maintain_stats=False)
+        # SAVEPOINT + RELEASE for the atomic chunk;
+        # owners, languages, topics: lookup + bulk insert + lookup of the inserted;
+        # repo upsert, repo id lookup, RepoLanguage insert, RepoTopic insert
+        with self.assertNumQueries(2 + 3 * 3 + 4):
+            importer.import_chunk(chunk('a', 3))
+        with self.assertNumQueries(2 + 3 * 3 + 4):
+            importer.import_chunk(chunk('b', 30))
+
+        # known owners are found by the first lookup; languages and topics come from the importer's cache
+        with self.assertNumQueries(2 + 1 + 4):
+            importer.import_chunk(chunk('b', 30)[::-1])
+        self.assertEqual(Repo.objects.count(), 33)
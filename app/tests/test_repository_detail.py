@@ -0,0 +1,113 @@
+import re
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from app.services import clickhouse_service as ch
+from app.services.clickhouse_pool import ClickHousePool, set_pool
+from app.services.clickhouse_service import ClickHouseService
+from app.services.clickhouse_standin import InProcessClickHouseClient
+from app.services.synthetic import generate_repositories
+
+_INSERT_COLUMNS_RE = re.compile(r'^INSERT INTO github_analytics\.(\w+) \(([^)]*)\) VALUES$')
+
+
+class DumpClient(InProcessClickHouseClient):
+    """
+    Qatorli INSERTlarni saqlaydi va repository detail so'rovlariga shulardan
+    javob beradi. ``last_query.progress.rows`` - so'rov o'qigan jadval qatorlari.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.tables = defaultdict(list)
+        self.reads = []
+        self.last_query = SimpleNamespace(progress=SimpleNamespace(rows=0, bytes=0))
+
+    def _read(self, table, **where):
+        rows = self.tables[table]
+        self.reads.append(table)
+        self.last_query.progress.rows = len(rows)
+        return [row for row in rows if all(row[column] == value for column, value in where.items())]
+
+    def execute(self, query, params=None, **kwargs):
+        self.last_query.progress.rows = 0
+        match = _INSERT_COLUMNS_RE.match(query.strip())
+        if match and params is not None:
+            columns = [column.strip() for column in match.group(2).split(',')]
+            self.tables[match.group(1)].extend(dict(zip(columns, row)) for row in params)
+            return len(params)
+        if query in (ch.REPOSITORY_DETAIL_QUERY, ch.REPOSITORY_DETAIL_ARRAYS_QUERY):
+            spec = ch.REPOSITORY_COLUMNS
+            if query == ch.REPOSITORY_DETAIL_ARRAYS_QUERY:
+                spec = spec + ch.REPOSITORY_ARRAY_COLUMNS
+            rows = self._read('repositories', name_with_owner=params['name'])
+            return [tuple(row[name] for name, _ in spec) for row in rows[:1]]
+        if query == ch.REPOSITORY_LANGUAGES_QUERY:
+            rows = self._read('repository_languages', repo_name_with_owner=params['name'], created_year=params['year'])
+            return sorted(((row['language'], row['size']) for row in rows), key=lambda item: (-item[1], item[0]))
+        if query == ch.REPOSITORY_TOPICS_QUERY:
+            rows = self._read('repository_topics', repo_name_with_owner=params['name'], created_year=params['year'])
+            return sorted((row['topic'], row['topic_stars']) for row in rows)
+        return super().execute(query, params, **kwargs)
+
+
+class RepositoryDetailViewTests(SimpleTestCase):
+    def setUp(self):
+        self.repos = generate_repositories(40)
+        self.repo = next(repo for repo in self.repos if len(repo['languages']) > 1 and repo['topics'])
+        self.addCleanup(set_pool, None)
+
+    def load(self, layout):
+        client = DumpClient()
+        pool = ClickHousePool(max_size=1, client_factory=lambda: client)
+        set_pool(pool)
+        ClickHouseService(pool=pool, layout=layout).insert_repository_date(self.repos)
+        return client
+
+    def get(self, layout, owner, name):
+        with override_settings(CLICKHOUSE_SETTINGS={**settings.CLICKHOUSE_SETTINGS, 'storage_layout': layout}):
+            return self.client.get(reverse('ch-repository-detail', args=[owner, name]))
+
+    def test_detail_is_the_same_for_both_layouts(self):
+        responses = {}
+        for layout, tables in (('tables', ['repositories', 'repository_languages', 'repository_topics']),
+                               ('arrays', ['repositories'])):
+            with self.subTest(layout=layout):
+                client = self.load(layout)
+                self.assertEqual(sorted(client.tables), tables)
+                response = self.get(layout, self.repo['owner'], self.repo['name'])
+                self.assertEqual(response.status_code, 200)
+                # har bir detail so'rovi butun jadvalni "o'qiydi": header ularning yig'indisi
+                read = len(client.tables['repositories']) + sum(
+                    len(client.tables[table]) for table in tables[1:]
+                )
+                self.assertEqual(response['X-Read-Rows'], str(read))
+                responses[layout] = response.json()
+
+        detail = responses['tables']
+        self.assertEqual(responses['arrays'], detail)
+        self.assertEqual(detail['name_with_owner'], self.repo['nameWithOwner'])
+        self.assertIs(detail['is_fork'], self.repo['isFork'])
+        self.assertEqual(detail['languages'], sorted(self.repo['languages'], key=lambda l: (-l['size'], l['name'])))
+        self.assertEqual(detail['topics'], sorted(self.repo['topics'], key=lambda t: t['name']))
+
+    def test_unknown_repository_returns_404(self):
+        for layout in ('tables', 'arrays'):
+            with self.subTest(layout=layout):
+                client = self.load(layout)
+                response = self.get(layout, 'nobody', 'nothing')
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response['X-Read-Rows'], str(len(client.tables['repositories'])))
+                # topilmasa tillar/topiclar so'ralmaydi
+                self.assertEqual(client.reads, ['repositories'])
+
+    def test_clickhouse_error_returns_500(self):
+        client = self.load('tables')
+        with mock.patch.object(client, 'execute', side_effect=ConnectionError('uzildi')):
+            response = self.get('tables', self.repo['owner'], self.repo['name'])
+        self.assertEqual(response.status_code, 500)
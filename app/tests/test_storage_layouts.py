@@ -0,0 +1,62 @@
+import tempfile
+import unittest
+
+from django.test import SimpleTestCase
+
+from app.services.clickhouse_service import LANGUAGE_ROLLUP_TABLE, ClickHouseService
+from app.services.synthetic import generate_repositories
+from app.tests.helpers import chdb_session, embedded_pool
+
+ROLLUP_QUERY = f'''
+    SELECT created_year, language, sum(total_size), uniqMerge(repo_count),
+           sum(total_stars), max(max_stars), sum(row_count)
+    FROM {LANGUAGE_ROLLUP_TABLE}
+    GROUP BY created_year, language
+    ORDER BY created_year, language
+'''
+
+
+@unittest.skipIf(chdb_session is None, "chdb o'rnatilmagan")
+class StorageLayoutEquivalenceTests(SimpleTestCase):
+    """Bir xil dump ``tables`` va ``arrays`` layoutlarida bir xil natija berishi kerak."""
+
+    def setUp(self):
+        self.repos = generate_repositories(300)
+        self.repo = next(repo for repo in self.repos if len(repo['languages']) > 1 and repo['topics'])
+        self.names = [self.repo['nameWithOwner']] + [repo['nameWithOwner'] for repo in self.repos[::25]]
+
+    def collect(self, layout):
+        with tempfile.TemporaryDirectory() as path:
+            pool, client = embedded_pool(path)
+            try:
+                service = ClickHouseService(pool=pool, layout=layout)
+                service.create_database_and_table()
+                service.insert_repository_date(self.repos)
+                result = {
+                    # materialized view yozgan rollup
+                    'rollup': service._execute(ROLLUP_QUERY),
+                    'top_languages': service.get_top_languages_by_year(top_n=3),
+                    'language_statistics': service.get_language_statistics(),
+                    'detail': [service.get_repository_detail(name) for name in self.names],
+                }
+                service.rebuild_language_rollup()
+                result['rebuilt_rollup'] = service._execute(ROLLUP_QUERY)
+                return result
+            finally:
+                client.close()
+
+    def test_rollup_and_detail_match_across_layouts(self):
+        tables = self.collect('tables')
+        arrays = self.collect('arrays')
+
+        self.assertTrue(tables['rollup'])
+        self.assertEqual(tables['rebuilt_rollup'], tables['rollup'])
+        for key in tables:
+            with self.subTest(key=key):
+                self.assertEqual(arrays[key], tables[key])
+
+        repo = self.repo
+        detail = tables['detail'][0]
+        self.assertEqual(detail['name_with_owner'], repo['nameWithOwner'])
+        self.assertEqual(detail['languages'], sorted(repo['languages'], key=lambda l: (-l['size'], l['name'])))
+        self.assertEqual(detail['topics'], sorted(repo['topics'], key=lambda t: t['name']))
@@ -0,0 +1,128 @@
+import tempfile
+import unittest
+from collections import defaultdict
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from app.services.clickhouse_pool import set_pool
+from app.services.clickhouse_service import ClickHouseService, top_languages_per_year_query
+from app.services.synthetic import generate_repositories
+from app.tests.helpers import LOCMEM_CACHE, chdb_session, embedded_pool
+from app.views import MAX_TOP_LIMIT
+
+
+def expected_top_languages(repos, limit, year_from=None, year_to=None):
+    """Dumpdan: har yil uchun repo soni bo'yicha (teng bo'lsa til nomi bo'yicha) top ``limit`` til."""
+    counts = defaultdict(lambda: defaultdict(set))
+    for repo in repos:
+        year = int(repo['createdAt'][:4])
+        for language in repo['languages']:
+            counts[year][language['name']].add(repo['nameWithOwner'])
+    top = {}
+    for year in sorted(counts, reverse=True):
+        if (year_from is not None and year < year_from) or (year_to is not None and year > year_to):
+            continue
+        languages = sorted(counts[year].items(), key=lambda item: (-len(item[1]), item[0]))
+        top[str(year)] = [(language, len(names)) for language, names in languages[:limit]]
+    return top
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TopLanguagesPerYearValidationTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['query_cache'].clear()
+        patcher = mock.patch('app.views.ClickHouseService')
+        self.service = patcher.start().return_value
+        self.service.get_top_languages_by_year.return_value = {}
+        self.addCleanup(patcher.stop)
+
+    def get(self, **params):
+        return self.client.get(reverse('ch-top-languages-by-year'), params)
+
+    def test_defaults_when_parameters_are_missing(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.service.get_top_languages_by_year.assert_called_once_with(top_n=5, year_from=None, year_to=None)
+
+    def test_valid_parameters_are_passed_to_the_query(self):
+        response = self.get(limit=MAX_TOP_LIMIT, year_from=2015, year_to=2020)
+        self.assertEqual(response.status_code, 200)
+        self.service.get_top_languages_by_year.assert_called_once_with(top_n=MAX_TOP_LIMIT, year_from=2015, year_to=2020)
+
+    def test_invalid_parameters_are_rejected(self):
+        cases = [
+            {'limit': 'abc'},
+            {'limit': ''},
+            {'limit': '0'},
+            {'limit': '-3'},
+            {'limit': str(MAX_TOP_LIMIT + 1)},
+            {'year_from': 'abc'},
+            {'year_to': ''},
+            {'year_from': '-1'},
+            {'year_from': '2021', 'year_to': '2020'},
+        ]
+        for params in cases:
+            with self.subTest(**params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('detail', response.json())
+        self.service.get_top_languages_by_year.assert_not_called()
+
+    def test_query_limits_each_year_on_the_server(self):
+        query = top_languages_per_year_query(3, 2015, 2020)
+        self.assertIn('LIMIT 3 BY created_year', query)
+        self.assertIn('created_year >= 2015', query)
+        self.assertIn('created_year <= 2020', query)
+
+
+@unittest.skipIf(chdb_session is None, "chdb o'rnatilmagan")
+@override_settings(CACHES=LOCMEM_CACHE)
+class TopLanguagesPerYearQueryTests(SimpleTestCase):
+    """LIMIT n BY natijasi dumpdan hisoblangan top tillar bilan solishtiriladi (chdb)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.repos = generate_repositories(300)
+        cls.directory = tempfile.TemporaryDirectory()
+        pool, cls.ch_client = embedded_pool(cls.directory.name)
+        ClickHouseService(pool=pool).create_database_and_table()
+        ClickHouseService(pool=pool).insert_repository_date(cls.repos)
+        set_pool(pool)
+
+    @classmethod
+    def tearDownClass(cls):
+        set_pool(None)
+        cls.ch_client.close()
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['query_cache'].clear()
+
+    def top_languages(self, **params):
+        response = self.client.get(reverse('ch-top-languages-by-year'), params)
+        self.assertEqual(response.status_code, 200)
+        return {
+            year: [(item['language'], item['repository_count']) for item in languages]
+            for year, languages in response.json().items()
+        }
+
+    def test_each_year_returns_at_most_limit_languages_in_order(self):
+        for limit in (1, 3, 50):
+            with self.subTest(limit=limit):
+                top = self.top_languages(limit=limit)
+                self.assertEqual(top, expected_top_languages(self.repos, limit))
+                self.assertEqual(list(top), sorted(top, reverse=True))
+                self.assertTrue(all(len(languages) <= limit for languages in top.values()))
+        self.assertTrue(any(len(languages) == 3 for languages in self.top_languages(limit=3).values()))
+
+    def test_year_range(self):
+        top = self.top_languages(limit=2, year_from=2015, year_to=2018)
+        self.assertEqual(set(top), {'2015', '2016', '2017', '2018'} & set(expected_top_languages(self.repos, 2)))
+        self.assertEqual(top, expected_top_languages(self.repos, 2, 2015, 2018))
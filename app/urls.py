@@ -1,6 +1,16 @@
 from django.urls import path
 # E'tibor bering, barcha viewlar .views dan import qilinishi kerak
-from .views import TopRepoLangBy5Year, RepositoryStatisticsView, TopRepoLangByYearCH
+from .views import (
+    TopRepoLangBy5Year,
+    RepositoryStatisticsView,
+    TopRepoLangByYearCH,
+    TopLanguagesPerYearCH,
+    RepositoryDetailCH,
+    RepositoryExportView,
+    RepositoryUpdatesView,
+    AsyncRepositoryStatisticsView,
+    AsyncTopRepoLangByYearCH,
+)
 # Agar ClickHouse uchun alohida View yaratgan bo'lsak, uni ham qo'shamiz
 
 urlpatterns = [
@@ -12,4 +22,20 @@ urlpatterns = [
     
     # 3. Agar ClickHouse uchun yangi View ni ishlatmoqchi bo'lsangiz:
     path('ch-top-languages', TopRepoLangByYearCH.as_view(), name='ch-top-languages'),
+
+    # 3.1. ClickHouse: har yil uchun top tillar (?limit=5&year_from=2015&year_to=2020)
+    path('ch-top-languages-by-year', TopLanguagesPerYearCH.as_view(), name='ch-top-languages-by-year'),
+
+    # 3.2. ClickHouse: bitta repository tillari va topiclari bilan (owner/name)
+    path('ch-repositories/<str:owner>/<str:name>', RepositoryDetailCH.as_view(), name='ch-repository-detail'),
+
+    # 3.3. Eksport: ?format=csv|ndjson|parquet&source=clickhouse|orm&year=&language=&min_stars=&max_stars=
+    path('export', RepositoryExportView.as_view(), name='export'),
+
+    # 3.4. ClickHouse: yangilanishlarni qabul qilish (POST, write-behind bufer orqali)
+    path('ch-repositories/updates', RepositoryUpdatesView.as_view(), name='ch-repository-updates'),
+
+    # 4. Asinxron variantlar (ASGI server, masalan uvicorn core.asgi:application orqali)
+    path('async/statistics', AsyncRepositoryStatisticsView.as_view(), name='async-statistics'),
+    path('async/ch-top-languages', AsyncTopRepoLangByYearCH.as_view(), name='async-ch-top-languages'),
 ]
\ No newline at end of file
@@ -1,12 +1,14 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum
-from django.core.cache import cache
-from .models import RepoLanguage
+from rest_framework.permissions import IsAdminUser
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.views import View
+from .models import LanguageYearStat
 
 from .serializers import TopRepoSerializer
 import logging
+import math
 
 
 # Agar ORM ishlatilayotgan bo'lsa:
@@ -15,6 +17,10 @@ import logging
 
 # ClickHouse service
 from app.services.clickhouse_service import ClickHouseService
+from app.services.clickhouse_async import AsyncClickHouseService
+from app.services.clickhouse_pool import PoolTimeout
+from app.services import export, metrics, query_cache
+from app.services.insert_buffer import BufferFull, get_insert_buffer
 
 logger = logging.getLogger(__name__)
 
@@ -38,26 +44,29 @@ class TopRepoLangBy5Year(APIView):
             limit = int(request.query_params.get('limit', 5))
         except ValueError:
             limit = 5
-        cache_key = f"top_langs_by_size: {year}:{limit}"
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return Response(cached)
-        qs = (
-            RepoLanguage.objects
-            .filter(repo__created_year=year)
-            .values('language__name')
-            .annotate(total_size=Sum('size'))
-            .order_by('-total_size')[:limit]
-            )
-        data = [
-        {
-            'language': item.get('language__name'),
-            'total_size': int(item.get('total_size') or 0),
-            'year': year,
-        }
-            for item in qs
-    ]
-        cache.set(cache_key, data, 60*60)
+
+        def compute():
+            # LanguageYearStat import_repos da yangilanadi: yil bo'yicha bir necha yuz qator
+            qs = (
+                LanguageYearStat.objects
+                .filter(year=year)
+                .values('language__name', 'total_size')
+                .order_by('-total_size')[:limit]
+                )
+            with metrics.track_query('orm', 'top_languages_by_size') as record:
+                data = [
+                    {
+                        'language': item.get('language__name'),
+                        'total_size': int(item.get('total_size') or 0),
+                        'year': year,
+                    }
+                    for item in qs
+                ]
+                record.result_rows = len(data)
+            return data
+
+        # Kesh import_repos bumpi bilan eskiradi, TTL faqat zaxira
+        data = query_cache.cached_query(query_cache.ORM, f"top_langs_by_size:{year}:{limit}", compute)
         serializer = TopRepoSerializer(data,many=True)
         return Response(serializer.data)
 
@@ -69,7 +78,9 @@ class RepositoryStatisticsView(APIView):
         try:
             service = ClickHouseService()
             # get_repository_statistics o'rniga get_language_statistics ishlatish tavsiya etiladi
-            stats = service.get_language_statistics() 
+            stats = query_cache.cached_query(
+                query_cache.CLICKHOUSE, "ch_language_statistics", service.get_language_statistics
+            )
             
             if not stats:
                 return Response([], status=status.HTTP_204_NO_CONTENT)
@@ -99,15 +110,14 @@ class TopRepoLangByYearCH(APIView):
             
         
         cache_key = f"ch_top_langs_by_year:{year}:{limit}"
-        cached_data = cache.get(cache_key)
-
-        if cached_data is not None:
-            return Response(cached_data)
 
         try:
             service = ClickHouseService()
             # ClickHouse service ichidagi to'g'ri metodni chaqiramiz
-            stats = service.get_top_languages_by_year_and_size(year=year, top_n=limit) 
+            stats = query_cache.cached_query(
+                query_cache.CLICKHOUSE, cache_key,
+                lambda: service.get_top_languages_by_year_and_size(year=year, top_n=limit),
+            )
             
         except Exception as e:
             logger.error(f"ClickHouse so'rovida xatolik ({cache_key}): {e}")
@@ -115,7 +125,222 @@ class TopRepoLangByYearCH(APIView):
                 {'error': f'ClickHouse so\'rovida xatolik: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-        
-        cache.set(cache_key, stats, 60 * 3) # 1 soat keshga saqlash
 
-        return Response(stats, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(stats, status=status.HTTP_200_OK)
+
+
+# --- 3.1. ClickHouse: har yil uchun top tillar (kesish server tomonida, LIMIT n BY) ---
+MAX_TOP_LIMIT = 100
+
+
+class TopLanguagesPerYearCH(APIView):
+    """Har bir yil uchun eng ko'p repoda ishlatilgan top N tillar (ixtiyoriy yil oralig'i bilan)."""
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', 5))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_TOP_LIMIT:
+            return Response({"detail": f"limit 1 dan {MAX_TOP_LIMIT} gacha butun son bo'lishi kerak."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        years = {}
+        for param in ('year_from', 'year_to'):
+            value = request.query_params.get(param)
+            if value is None:
+                years[param] = None
+                continue
+            try:
+                years[param] = int(value)
+            except ValueError:
+                return Response({"detail": f"{param} butun son bo'lishi kerak."}, status=status.HTTP_400_BAD_REQUEST)
+            if years[param] < 1:
+                return Response({"detail": f"{param} musbat bo'lishi kerak."}, status=status.HTTP_400_BAD_REQUEST)
+        if None not in years.values() and years['year_from'] > years['year_to']:
+            return Response({"detail": "year_from year_to dan katta bo'lmasligi kerak."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = f"ch_top_langs_per_year:{limit}:{years['year_from']}:{years['year_to']}"
+
+        try:
+            service = ClickHouseService()
+            stats = query_cache.cached_query(
+                query_cache.CLICKHOUSE, cache_key,
+                lambda: service.get_top_languages_by_year(top_n=limit, **years),
+            )
+        except Exception as e:
+            logger.error(f"ClickHouse so'rovida xatolik ({cache_key}): {e}")
+            return Response(
+                {'error': f'ClickHouse so\'rovida xatolik: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return Response(stats, status=status.HTTP_200_OK)
+
+
+# --- 3.2. ClickHouse: bitta repository (name_with_owner skip indekslari orqali) ---
+class RepositoryDetailCH(APIView):
+    """Repository, uning tillari va topiclari. X-Read-Rows: ClickHouse o'qigan qatorlar."""
+    def get(self, request, owner, name):
+        name_with_owner = f"{owner}/{name}"
+        service = ClickHouseService()
+        try:
+            detail = service.get_repository_detail(name_with_owner)
+        except Exception as e:
+            logger.error(f"ClickHouse so'rovida xatolik (repository {name_with_owner}): {e}")
+            return Response(
+                {'error': f'ClickHouse so\'rovida xatolik: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        if detail is None:
+            response = Response({"detail": "Repository topilmadi."}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            response = Response(detail, status=status.HTTP_200_OK)
+        # Indeks granulalarni kesayotganini tekshirish uchun (to'liq skan = jadval qatorlari soni)
+        response['X-Read-Rows'] = str(service.rows_read)
+        return response
+
+
+# --- 3.3. Filtrlangan repositorylarni oqim bilan eksport (CSV / NDJSON / Parquet) ---
+class RepositoryExportView(View):
+    """
+    ?format=csv|ndjson|parquet&source=clickhouse|orm&year=&language=&min_stars=&max_stars=
+    Javob oqim bilan yuboriladi: server xotirasi natija hajmiga bog'liq emas.
+    """
+    def get(self, request):
+        output = request.GET.get('format', 'ndjson')
+        if output not in export.FORMATS:
+            return JsonResponse({"detail": f"format: {', '.join(export.FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        if output == 'parquet' and export.pa is None:
+            return JsonResponse({"detail": "Parquet uchun pyarrow o'rnatilmagan."},
+                                status=status.HTTP_501_NOT_IMPLEMENTED)
+        source = request.GET.get('source', 'clickhouse')
+        if source not in ('clickhouse', 'orm'):
+            return JsonResponse({"detail": "source: clickhouse, orm"}, status=status.HTTP_400_BAD_REQUEST)
+
+        values = {}
+        for param in ('year', 'min_stars', 'max_stars'):
+            value = request.GET.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                values[param] = int(value)
+            except ValueError:
+                return JsonResponse({"detail": f"{param} butun son bo'lishi kerak."}, status=status.HTTP_400_BAD_REQUEST)
+        filters = export.ExportFilters(language=request.GET.get('language') or None, **values)
+
+        rows = export.clickhouse_rows(filters) if source == 'clickhouse' else export.orm_rows(filters)
+        content_type, extension, writer = export.FORMATS[output]
+        response = StreamingHttpResponse(writer(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="repositories.{extension}"'
+        return response
+
+
+# --- 3.4. Real vaqtdagi yangilanishlar: write-behind bufer orqali ClickHouse ga ---
+class RepositoryUpdatesView(APIView):
+    """
+    POST: repository yozuvlari ro'yxati (ingest_to_clickhouse JSON formatida)
+    yoki {"repositories": [...]}. Yozuvlar buferga olinadi va fon threadda
+    katta bloklar bilan yoziladi (202). Bufer to'la bo'lsa 503 + Retry-After.
+    Faqat staff foydalanuvchilar (session yoki Basic auth) yoza oladi.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        repositories = request.data
+        if isinstance(repositories, dict):
+            repositories = repositories.get('repositories')
+        if not isinstance(repositories, list) or not all(isinstance(repo, dict) for repo in repositories):
+            return Response({"detail": "Repository obyektlari ro'yxati kutilgan."}, status=status.HTTP_400_BAD_REQUEST)
+
+        buffer = get_insert_buffer()
+        if len(repositories) > buffer.max_rows:
+            return Response(
+                {"detail": f"Bir so'rovda ko'pi bilan {buffer.max_rows} ta repository."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        try:
+            accepted, errors = buffer.add(repositories)
+        except BufferFull as e:
+            logger.warning(f"Yangilanish rad etildi: {e}")
+            response = Response({"detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = str(math.ceil(e.retry_after))
+            return response
+
+        return Response({'accepted': accepted, 'errors': errors, **buffer.stats()}, status=status.HTTP_202_ACCEPTED)
+
+
+# --- 4. Asinxron (ASGI) variantlar: ClickHouse kutilayotganda event loop bloklanmaydi ---
+POOL_RETRY_AFTER = 1  # soniya: havza band bo'lganda mijozga tavsiya
+
+
+def pool_busy_response(error):
+    response = JsonResponse({'detail': str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = str(POOL_RETRY_AFTER)
+    return response
+
+
+class AsyncRepositoryStatisticsView(View):
+    """RepositoryStatisticsView ning asinxron varianti (core/asgi.py orqali)."""
+    async def get(self, request):
+        try:
+            stats = await query_cache.acached_query(
+                query_cache.CLICKHOUSE, "ch_language_statistics",
+                AsyncClickHouseService().get_language_statistics,
+            )
+        except PoolTimeout as e:
+            logger.warning(f"ClickHouse havzasi band (async): {e}")
+            return pool_busy_response(e)
+        except Exception as e:
+            logger.error(f"ClickHouse umumiy statistika xatosi (async): {e}")
+            return JsonResponse(
+                {'error': f'ClickHouse serveri yoki so\'rovda xatolik: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        if not stats:
+            return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+        return JsonResponse(stats, safe=False)
+
+
+class AsyncTopRepoLangByYearCH(View):
+    """TopRepoLangByYearCH ning asinxron varianti: ClickHouse so'rovi alohida havzada, kesh asinxron."""
+    async def get(self, request):
+        try:
+            year = int(request.GET.get('year', 2025))
+        except ValueError:
+            return JsonResponse({"detail": "year butun son bo'lishi kerak."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = int(request.GET.get('limit', 5))
+        except ValueError:
+            limit = 5
+
+        # Sinxron view bilan bir xil kalit: ikkala variant keshni bo'lishadi
+        cache_key = f"ch_top_langs_by_year:{year}:{limit}"
+
+        try:
+            stats = await query_cache.acached_query(
+                query_cache.CLICKHOUSE, cache_key,
+                lambda: AsyncClickHouseService().get_top_languages_by_year_and_size(year=year, top_n=limit),
+            )
+        except PoolTimeout as e:
+            logger.warning(f"ClickHouse havzasi band ({cache_key}, async): {e}")
+            return pool_busy_response(e)
+        except Exception as e:
+            logger.error(f"ClickHouse so'rovida xatolik ({cache_key}, async): {e}")
+            return JsonResponse(
+                {'error': f'ClickHouse so\'rovida xatolik: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return JsonResponse(stats, safe=False)
+
+
+# --- 5. Prometheus formatidagi metrikalar (jarayon bo'yicha) ---
+class MetricsView(View):
+    """So'rovlar, endpointlar va kesh metrikalari: Prometheus text format 0.0.4."""
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
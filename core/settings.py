@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,10 +92,65 @@ CLICKHOUSE_SETTINGS = {
     "database": "github_analyitics",
     "user": "default",
     "password": "",
+    # Jadval sxemasi: "default" yoki "compact" (LowCardinality + kodeklar, app/services/clickhouse_schema.py).
+    # Mavjud jadvallarni o'tkazish: python manage.py rebuild_clickhouse_schema --profile compact
+    "schema_profile": "default",
+    # Tillar/topiclar: "tables" (repository_languages/repository_topics jadvallari) yoki
+    # "arrays" (repositories dagi parallel Array ustunlari). Taqqoslash: python manage.py compare_storage_layouts
+    "storage_layout": "tables",
+    # ClickHouseService uchun jarayon bo'yicha umumiy ulanishlar havzasi
+    "pool": {
+        "max_size": 8,
+        "acquire_timeout": 10,
+        "idle_timeout": 300,
+        "health_check_interval": 30,
+    },
+    # Asinxron viewlar (core/asgi.py) uchun alohida havza: shuncha so'rov parallel bajariladi,
+    # qolganlari event loopda acquire_timeout gacha kutadi, keyin 503 + Retry-After
+    "async_pool": {
+        "max_size": 16,
+        "acquire_timeout": 10,
+    },
+    # POST /ch-repositories/updates uchun write-behind bufer (app/services/insert_buffer.py):
+    # yozuvlar shu chegaralardan biriga yetganda bitta INSERT bilan yoziladi
+    "insert_buffer": {
+        "max_rows": 50000,
+        "max_bytes": 32 * 1024 * 1024,
+        "max_wait": 5.0,
+        "max_pending_rows": 200000,
+        # Rollup har flushda emas, shuncha soniyada bir marta qayta hisoblanadi
+        "rollup_interval": 60.0,
+    },
 }
 
 # DATABASE_ROUTERS = ['dbrouters.ClickHouseRouter']
 
+# Django ning standart keshi o'zgarmaydi (jarayon ichidagi LocMem). Versiyalangan natija
+# keshi (app/services/query_cache.py) alohida aliasda: u barcha jarayonlar (web workerlar
+# va management buyruqlari) uchun umumiy bo'lishi kerak, aks holda import buyruqlari
+# oshirgan ma'lumot versiyasini web tomon ko'rmaydi. FileBasedCache faqat bitta host
+# uchun va uning add() i atomik emas: single-flight lock jarayonlar orasida kafolatlanmaydi
+# (kamdan-kam ikki so'rov bir kalitni birga hisoblaydi). Productionda atomik add/incr li
+# umumiy backend (Redis/Memcached) ishlating.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'query_cache': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.django_cache',
+        'TIMEOUT': 60 * 60 * 24,
+    },
+}
+
+# app/services/query_cache.py: versiyalangan natija keshi
+QUERY_CACHE = {
+    'CACHE_ALIAS': 'query_cache',  # CACHES dagi alias
+    'TIMEOUT': 60 * 60 * 24,   # invalidatsiya aniq (versiya), TTL faqat zaxira
+    'LOCK_TIMEOUT': 30,        # bitta kalitni hisoblash uchun maksimal vaqt
+    'POLL_INTERVAL': 0.05,     # boshqa so'rov hisoblayotganda kutish qadami
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
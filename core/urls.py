@@ -19,6 +19,7 @@ from django.urls import path,include
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from app.views import MetricsView
 
 
 schema_view = get_schema_view(
@@ -40,5 +41,6 @@ urlpatterns = [
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     path('app/',include('app.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
 